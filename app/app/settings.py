@@ -88,11 +88,69 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # PostgreSQL borrowing connections from a per process pool.
+        'ENGINE': 'core.db',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Seconds a thread keeps its connection before handing it back
+        # to the pool, 0 for the end of every request.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'POOL': {
+            'ENABLED': bool(int(os.environ.get('DB_POOL', 1))),
+            # MAX_SIZE is set below, from the threads running queries.
+            'MAX_LIFETIME': int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+            'CHECK_AFTER': int(os.environ.get('DB_POOL_CHECK_AFTER', 30)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        },
+    }
+}
+
+# Read replicas of the default database, as comma separated hosts
+# sharing its name and credentials, each added as a replica_<n> alias.
+# The tests read the test database through them.
+replica_hosts = os.environ.get('DB_REPLICA_HOSTS', '').split(',')
+for index, host in enumerate(filter(None, map(str.strip, replica_hosts))):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db.router.ReplicaRouter']
+
+READ_REPLICAS = {
+    'ALIASES': [alias for alias in DATABASES if alias != 'default'],
+    # A cache alias shared by every process, memcached or redis, holding
+    # which users wrote lately. Reads stay on the primary without one,
+    # as a write would only keep its user off the replicas in the
+    # process which handled it.
+    'CACHE': os.environ.get('READ_REPLICAS_CACHE') or None,
+    # Seconds a user who wrote reads from the primary only. Longer than
+    # MAX_LAG_SECONDS plus LAG_CHECK_INTERVAL, so a replica serving them
+    # afterwards has their writes.
+    'STICKY_SECONDS': int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 10)),
+    # Replicas further behind are skipped, the primary serving reads
+    # when every one is.
+    'MAX_LAG_SECONDS': int(os.environ.get('DB_REPLICA_MAX_LAG_SECONDS', 5)),
+    # Seconds a process reuses the lag it measured for a replica.
+    'LAG_CHECK_INTERVAL': int(
+        os.environ.get('DB_REPLICA_LAG_CHECK_INTERVAL', 2)
+    ),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
@@ -150,8 +208,118 @@ AUTH_USER_MODEL = "core.User"
 # DRF documentation config
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # JSON through orjson when installed, the stdlib json otherwise.
+    'DEFAULT_RENDERER_CLASSES': [
+        'recipe.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'recipe.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Cached token authentication config
+TOKEN_AUTH_CACHE = {
+    'MAX_ENTRIES': int(os.environ.get('TOKEN_AUTH_CACHE_MAX_ENTRIES', 1024)),
+    'TTL': int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 30)),
+    # A cache alias shared by every process, memcached or redis, which
+    # also carries the invalidation stamps reaching every process when a
+    # token is deleted or a user changed. Tokens are not cached, in
+    # either tier, without one.
+    'SHARED_CACHE': os.environ.get('TOKEN_AUTH_SHARED_CACHE') or None,
+    'SHARED_TTL': int(os.environ.get('TOKEN_AUTH_SHARED_CACHE_TTL', 300)),
+}
+
+# Per-user versioned response cache config
+RECIPE_RESPONSE_CACHE = {
+    # A cache alias shared by every process, memcached or redis, as a
+    # write only bumps the version in the cache it reaches. Responses
+    # are not cached without one.
+    'CACHE': os.environ.get('RECIPE_RESPONSE_CACHE') or None,
+    'TTL': int(os.environ.get('RECIPE_RESPONSE_CACHE_TTL', 300)),
+}
+
+# Recipe list config
+RECIPE_FAST_LIST = {
+    # Serialize listed recipes from values() rows rather than model
+    # instances, producing the same JSON for a fraction of the CPU.
+    'ENABLED': bool(int(os.environ.get('RECIPE_FAST_LIST', 1))),
+}
+
+# Async recipe API config, for deployments behind an ASGI server
+ASYNC_API = {
+    # Route the recipe, tag and ingredient list and detail URLs to async
+    # views.
+    'ENABLED': bool(int(os.environ.get('ASYNC_API', 0))),
+    # Threads running their queries, so at most this many connections,
+    # which the database pool is sized for below.
+    'THREADS': int(os.environ.get('ASYNC_API_THREADS', 8)),
+}
+
+# Asynchronous recipe image processing config
+RECIPE_IMAGES = {
+    # 'thread' for a worker pool per process, 'fake' to queue jobs until
+    # the tests run them.
+    'EXECUTOR': os.environ.get('RECIPE_IMAGES_EXECUTOR', 'thread'),
+    'WORKERS': int(os.environ.get('RECIPE_IMAGES_WORKERS', 2)),
+    # Outside MEDIA_ROOT so unprocessed uploads are never served.
+    'STAGING_ROOT': os.environ.get(
+        'RECIPE_IMAGES_STAGING_ROOT', '/vol/staging'
+    ),
+    # Seconds after which clean_image_uploads fails images still waiting
+    # for or in processing, as the process running their job has died,
+    # and deletes staged uploads left behind.
+    'JOB_TIMEOUT': int(os.environ.get('RECIPE_IMAGES_JOB_TIMEOUT', 60 * 60)),
+    'MAX_DIMENSION': int(os.environ.get('RECIPE_IMAGES_MAX_DIMENSION', 2048)),
+    'MAX_PIXELS': int(os.environ.get('RECIPE_IMAGES_MAX_PIXELS', 40000000)),
+    # Widths of the resized copies, each saved in the format of the image
+    # and every extra format the installed Pillow can write.
+    'DERIVATIVE_WIDTHS': [
+        int(width) for width in os.environ.get(
+            'RECIPE_IMAGES_DERIVATIVE_WIDTHS', '320,640,1280'
+        ).split(',')
+    ],
+    'DERIVATIVE_FORMATS': os.environ.get(
+        'RECIPE_IMAGES_DERIVATIVE_FORMATS', 'webp,avif'
+    ).split(','),
+    # Sizes rendered on request, outside MEDIA_ROOT as only the owner of
+    # a recipe may fetch them. The least recently used are evicted once
+    # they take more than the given bytes.
+    'RESIZE_CACHE_ROOT': os.environ.get(
+        'RECIPE_IMAGES_RESIZE_CACHE_ROOT', '/vol/cache/resized'
+    ),
+    'RESIZE_CACHE_MAX_BYTES': int(os.environ.get(
+        'RECIPE_IMAGES_RESIZE_CACHE_MAX_BYTES', 512 * 1024 * 1024
+    )),
+    # Seconds clients may keep a rendering requested with the current
+    # image_version of its recipe as v, others being revalidated.
+    'RESIZE_MAX_AGE': int(os.environ.get(
+        'RECIPE_IMAGES_RESIZE_MAX_AGE', 30 * 24 * 60 * 60
+    )),
+    # Resumable uploads, written into STAGING_ROOT chunk by chunk and
+    # collected once idle for UPLOAD_SESSION_TTL seconds.
+    'UPLOAD_MAX_BYTES': int(os.environ.get(
+        'RECIPE_IMAGES_UPLOAD_MAX_BYTES', 20 * 1024 * 1024
+    )),
+    'UPLOAD_CHUNK_MAX_BYTES': int(os.environ.get(
+        'RECIPE_IMAGES_UPLOAD_CHUNK_MAX_BYTES', 8 * 1024 * 1024
+    )),
+    'UPLOAD_SESSION_TTL': int(os.environ.get(
+        'RECIPE_IMAGES_UPLOAD_SESSION_TTL', 24 * 60 * 60
+    )),
+}
+
+# Room in each process's pool for every thread running queries, so none
+# waits out DB_POOL_TIMEOUT: the request thread, or the async API's
+# threads and the one of Django's sync views, and the image workers.
+DATABASES['default']['POOL']['MAX_SIZE'] = int(os.environ.get(
+    'DB_POOL_MAX_SIZE',
+    (ASYNC_API['THREADS'] + 1 if ASYNC_API['ENABLED'] else 1)
+    + RECIPE_IMAGES['WORKERS']
+))
+
 # Spectacular config for uploading images via browsable interface
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
@@ -22,10 +22,19 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import DatabasePoolStatsView
+
+recipe_urls = path('api/recipe/', include('recipe.urls'))
+
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/recipe/', include('recipe.urls')),
+    recipe_urls,
     path('api/user/', include('user.urls')),
+    path(
+        'api/health/db-pools/',
+        DatabasePoolStatsView.as_view(),
+        name='db-pool-stats',
+    ),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
     path(
         'api/docs/',
@@ -34,6 +43,12 @@ urlpatterns = [
     )
 ]
 
+if settings.ASYNC_API['ENABLED']:
+    urlpatterns.insert(
+        urlpatterns.index(recipe_urls),
+        path('api/recipe/', include('recipe.async_urls')),
+    )
+
 if settings.DEBUG:
     urlpatterns += static(
         settings.MEDIA_URL,
@@ -0,0 +1,3 @@
+"""
+PostgreSQL database backend borrowing connections from a pool.
+"""
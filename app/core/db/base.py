@@ -0,0 +1,126 @@
+"""
+PostgreSQL database wrapper borrowing connections from a pool.
+"""
+from django.db.backends.postgresql import (
+    base,
+    creation
+)
+
+from .pool import (
+    ConnectionPool,
+    PoolTimeout,
+    pools
+)
+
+
+Database = base.Database
+
+DEFAULT_POOL = {
+    'ENABLED': True,
+    # Connections a process keeps open at most.
+    'MAX_SIZE': 4,
+    # Seconds after which a connection is closed instead of reused.
+    'MAX_LIFETIME': 1800,
+    # Seconds a connection may sit idle before it is checked on reuse.
+    'CHECK_AFTER': 30,
+    # Seconds to wait for a connection when all are lent.
+    'TIMEOUT': 10,
+}
+
+
+class PsycopgPool(ConnectionPool):
+    """Pool of psycopg2 connections."""
+
+    def _check(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Database.Error:
+            return False
+        return True
+
+    def _reset(self, connection):
+        if connection.closed:
+            return False
+        extensions = Database.extensions
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except Database.Error:
+                return False
+        return True
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Database.Error:
+            pass
+
+
+def pool_config(settings_dict):
+    """Return the pool settings of a database."""
+    return {**DEFAULT_POOL, **settings_dict.get('POOL', {})}
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would keep the database in use,
+        # including those of aliases mirroring it.
+        for pool in pools.pools():
+            pool.close_idle()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend taking connections from a per process pool
+    and handing them back when Django closes them, so CONN_MAX_AGE
+    controls how long a thread holds on to one."""
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+
+    def get_new_connection(self, conn_params):
+        config = pool_config(self.settings_dict)
+        if not config['ENABLED']:
+            return super().get_new_connection(conn_params)
+
+        pool = pools.get(self.alias, conn_params, lambda: PsycopgPool(
+            max_size=config['MAX_SIZE'],
+            max_lifetime=config['MAX_LIFETIME'],
+            check_after=config['CHECK_AFTER'],
+            timeout=config['TIMEOUT'],
+        ))
+        try:
+            connection = pool.acquire(
+                lambda: super(DatabaseWrapper, self).get_new_connection(
+                    conn_params
+                )
+            )
+        except PoolTimeout as error:
+            raise Database.OperationalError(str(error)) from error
+
+        # Set by the parent class on new connections only.
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        self.pool = pool
+        return connection
+
+    def _close(self):
+        if self.connection is None or self.pool is None:
+            return super()._close()
+
+        pool, self.pool = self.pool, None
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # Django keeps using a connection closed in a transaction
+                # until the block exits, so it cannot be lent out again.
+                pool.discard(self.connection)
+            else:
+                pool.release(self.connection)
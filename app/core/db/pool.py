@@ -0,0 +1,233 @@
+"""
+Thread safe, per process pool of database connections.
+"""
+import os
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """No connection became free before the pool timeout."""
+
+
+class PooledConnection:
+    """A connection with the times the pool needs about it."""
+    __slots__ = ('connection', 'created_at', 'released_at')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.released_at = self.created_at
+
+
+class ConnectionPool:
+    """Keep up to max_size connections open, lending idle ones out
+    most recently used first.
+
+    Connections older than max_lifetime are closed instead of reused,
+    and ones idle for longer than check_after are checked before being
+    lent. A forked child drops, without closing, the connections it
+    inherited, since they share their sockets with the parent.
+
+    Subclasses implement how to check, reset and close connections.
+    """
+
+    def __init__(self, max_size, max_lifetime, check_after, timeout):
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        # Kept referenced, as collecting them would close them.
+        self._inherited = []
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._idle = []
+        self._lent = {}
+        self._size = 0
+        self._counters = dict.fromkeys(
+            ('created', 'reused', 'closed', 'failed_checks', 'waits',
+             'timeouts'),
+            0
+        )
+
+    def _check_fork(self):
+        """Forget every connection if this process is a forked child."""
+        if self._pid != os.getpid():
+            self._inherited.extend(self._idle)
+            self._inherited.extend(self._lent.values())
+            self._reset_state()
+
+    def acquire(self, connect):
+        """Lend an idle connection, or one from connect() while the pool
+        has room, waiting up to the timeout for a release otherwise."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                self._check_fork()
+                item = self._take_idle(deadline)
+                if item is None:
+                    # Reserve the slot before connecting without the lock.
+                    self._size += 1
+            if item is None:
+                return self._create(connect)
+
+            if self._is_fresh(item) or self._check(item.connection):
+                with self._cond:
+                    self._counters['reused'] += 1
+                    self._lent[id(item.connection)] = item
+                return item.connection
+            with self._cond:
+                self._counters['failed_checks'] += 1
+            self._discard(item.connection)
+
+    def _take_idle(self, deadline):
+        """Pop the most recently used idle connection which is not too
+        old, or None when a new one may be opened. Holds the lock."""
+        while True:
+            while self._idle:
+                item = self._idle.pop()
+                if not self._is_expired(item):
+                    return item
+                self._size -= 1
+                self._counters['closed'] += 1
+                self._close(item.connection)
+            if self._size < self.max_size:
+                return None
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._counters['timeouts'] += 1
+                raise PoolTimeout(
+                    f'All {self.max_size} connections stayed in use for '
+                    f'{self.timeout} seconds.'
+                )
+            self._counters['waits'] += 1
+            self._cond.wait(remaining)
+
+    def _create(self, connect):
+        try:
+            connection = connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._counters['created'] += 1
+            self._lent[id(connection)] = PooledConnection(connection)
+        return connection
+
+    def release(self, connection):
+        """Take back a lent connection, keeping it when reusable."""
+        with self._cond:
+            self._check_fork()
+            item = self._lent.pop(id(connection), None)
+        if item is None:
+            # Lent before a fork, or never by this pool.
+            return
+        if self._is_expired(item) or not self._reset(connection):
+            self._discard(connection)
+            return
+
+        item.released_at = time.monotonic()
+        with self._cond:
+            self._idle.append(item)
+            self._cond.notify()
+
+    def discard(self, connection):
+        """Close a lent connection instead of taking it back."""
+        with self._cond:
+            item = self._lent.pop(id(connection), None)
+        if item is not None:
+            self._discard(connection)
+
+    def _discard(self, connection):
+        """Close a connection and free its slot."""
+        try:
+            self._close(connection)
+        finally:
+            with self._cond:
+                self._size -= 1
+                self._counters['closed'] += 1
+                self._cond.notify()
+
+    def close_idle(self):
+        """Close every idle connection."""
+        with self._cond:
+            self._check_fork()
+            idle, self._idle = self._idle, []
+        for item in idle:
+            self._discard(item.connection)
+
+    def stats(self):
+        """Return the pool settings, its current state and counters."""
+        with self._cond:
+            self._check_fork()
+            return {
+                'pid': self._pid,
+                'max_size': self.max_size,
+                'size': self._size,
+                'lent': len(self._lent),
+                'idle': len(self._idle),
+                **self._counters,
+            }
+
+    def _is_expired(self, item):
+        return time.monotonic() - item.created_at > self.max_lifetime
+
+    def _is_fresh(self, item):
+        return time.monotonic() - item.released_at < self.check_after
+
+    def _check(self, connection):
+        """Return whether an idle connection still works."""
+        raise NotImplementedError
+
+    def _reset(self, connection):
+        """Make a released connection ready for reuse, returning False
+        when it cannot be reused."""
+        raise NotImplementedError
+
+    def _close(self, connection):
+        raise NotImplementedError
+
+
+class PoolRegistry:
+    """Pools of a process by database alias and connection parameters."""
+
+    def __init__(self):
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def get(self, alias, params, create):
+        """Return the pool for the parameters, made by create() once."""
+        key = (alias, tuple(sorted(
+            (name, repr(value)) for name, value in params.items()
+        )))
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = create()
+            return self._pools[key]
+
+    def stats(self):
+        """Return the stats of every pool with its database alias."""
+        with self._lock:
+            items = list(self._pools.items())
+        return [
+            {'alias': alias, **pool.stats()}
+            for (alias, _params), pool in items
+        ]
+
+    def pools(self, alias=None):
+        """Return the pools of an alias, or of every alias."""
+        with self._lock:
+            return [
+                pool for (pool_alias, _params), pool in self._pools.items()
+                if alias is None or pool_alias == alias
+            ]
+
+
+pools = PoolRegistry()
@@ -0,0 +1,179 @@
+"""
+Database router sending marked reads to read replicas.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    DatabaseError,
+    connections,
+    transaction
+)
+
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def read_alias():
+    """Return the database reads are sent to, None for the default."""
+    return _read_alias.get()
+
+
+def set_read_alias(alias):
+    """Send the reads of this thread or task to a database, returning
+    a token for reset_read_alias()."""
+    return _read_alias.set(alias)
+
+
+def reset_read_alias(token):
+    """Send reads back where they went before set_read_alias()."""
+    _read_alias.reset(token)
+
+
+@contextmanager
+def reading_from(alias):
+    """Send the reads within the block to a database."""
+    token = set_read_alias(alias)
+    try:
+        yield
+    finally:
+        reset_read_alias(token)
+
+
+class ReplicaRouter:
+    """Read from the database chosen by reading_from(), if any, and
+    write to the default one, which the replicas follow."""
+
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the default database.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaSelector:
+    """Choose a replica which is not lagging, unless the user wrote
+    lately and should read their writes from the primary.
+
+    Who wrote lately must be seen by every process serving the API, so
+    reads stay on the primary unless a cache alias is configured.
+    """
+    sticky_prefix = 'replica:sticky:'
+
+    def __init__(self):
+        self._lags = {}
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return settings.READ_REPLICAS
+
+    @property
+    def enabled(self):
+        """Return whether replicas and a shared cache are configured."""
+        return bool(self.config['ALIASES'] and self.config['CACHE'])
+
+    @property
+    def cache(self):
+        """Return the cache backend remembering who wrote lately."""
+        return caches[self.config['CACHE']]
+
+    def _mark(self, user_id):
+        self.cache.set(
+            f'{self.sticky_prefix}{user_id}',
+            True,
+            self.config['STICKY_SECONDS']
+        )
+
+    def mark_written(self, user_id):
+        """Keep a user reading from the primary for the sticky window.
+
+        Inside a transaction the window starts again on commit, which
+        is when replicas begin to receive the write.
+        """
+        if not self.enabled:
+            return
+        self._mark(user_id)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self._mark(user_id))
+
+    def is_sticky(self, user_id):
+        """Return whether a user wrote within the sticky window."""
+        return bool(self.cache.get(f'{self.sticky_prefix}{user_id}'))
+
+    def _measure_lag(self, alias):
+        """Return the seconds a replica is behind, None when unknown."""
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            return 0
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(LAG_SQL)
+                lag = cursor.fetchone()[0]
+        except DatabaseError:
+            return None
+        return None if lag is None else float(lag)
+
+    def lag(self, alias):
+        """Return the lag of a replica, measured at most once per check
+        interval in each process."""
+        now = time.monotonic()
+        with self._lock:
+            checked_at, lag = self._lags.get(alias, (None, None))
+        if checked_at is None or (
+            now - checked_at >= self.config['LAG_CHECK_INTERVAL']
+        ):
+            lag = self._measure_lag(alias)
+            with self._lock:
+                self._lags[alias] = (now, lag)
+        return lag
+
+    def choose(self, user_id=None):
+        """Return a replica to read from, or None for the primary.
+
+        Reads within a transaction stay on the primary, which alone
+        sees the rows it wrote so far.
+        """
+        if (
+            not self.enabled
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return None
+        if user_id is not None and self.is_sticky(user_id):
+            return None
+        max_lag = self.config['MAX_LAG_SECONDS']
+        healthy = []
+        for alias in self.config['ALIASES']:
+            lag = self.lag(alias)
+            if lag is not None and lag <= max_lag:
+                healthy.append(alias)
+        return random.choice(healthy) if healthy else None
+
+    def reset(self):
+        """Forget the measured lags."""
+        with self._lock:
+            self._lags.clear()
+
+
+replicas = ReplicaSelector()
@@ -0,0 +1,101 @@
+"""
+Django command to load test API endpoints over HTTP.
+"""
+import math
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError
+)
+
+
+def percentile(sorted_values, share):
+    """Return the nearest-rank percentile of sorted values."""
+    rank = max(1, math.ceil(share * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Command(BaseCommand):
+    """Django command to compare deployments under concurrent load.
+
+    Run it against the same endpoint of a WSGI and an ASGI deployment
+    given the same memory, e.g. uWSGI with 4 workers against one ASGI
+    process with ASYNC_API=1, and compare throughput and p99 latency
+    as concurrency grows.
+    """
+    help = 'Send concurrent GET requests and report latency percentiles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='URLs to request.')
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=1000,
+            help='Requests per URL.'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Requests in flight at once.'
+        )
+        parser.add_argument(
+            '--token',
+            help='API token sent in the Authorization header.'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=30,
+            help='Seconds to wait for each response.'
+        )
+
+    def _fetch(self, url, headers, timeout):
+        """Return the seconds a request took and whether it succeeded."""
+        request = urllib.request.Request(url, headers=headers)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as res:
+                res.read()
+                ok = res.status < 400
+        except (urllib.error.URLError, OSError):
+            ok = False
+        return time.perf_counter() - started, ok
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('Requests and concurrency must be positive.')
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+
+        for url in options['urls']:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(options['concurrency']) as executor:
+                results = list(executor.map(
+                    lambda _: self._fetch(url, headers, options['timeout']),
+                    range(options['requests'])
+                ))
+            elapsed = time.perf_counter() - started
+            latencies = sorted(seconds * 1000 for seconds, _ in results)
+            errors = sum(1 for _, ok in results if not ok)
+
+            self.stdout.write(url)
+            self.stdout.write(
+                f'  {len(results)} requests, {errors} errors, '
+                f'concurrency {options["concurrency"]}'
+            )
+            self.stdout.write(
+                f'  throughput {len(results) / elapsed:.1f} req/s'
+            )
+            self.stdout.write('  latency ms ' + '  '.join(
+                f'{label} {percentile(latencies, share):.1f}'
+                for label, share in (
+                    ('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1)
+                )
+            ))
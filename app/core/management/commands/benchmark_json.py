@@ -0,0 +1,131 @@
+"""
+Django command to compare the JSON renderers and parsers of the API.
+"""
+import io
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError
+)
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from recipe.parsers import FastJSONParser
+from recipe.renderers import (
+    FastJSONRenderer,
+    orjson
+)
+
+
+def recipe_payload(count, decimal_prices=False):
+    """Return a page of recipes shaped like the list response."""
+    results = []
+    for index in range(count):
+        price = Decimal(index % 10000) / 100
+        results.append({
+            'id': index + 1,
+            'title': f'Recipe {index} with crème fraîche',
+            'time_minutes': index % 240,
+            'price': price if decimal_prices else f'{price:.2f}',
+            'link': f'https://example.com/recipes/{index}',
+            'tags': [
+                {'id': tag, 'name': f'Tag {tag}', 'recipe_count': 42}
+                for tag in range(index % 4)
+            ],
+            'ingredients': [
+                {'id': item, 'name': f'Ingredient {item}', 'recipe_count': 7}
+                for item in range(index % 6)
+            ],
+        })
+    return {'next': None, 'previous': None, 'results': results}
+
+
+def measure(func, repeat):
+    """Return the best seconds of func() over repeat runs and the peak
+    bytes Python allocated during one run."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    try:
+        func()
+        _size, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+class Command(BaseCommand):
+    """Django command to benchmark JSON rendering and parsing."""
+    help = 'Render and parse a large recipe list with each JSON backend.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=10000,
+            help='Recipes in the payload.'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs of each backend, the fastest being reported.'
+        )
+        parser.add_argument(
+            '--decimal',
+            action='store_true',
+            help='Leave prices as Decimal instead of serialized strings.'
+        )
+
+    def _report(self, label, seconds, peak, size=None):
+        line = f'  {label:<18} {seconds * 1000:9.1f} ms'
+        line += f' {peak / 2**20:9.1f} MiB'
+        if size is not None:
+            line += f' {size / 2**20:9.1f} MiB out'
+        self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['recipes'] < 1 or options['repeat'] < 1:
+            raise CommandError('Recipes and repeat must be positive.')
+        payload = recipe_payload(options['recipes'], options['decimal'])
+        self.stdout.write(
+            f'{options["recipes"]} recipes, orjson '
+            f'{orjson.__version__ if orjson else "not installed"}'
+        )
+
+        self.stdout.write('Render')
+        bodies = {}
+        for label, renderer in (
+            ('JSONRenderer', JSONRenderer()),
+            ('FastJSONRenderer', FastJSONRenderer()),
+        ):
+            bodies[label] = renderer.render(payload, 'application/json')
+            seconds, peak = measure(
+                lambda: renderer.render(payload, 'application/json'),
+                options['repeat']
+            )
+            self._report(label, seconds, peak, len(bodies[label]))
+        identical = 'yes' if len(set(bodies.values())) == 1 else 'no'
+        self.stdout.write(f'  identical output: {identical}')
+
+        self.stdout.write('Parse')
+        body = bodies['JSONRenderer']
+        for label, parser in (
+            ('JSONParser', JSONParser()),
+            ('FastJSONParser', FastJSONParser()),
+        ):
+            seconds, peak = measure(
+                lambda: parser.parse(io.BytesIO(body), 'application/json'),
+                options['repeat']
+            )
+            self._report(label, seconds, peak)
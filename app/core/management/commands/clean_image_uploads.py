@@ -0,0 +1,29 @@
+"""
+Django command to delete abandoned image uploads and unused image files
+and fail lost jobs.
+"""
+from django.core.management.base import BaseCommand
+
+from recipe.images import image_pipeline
+from recipe.uploads import chunked_uploads
+
+
+class Command(BaseCommand):
+    """Django command to collect idle uploads, staged files, image
+    jobs lost with the process running them and replaced images."""
+    help = (
+        'Delete resumable image uploads which were never finalized and '
+        'staged images never processed, and fail their recipe images. '
+        'Delete stored images and resized copies no recipe uses.'
+    )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        expired, removed = chunked_uploads.collect_garbage()
+        failed, orphaned = image_pipeline.collect_stale()
+        unused = image_pipeline.collect_unused()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {expired} expired uploads and {removed + orphaned} '
+            f'staged files, failed {failed} stale image jobs, deleted '
+            f'{unused} unused image files.'
+        ))
@@ -0,0 +1,70 @@
+"""
+Django command to bulk import recipes from NDJSON or CSV.
+"""
+import io
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError
+)
+
+from recipe.importer import (
+    RecipeImporter,
+    read_ndjson,
+    read_csv
+)
+
+
+class Command(BaseCommand):
+    """Django command to import recipes for a user."""
+    help = 'Import recipes for a user from an NDJSON or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email of the owning user.')
+        parser.add_argument('path', help="Input file, or '-' for stdin.")
+        parser.add_argument(
+            '--input-format',
+            choices=['ndjson', 'csv'],
+            help='Defaults to the file extension, else ndjson.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['email']} does not exist.")
+
+        path = options['path']
+        input_format = options['input_format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson'
+        )
+        reader = read_csv if input_format == 'csv' else read_ndjson
+        importer = RecipeImporter(
+            user,
+            chunk_size=options['chunk_size'],
+            progress=self._report_progress
+        )
+        if path == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+            result = importer.run(reader(stream))
+        else:
+            with open(path, newline='', encoding='utf-8') as stream:
+                result = importer.run(reader(stream))
+
+        for error in result.errors[:20]:
+            self.stderr.write(f"Line {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.created} recipes, '
+            f'{result.failed} rows failed.'
+        ))
+
+    def _report_progress(self, result):
+        """Write the running totals after each chunk."""
+        self.stdout.write(
+            f'Processed {result.processed} rows '
+            f'({result.created} imported, {result.failed} failed)...'
+        )
@@ -0,0 +1,43 @@
+"""
+Django command to check and rebuild the recipe counts of tags and
+ingredients.
+"""
+from django.core.management.base import (
+    BaseCommand,
+    CommandError
+)
+
+from recipe.counters import (
+    COUNTED_FIELDS,
+    drifted,
+    rebuild_recipe_counts
+)
+
+
+class Command(BaseCommand):
+    """Django command to recount the recipes of tags and ingredients."""
+    help = 'Rebuild the recipe counts of tags and ingredients.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drifted counts, failing if there are any.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        total = 0
+        for field_name, model in COUNTED_FIELDS.items():
+            label = model._meta.verbose_name_plural
+            if options['check']:
+                count = drifted(field_name).count()
+                self.stdout.write(f'{count} {label} have drifted counts.')
+            else:
+                count = rebuild_recipe_counts(field_name)
+                self.stdout.write(f'Fixed {count} {label}.')
+            total += count
+
+        if options['check'] and total:
+            raise CommandError(f'{total} recipe counts have drifted.')
+        self.stdout.write(self.style.SUCCESS('Recipe counts are correct.'))
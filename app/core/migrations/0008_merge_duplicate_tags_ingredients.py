@@ -0,0 +1,59 @@
+# Generated by Django 3.2.25 on 2026-10-17 10:00
+
+from django.db import migrations
+from django.db.models import (
+    Count,
+    Min
+)
+
+
+def merge_duplicates(apps, model_name, field_name):
+    """Point recipes at the oldest of each (user, name) duplicate
+    and delete the others."""
+    model = apps.get_model('core', model_name)
+    through = apps.get_model('core', 'Recipe')._meta.get_field(
+        field_name
+    ).remote_field.through
+    related_field = f'{model_name.lower()}_id'
+    duplicates = (
+        model.objects.values('user_id', 'name')
+        .annotate(keep_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for group in duplicates.iterator():
+        dropped_ids = list(
+            model.objects.filter(user_id=group['user_id'], name=group['name'])
+            .exclude(id=group['keep_id'])
+            .values_list('id', flat=True)
+        )
+        linked = set(
+            through.objects.filter(**{related_field: group['keep_id']})
+            .values_list('recipe_id', flat=True)
+        )
+        moved = set(
+            through.objects.filter(**{f'{related_field}__in': dropped_ids})
+            .values_list('recipe_id', flat=True)
+        ) - linked
+        through.objects.bulk_create([
+            through(recipe_id=recipe_id, **{related_field: group['keep_id']})
+            for recipe_id in moved
+        ])
+        model.objects.filter(id__in=dropped_ids).delete()
+
+
+def merge_duplicate_names(apps, schema_editor):
+    merge_duplicates(apps, 'Tag', 'tags')
+    merge_duplicates(apps, 'Ingredient', 'ingredients')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_names, migrations.RunPython.noop
+        ),
+    ]
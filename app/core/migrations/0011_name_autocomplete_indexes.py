@@ -0,0 +1,60 @@
+# Generated by Django 3.2.25 on 2026-10-17 12:00
+
+from django.db import migrations
+
+
+NAME_TABLES = {
+    'core_tag': 'core_tag',
+    'core_ingredient': 'core_ingr',
+}
+
+
+def has_trigram_extension(schema_editor):
+    """Return whether pg_trgm is installed or can be installed."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        return cursor.fetchone() is not None
+
+
+def create_name_indexes(apps, schema_editor):
+    """Prefix and trigram indexes, which only PostgreSQL supports.
+
+    Both index the expression Django emits for istartswith/icontains.
+    The trigram index is skipped when the server lacks pg_trgm.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, prefix in NAME_TABLES.items():
+        schema_editor.execute(
+            f'CREATE INDEX {prefix}_user_name_prefix_idx ON {table} '
+            '(user_id, (UPPER(name::text)) text_pattern_ops)'
+        )
+    if not has_trigram_extension(schema_editor):
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, prefix in NAME_TABLES.items():
+        schema_editor.execute(
+            f'CREATE INDEX {prefix}_name_trgm_idx ON {table} '
+            'USING gin ((UPPER(name::text)) gin_trgm_ops)'
+        )
+
+
+def drop_name_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for prefix in NAME_TABLES.values():
+        schema_editor.execute(f'DROP INDEX {prefix}_user_name_prefix_idx')
+        schema_editor.execute(f'DROP INDEX IF EXISTS {prefix}_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_name_indexes, drop_name_indexes),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 3.2.25 on 2026-10-17 07:15
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_recipe_counts(apps, schema_editor):
+    """Count the recipes of every existing tag and ingredient."""
+    Recipe = apps.get_model('core', 'Recipe')
+    for field_name, model_name in (
+        ('tags', 'Tag'), ('ingredients', 'Ingredient')
+    ):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field_name).through
+        column = f'{model_name.lower()}_id'
+        links = through.objects.filter(
+            **{column: OuterRef('pk')}
+        ).order_by().values(column).annotate(
+            links=Count('id')
+        ).values('links')
+        model.objects.update(recipe_count=Coalesce(
+            Subquery(links, output_field=IntegerField()), Value(0)
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_name_autocomplete_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            backfill_recipe_counts, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', '-recipe_count', '-id'], name='core_ingr_user_count_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-recipe_count', '-id'], name='core_tag_user_count_desc_idx'),
+        ),
+    ]
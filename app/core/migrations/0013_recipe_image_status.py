@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-17 07:23
+
+from django.db import migrations, models
+
+
+def mark_existing_images_ready(apps, schema_editor):
+    """Images saved before the pipeline existed are already usable."""
+    Recipe = apps.get_model('core', 'Recipe')
+    Recipe.objects.exclude(image__isnull=True).exclude(image='').update(
+        image_status='ready'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_status',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='', editable=False, max_length=10),
+        ),
+        migrations.RunPython(
+            mark_existing_images_ready, migrations.RunPython.noop
+        ),
+    ]
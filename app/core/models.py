@@ -5,6 +5,7 @@ import uuid
 import os
 
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import (
     BaseUserManager,
@@ -56,8 +57,16 @@ class User(AbstractBaseUser, PermissionsMixin):
 
 class Recipe(models.Model):
     """Recipe model which defines recipe attributes."""
+
+    class ImageStatus(models.TextChoices):
+        NONE = '', 'None'
+        PENDING = 'pending', 'Pending'
+        PROCESSING = 'processing', 'Processing'
+        READY = 'ready', 'Ready'
+        FAILED = 'failed', 'Failed'
+
     user = models.ForeignKey(
-        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False
     )
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -67,6 +76,34 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # Set by recipe.images while an upload waits for or goes through
+    # the background worker pool.
+    image_status = models.CharField(
+        max_length=10,
+        choices=ImageStatus.choices,
+        default=ImageStatus.NONE,
+        blank=True,
+        editable=False
+    )
+    # Width -> format -> storage name of the resized copies of image,
+    # written by recipe.images.
+    image_derivatives = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by recipe.search on PostgreSQL, GIN indexed there.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        # Leads with user_id, so it also serves the foreign key.
+        indexes = [
+            models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_user_id_desc_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -76,9 +113,31 @@ class Tag(models.Model):
     """Models for tag to filtering recipes by them."""
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
     name = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by recipe.counters from the M2M and bulk write signals.
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_tag_user_name_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-name', '-id'],
+                name='core_tag_user_name_desc_idx'
+            ),
+            models.Index(
+                fields=['user', '-recipe_count', '-id'],
+                name='core_tag_user_count_desc_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -87,9 +146,59 @@ class Tag(models.Model):
 class Ingredient(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
     name = models.CharField(max_length=250)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by recipe.counters from the M2M and bulk write signals.
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_ingredient_user_name_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-name', '-id'],
+                name='core_ingr_user_name_desc_idx'
+            ),
+            models.Index(
+                fields=['user', '-recipe_count', '-id'],
+                name='core_ingr_user_count_desc_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class ImageUpload(models.Model):
+    """Resumable upload of a recipe image, sent in chunks."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
+    size = models.PositiveBigIntegerField()
+    # Bytes received so far, where the next chunk must start.
+    offset = models.PositiveBigIntegerField(default=0)
+    # Optional hex digest of the whole file, checked when finalized.
+    sha256 = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['updated_at'],
+                name='core_imageupload_updated_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.offset}/{self.size}'
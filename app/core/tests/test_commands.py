@@ -1,13 +1,38 @@
 """
 Test custom django management commands
 """
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.utils import timezone
+from django.test import (
+    LiveServerTestCase,
+    SimpleTestCase,
+    TestCase
+)
+
+from rest_framework.authtoken.models import Token
+
+from core.models import (
+    Recipe,
+    Tag,
+    ImageUpload
+)
+
+from recipe.images import image_pipeline
+from recipe.uploads import chunked_uploads
 
 
 @patch("core.management.commands.wait_for_db.Command.check")
@@ -31,3 +56,188 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class ImportRecipesCommandTests(TestCase):
+    """Test the import_recipes command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'U123@example'
+        )
+
+    def test_import_recipes_from_file(self):
+        """Test importing recipes from an NDJSON file."""
+        rows = [
+            {'title': 'A', 'time_minutes': 5, 'price': '1.50'},
+            {'title': 'B', 'time_minutes': 5, 'price': '2.50'},
+        ]
+        out = StringIO()
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as f:
+            f.write(''.join(json.dumps(row) + '\n' for row in rows))
+            f.flush()
+            call_command(
+                'import_recipes', self.user.email, f.name,
+                '--chunk-size', '1', stdout=out
+            )
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+        self.assertIn('Processed 1 rows', out.getvalue())
+        self.assertIn('Imported 2 recipes', out.getvalue())
+
+    def test_import_recipes_unknown_user(self):
+        """Test importing for an unknown user raises CommandError."""
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', 'nobody@example.com', '-')
+
+
+class RebuildRecipeCountsCommandTests(TestCase):
+    """Test the rebuild_recipe_counts command."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'U123@example'
+        )
+        self.tag = Tag.objects.create(user=user, name='Vegan')
+        recipe = Recipe.objects.create(
+            user=user, title='Curry', time_minutes=5, price='1.50'
+        )
+        recipe.tags.add(self.tag)
+        Tag.objects.filter(id=self.tag.id).update(recipe_count=7)
+
+    def test_check_reports_drift(self):
+        """Test --check fails on drifted counts without fixing them."""
+        out = StringIO()
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_recipe_counts', '--check', stdout=out)
+
+        self.assertIn('1 tags have drifted counts.', out.getvalue())
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, 7)
+
+    def test_rebuild_fixes_drift(self):
+        """Test rebuilding recounts drifted rows."""
+        out = StringIO()
+
+        call_command('rebuild_recipe_counts', stdout=out)
+
+        self.assertIn('Fixed 1 tags.', out.getvalue())
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, 1)
+        call_command('rebuild_recipe_counts', '--check', stdout=out)
+
+
+class CleanImageUploadsCommandTests(TestCase):
+    """Test the clean_image_uploads command."""
+
+    def setUp(self):
+        staging_root = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, staging_root)
+        override = self.settings(RECIPE_IMAGES={
+            **settings.RECIPE_IMAGES,
+            'STAGING_ROOT': staging_root,
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_idle_uploads_deleted(self):
+        """Test uploads idle past the TTL are deleted with their files."""
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'U123@example'
+        )
+        recipe = Recipe.objects.create(
+            user=user, title='Curry', time_minutes=5, price='1.50'
+        )
+        upload = chunked_uploads.create(user, recipe, size=10)
+        staged_path = chunked_uploads.staging.path(
+            chunked_uploads.staged_name(upload)
+        )
+        idle_since = timezone.now() - timedelta(days=2)
+        ImageUpload.objects.update(updated_at=idle_since)
+        os.utime(staged_path, (idle_since.timestamp(),) * 2)
+        out = StringIO()
+
+        call_command('clean_image_uploads', stdout=out)
+
+        self.assertIn('Deleted 1 expired uploads and 1 staged files',
+                      out.getvalue())
+        self.assertFalse(ImageUpload.objects.exists())
+        self.assertFalse(os.path.exists(staged_path))
+        os.rmdir(os.path.dirname(staged_path))
+
+    def test_lost_image_jobs_failed(self):
+        """Test images left pending by a dead process are failed and
+        their staged files deleted, leaving recent ones alone."""
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'U123@example'
+        )
+        lost, recent = [
+            Recipe.objects.create(
+                user=user, title=title, time_minutes=5, price='1.50',
+                image_status=Recipe.ImageStatus.PENDING
+            )
+            for title in ('Lost', 'Recent')
+        ]
+        staging = image_pipeline.staging
+        lost_name = staging.save('lost.jpg', ContentFile(b'jpeg'))
+        recent_name = staging.save('recent.jpg', ContentFile(b'jpeg'))
+        self.addCleanup(staging.delete, recent_name)
+        lost_since = timezone.now() - timedelta(
+            seconds=settings.RECIPE_IMAGES['JOB_TIMEOUT'] + 60
+        )
+        Recipe.objects.filter(id=lost.id).update(updated_at=lost_since)
+        os.utime(staging.path(lost_name), (lost_since.timestamp(),) * 2)
+        out = StringIO()
+
+        call_command('clean_image_uploads', stdout=out)
+
+        self.assertIn('failed 1 stale image jobs', out.getvalue())
+        lost.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertEqual(lost.image_status, Recipe.ImageStatus.FAILED)
+        self.assertEqual(recent.image_status, Recipe.ImageStatus.PENDING)
+        self.assertFalse(staging.exists(lost_name))
+        self.assertTrue(staging.exists(recent_name))
+
+
+class BenchmarkApiCommandTests(LiveServerTestCase):
+    """Test the benchmark_api command."""
+
+    def test_benchmark_reports_percentiles(self):
+        """Test requests are counted and their latency reported."""
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'U123@example'
+        )
+        token = Token.objects.create(user=user)
+        url = f'{self.live_server_url}/api/recipe/recipes/'
+        out = StringIO()
+
+        call_command(
+            'benchmark_api', url, '--requests', '6', '--concurrency', '3',
+            '--token', token.key, stdout=out
+        )
+
+        output = out.getvalue()
+        self.assertIn('6 requests, 0 errors, concurrency 3', output)
+        self.assertIn('p99', output)
+
+
+class BenchmarkJsonCommandTests(SimpleTestCase):
+    """Test the benchmark_json command."""
+
+    def test_benchmark_reports_each_backend(self):
+        """Test every renderer and parser is timed on the payload."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_json', '--recipes', '20', '--repeat', '1',
+            '--decimal', stdout=out
+        )
+
+        output = out.getvalue()
+        self.assertIn('20 recipes', output)
+        for label in ('JSONRenderer', 'FastJSONRenderer', 'JSONParser',
+                      'FastJSONParser'):
+            self.assertIn(f'  {label} ', output)
+        self.assertIn('identical output: yes', output)
@@ -0,0 +1,228 @@
+"""
+Tests for the database connection pool.
+"""
+import threading
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase
+)
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db.pool import (
+    ConnectionPool,
+    PoolTimeout,
+    pools
+)
+
+
+POOL_STATS_URL = reverse('db-pool-stats')
+
+
+class FakeConnection:
+    """Connection recording how the pool treated it."""
+
+    def __init__(self):
+        self.alive = True
+        self.resettable = True
+        self.closed = False
+
+
+class FakePool(ConnectionPool):
+    """Pool of fake connections."""
+
+    def _check(self, connection):
+        return connection.alive
+
+    def _reset(self, connection):
+        return connection.resettable
+
+    def _close(self, connection):
+        connection.closed = True
+
+
+def create_pool(**params):
+    """Create and return a pool of fake connections."""
+    defaults = {
+        'max_size': 2,
+        'max_lifetime': 60,
+        'check_after': 60,
+        'timeout': 1,
+    }
+    defaults.update(params)
+    return FakePool(**defaults)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test connections are lent, reused and closed."""
+
+    def test_released_connection_reused(self):
+        """Test a released connection is lent again."""
+        pool = create_pool()
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn)
+
+        self.assertIs(pool.acquire(FakeConnection), conn)
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['reused']), (1, 1))
+        self.assertEqual((stats['size'], stats['lent']), (1, 1))
+
+    def test_full_pool_times_out(self):
+        """Test acquiring waits for a release up to the timeout."""
+        pool = create_pool(max_size=1, timeout=0.05)
+        pool.acquire(FakeConnection)
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_released_connection(self):
+        """Test a waiting thread is handed a released connection."""
+        pool = create_pool(max_size=1)
+        conn = pool.acquire(FakeConnection)
+        acquired = []
+        waiter = threading.Thread(
+            target=lambda: acquired.append(pool.acquire(FakeConnection))
+        )
+        waiter.start()
+
+        pool.release(conn)
+        waiter.join(5)
+
+        self.assertEqual(acquired, [conn])
+
+    def test_old_connections_closed(self):
+        """Test connections past their lifetime are not reused."""
+        pool = create_pool(max_lifetime=0)
+        conn = pool.acquire(FakeConnection)
+
+        pool.release(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_idle_connection_checked(self):
+        """Test a connection idle too long is checked before reuse."""
+        pool = create_pool(check_after=0)
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn)
+        conn.alive = False
+
+        fresh = pool.acquire(FakeConnection)
+
+        self.assertIsNot(fresh, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['failed_checks'], 1)
+
+    def test_unresettable_connection_closed(self):
+        """Test a connection which cannot be reset is closed."""
+        pool = create_pool()
+        conn = pool.acquire(FakeConnection)
+        conn.resettable = False
+
+        pool.release(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['idle'], 0)
+
+    def test_forked_child_forgets_connections(self):
+        """Test a child process never reuses nor closes inherited ones."""
+        pool = create_pool()
+        lent = pool.acquire(FakeConnection)
+        idle = pool.acquire(FakeConnection)
+        pool.release(idle)
+
+        with patch('core.db.pool.os.getpid', return_value=-1):
+            conn = pool.acquire(FakeConnection)
+            pool.release(lent)
+            stats = pool.stats()
+
+        self.assertNotIn(conn, (lent, idle))
+        self.assertFalse(lent.closed or idle.closed)
+        self.assertEqual((stats['size'], stats['created']), (1, 1))
+
+    def test_threads_never_exceed_max_size(self):
+        """Test concurrent threads share at most max_size connections."""
+        pool = create_pool(max_size=3, timeout=5)
+        lock = threading.Lock()
+        lent = set()
+        peak = []
+
+        def work():
+            for _ in range(50):
+                conn = pool.acquire(FakeConnection)
+                with lock:
+                    lent.add(conn)
+                    peak.append(len(lent))
+                with lock:
+                    lent.discard(conn)
+                pool.release(conn)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+        stats = pool.stats()
+        self.assertLessEqual(max(peak), 3)
+        self.assertLessEqual(stats['created'], 3)
+        self.assertEqual(stats['lent'], 0)
+        self.assertEqual(stats['created'] + stats['reused'], 400)
+
+
+@skipUnless(
+    connection.settings_dict['ENGINE'] == 'core.db',
+    'Needs the pooled PostgreSQL backend.'
+)
+class PooledBackendTests(TransactionTestCase):
+    """Test Django closing a connection hands it back to the pool."""
+
+    def backend_pid(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            return cursor.fetchone()[0]
+
+    def test_closed_connection_reused(self):
+        """Test the server session survives Django closing it."""
+        pid = self.backend_pid()
+
+        connection.close()
+
+        self.assertEqual(self.backend_pid(), pid)
+        self.assertIn(
+            connection.alias, [stats['alias'] for stats in pools.stats()]
+        )
+
+
+class DatabasePoolStatsApiTests(TestCase):
+    """Test the pool stats endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_stats_for_staff_only(self):
+        """Test only staff users see the pool stats."""
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'U123@example'
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(POOL_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        user.is_staff = True
+        res = self.client.get(POOL_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data['pools'], list)
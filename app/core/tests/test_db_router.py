@@ -0,0 +1,108 @@
+"""
+Tests for the read replica database router.
+"""
+from unittest.mock import patch
+
+from django.conf import settings
+from django.test import (
+    SimpleTestCase,
+    override_settings
+)
+
+from core.db.router import (
+    ReplicaRouter,
+    read_alias,
+    reading_from,
+    replicas
+)
+from core.models import Recipe
+
+
+@override_settings(READ_REPLICAS={
+    **settings.READ_REPLICAS,
+    'ALIASES': ['replica_0', 'replica_1'],
+    'CACHE': 'default',
+    'MAX_LAG_SECONDS': 5,
+    'LAG_CHECK_INTERVAL': 60,
+})
+class ReplicaSelectorTests(SimpleTestCase):
+    """Test choosing a replica to read from."""
+
+    def setUp(self):
+        replicas.reset()
+        replicas.cache.clear()
+
+    def measure(self, **lags):
+        """Patch the measured lag of each replica."""
+        return patch.object(
+            replicas, '_measure_lag', side_effect=lambda alias: lags[alias]
+        )
+
+    def test_lagging_replicas_skipped(self):
+        """Test replicas too far behind or unreachable are not chosen."""
+        with self.measure(replica_0=30.0, replica_1=None):
+            self.assertIsNone(replicas.choose())
+
+        replicas.reset()
+        with self.measure(replica_0=30.0, replica_1=0.5):
+            self.assertEqual(replicas.choose(), 'replica_1')
+
+    def test_lag_measured_once_per_interval(self):
+        """Test the lag of a replica is reused within the interval."""
+        with self.measure(replica_0=0, replica_1=0) as measure:
+            for _ in range(5):
+                replicas.choose()
+
+        self.assertEqual(measure.call_count, 2)
+
+    def test_user_who_wrote_reads_from_primary(self):
+        """Test a user sticks to the primary after writing."""
+        replicas.mark_written(1)
+
+        with self.measure(replica_0=0, replica_1=0):
+            self.assertIsNone(replicas.choose(1))
+            self.assertIn(replicas.choose(2), ['replica_0', 'replica_1'])
+
+    def test_no_shared_cache(self):
+        """Test the primary serves reads when who wrote lately could
+        only be known to one process."""
+        with self.settings(READ_REPLICAS={
+            **settings.READ_REPLICAS, 'CACHE': None
+        }), self.measure(replica_0=0, replica_1=0) as measure:
+            replicas.mark_written(1)
+            self.assertIsNone(replicas.choose(2))
+
+        measure.assert_not_called()
+        self.assertFalse(replicas.is_sticky(1))
+
+    @override_settings(READ_REPLICAS={
+        **settings.READ_REPLICAS, 'ALIASES': []
+    })
+    def test_no_replicas(self):
+        """Test the primary serves reads without replicas."""
+        with self.measure() as measure:
+            self.assertIsNone(replicas.choose(1))
+
+        measure.assert_not_called()
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """Test routing reads and writes."""
+
+    def test_reads_follow_reading_from(self):
+        """Test reads go to the chosen database within the block only."""
+        router = ReplicaRouter()
+
+        with reading_from('replica_0'):
+            self.assertEqual(router.db_for_read(Recipe), 'replica_0')
+            self.assertEqual(router.db_for_write(Recipe), 'default')
+
+        self.assertIsNone(read_alias())
+        self.assertIsNone(router.db_for_read(Recipe))
+
+    def test_migrations_on_primary_only(self):
+        """Test replicas are never migrated."""
+        router = ReplicaRouter()
+
+        self.assertTrue(router.allow_migrate('default', 'core'))
+        self.assertFalse(router.allow_migrate('replica_0', 'core'))
@@ -1,9 +1,20 @@
 """
 Tests for models.
 """
+from unittest import skipUnless
 from unittest.mock import patch
 from decimal import Decimal
 
+from django.contrib.postgres.search import SearchQuery
+
+from django.db import (
+    connection,
+    IntegrityError
+)
+from django.db.models import (
+    Exists,
+    OuterRef
+)
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -95,6 +106,39 @@ class TestModels(TestCase):
             name='Ingredient1').exists()
         )
 
+    def test_recipe_tracks_updated_at(self):
+        """Test saving a recipe refreshes its updated_at timestamp."""
+        recipe = models.Recipe.objects.create(
+            user=create_user(),
+            title='test',
+            time_minutes=5,
+            price=Decimal('5.50')
+        )
+        created_at = recipe.updated_at
+        recipe.title = 'changed'
+        recipe.save()
+
+        self.assertGreater(recipe.updated_at, created_at)
+
+    def test_tag_name_unique_per_user(self):
+        """Test a user cannot have two tags with the same name."""
+        user = create_user()
+        models.Tag.objects.create(user=user, name='Vegan')
+        models.Tag.objects.create(
+            user=create_user(email='other@example.com'), name='Vegan'
+        )
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='Vegan')
+
+    def test_ingredient_name_unique_per_user(self):
+        """Test a user cannot have two ingredients with the same name."""
+        user = create_user()
+        models.Ingredient.objects.create(user=user, name='Salt')
+
+        with self.assertRaises(IntegrityError):
+            models.Ingredient.objects.create(user=user, name='Salt')
+
     @patch('core.models.uuid.uuid4')
     def test_recipe_file_name_uuid(self, mock_uuid):
         """Test generating image path."""
@@ -103,3 +147,97 @@ class TestModels(TestCase):
         file_path = models.recipe_image_file_path(None, 'example.jpg')
 
         self.assertEqual(file_path, f'uploads/recipe/{uuid}.jpg')
+
+
+class IndexPlanTests(TestCase):
+    """Test the planner serves the hot queries from the indexes."""
+
+    def setUp(self):
+        self.user = create_user()
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be seq scanned.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('SET LOCAL enable_bitmapscan = off')
+
+    def assertUsesIndex(self, queryset, index_name):
+        """Assert the query plan of queryset mentions index_name."""
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_recipes_by_user_use_index(self):
+        """Test listing a user's recipes by -id uses the index."""
+        queryset = models.Recipe.objects.filter(
+            user=self.user
+        ).order_by('-id')
+
+        self.assertUsesIndex(queryset, 'core_recipe_user_id_desc_idx')
+
+    def test_tags_by_user_use_index(self):
+        """Test listing a user's tags by -name uses the index."""
+        queryset = models.Tag.objects.filter(
+            user=self.user
+        ).order_by('-name', '-id')
+
+        self.assertUsesIndex(queryset, 'core_tag_user_name_desc_idx')
+
+    def test_ingredients_by_user_use_index(self):
+        """Test listing a user's ingredients by -name uses the index."""
+        queryset = models.Ingredient.objects.filter(
+            user=self.user
+        ).order_by('-name', '-id')
+
+        self.assertUsesIndex(queryset, 'core_ingr_user_name_desc_idx')
+
+    def test_assigned_tags_use_through_index(self):
+        """Test the assigned_only semi-join probes the through index."""
+        links = models.Recipe.tags.through.objects.filter(
+            tag_id=OuterRef('pk')
+        )
+        queryset = models.Tag.objects.filter(
+            Exists(links), user=self.user
+        )
+
+        self.assertUsesIndex(queryset, 'core_recipe_tags_tag_id')
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only.')
+    def test_search_uses_gin_index(self):
+        """Test full-text search probes the GIN index."""
+        with connection.cursor() as cursor:
+            # GIN indexes are only read through bitmap scans.
+            cursor.execute('SET LOCAL enable_bitmapscan = on')
+        queryset = models.Recipe.objects.filter(
+            search_vector=SearchQuery('pasta', config='english')
+        )
+
+        self.assertUsesIndex(queryset, 'core_recipe_search_vector_gin')
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only.')
+    def test_name_prefix_uses_index(self):
+        """Test autocompleting a user's names by prefix uses the index."""
+        models.Ingredient.objects.bulk_create(
+            models.Ingredient(user=self.user, name=f'Name{i}')
+            for i in range(1000)
+        )
+        with connection.cursor() as cursor:
+            # Without statistics the unique index looks just as good.
+            cursor.execute('ANALYZE core_ingredient')
+        queryset = models.Ingredient.objects.filter(
+            user=self.user, name__istartswith='name1'
+        )
+
+        self.assertUsesIndex(queryset, 'core_ingr_user_name_prefix_idx')
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only.')
+    def test_name_contains_uses_trigram_index(self):
+        """Test matching inside names probes the trigram index."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            if cursor.fetchone() is None:
+                self.skipTest('pg_trgm is not installed.')
+            cursor.execute('SET LOCAL enable_bitmapscan = on')
+        queryset = models.Ingredient.objects.filter(name__icontains='pepp')
+
+        self.assertUsesIndex(queryset, 'core_ingr_name_trgm_idx')
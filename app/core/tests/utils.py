@@ -0,0 +1,41 @@
+"""
+Reusable helpers for tests.
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Assertions about the number of queries an endpoint issues."""
+
+    def assertQueryCountConstant(self, make_rows, request, sizes=(1, 5)):
+        """Assert that request() issues the same number of queries
+        no matter how many rows make_rows(n) has added before it."""
+        counts = []
+        created = 0
+        for size in sizes:
+            make_rows(size - created)
+            created = size
+            with CaptureQueriesContext(connection) as ctx:
+                request()
+            counts.append(len(ctx.captured_queries))
+
+        if len(set(counts)) != 1:
+            sizes_to_counts = ', '.join(
+                f'{size} rows: {count} queries'
+                for size, count in zip(sizes, counts)
+            )
+            self.fail(
+                f'Query count grows with result size ({sizes_to_counts}).'
+            )
+
+    def assertMaxQueries(self, budget, request):
+        """Assert that request() issues at most `budget` queries."""
+        with CaptureQueriesContext(connection) as ctx:
+            request()
+        count = len(ctx.captured_queries)
+        if count > budget:
+            queries = '\n'.join(q['sql'] for q in ctx.captured_queries)
+            self.fail(
+                f'{count} queries issued, budget is {budget}:\n{queries}'
+            )
@@ -0,0 +1,20 @@
+"""
+Views for the operational state of the service.
+"""
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from user.authentication import CachedTokenAuthentication
+
+from core.db.pool import pools
+
+
+class DatabasePoolStatsView(APIView):
+    """Report the database connection pools of the answering process."""
+    permission_classes = [permissions.IsAdminUser]
+    authentication_classes = [CachedTokenAuthentication]
+
+    def get(self, request):
+        """Return the stats of every pool of this process."""
+        return Response({'pools': pools.stats()})
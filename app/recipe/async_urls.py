@@ -0,0 +1,44 @@
+"""
+Async URL's for recipe API's, matched before the router when enabled.
+"""
+from django.urls import path
+
+from recipe import views
+from recipe.async_views import as_async_view
+
+
+list_actions = {'get': 'list', 'post': 'create'}
+# Tags and ingredients have no retrieve action.
+attr_detail_actions = {
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}
+detail_actions = {'get': 'retrieve', **attr_detail_actions}
+
+urlpatterns = [
+    path(
+        'recipes/',
+        as_async_view(views.RecipeApiViewSet, list_actions)
+    ),
+    path(
+        'recipes/<int:pk>/',
+        as_async_view(views.RecipeApiViewSet, detail_actions)
+    ),
+    path(
+        'tags/',
+        as_async_view(views.TagApiViewSet, {'get': 'list'})
+    ),
+    path(
+        'tags/<int:pk>/',
+        as_async_view(views.TagApiViewSet, attr_detail_actions)
+    ),
+    path(
+        'ingredients/',
+        as_async_view(views.IngredientApiViewSet, {'get': 'list'})
+    ),
+    path(
+        'ingredients/<int:pk>/',
+        as_async_view(views.IngredientApiViewSet, attr_detail_actions)
+    ),
+]
@@ -0,0 +1,59 @@
+"""
+Async views of the recipe API for ASGI deployments.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def db_executor():
+    """Return the thread pool running the views, created on first use
+    so each server process starts its own threads."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_API['THREADS'],
+                thread_name_prefix='recipe-api'
+            )
+        return _executor
+
+
+def as_async_view(viewset, actions):
+    """Return an async view serving the given actions of a viewset.
+
+    Django 3.2 has no async ORM and DRF no async views, so the actions
+    run unchanged on a bounded thread pool. Under an ASGI server the
+    event loop rather than a worker then waits on slow clients, and
+    Django does not serialize the sync views on its single thread.
+    """
+    view = viewset.as_view(actions)
+
+    def run(request, *args, **kwargs):
+        # Mirrors the request_started and request_finished handlers,
+        # which only ever run on Django's own thread.
+        close_old_connections()
+        try:
+            response = view(request, *args, **kwargs)
+            if callable(getattr(response, 'render', None)):
+                response.render()
+            return response
+        finally:
+            close_old_connections()
+
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            db_executor(), functools.partial(run, request, *args, **kwargs)
+        )
+
+    return async_view
@@ -0,0 +1,155 @@
+"""
+Per-user versioned response cache for recipe API's.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from rest_framework.response import Response
+
+from core.db.router import read_alias
+
+
+class ResponseCache:
+    """Cache list responses under a per-user data version.
+
+    Writes bump the user's version, so stale entries are never read
+    again and simply expire instead of being searched for and deleted.
+    Versions and responses must be shared by every process serving the
+    API, so nothing is cached unless a cache alias is configured.
+    """
+    version_prefix = 'recipe:version:'
+    response_prefix = 'recipe:response:'
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """Return whether a shared cache alias is configured."""
+        return bool(settings.RECIPE_RESPONSE_CACHE['CACHE'])
+
+    def can_store(self):
+        """Return whether a response built now may be cached.
+
+        Not when read from a replica, which may not have the writes the
+        user's current version stands for yet.
+        """
+        return self.enabled and read_alias() is None
+
+    @property
+    def cache(self):
+        """Return the configured cache backend."""
+        return caches[settings.RECIPE_RESPONSE_CACHE['CACHE']]
+
+    def _version_key(self, user_id):
+        return f'{self.version_prefix}{user_id}'
+
+    def data_version(self, user_id):
+        """Return the current data version of a user."""
+        key = self._version_key(user_id)
+        version = self.cache.get(key)
+        if version is None:
+            # Seed from the clock so an evicted counter never goes back
+            # to a version that old responses were cached under.
+            self.cache.add(key, time.time_ns(), None)
+            version = self.cache.get(key)
+
+        return version
+
+    def _bump(self, user_id):
+        key = self._version_key(user_id)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, time.time_ns(), None)
+
+    def bump_version(self, user_id):
+        """Invalidate every cached response of a user.
+
+        Inside a transaction the version is bumped again on commit, as
+        a read in between may cache the rows as they were before it
+        under the first new version.
+        """
+        if not self.enabled:
+            return
+        self._bump(user_id)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self._bump(user_id))
+
+    def key_for(self, request, list_params=(), exclude_params=()):
+        """Build a cache key from the user, path, params and version."""
+        params = []
+        for name in sorted(request.query_params):
+            if name in exclude_params:
+                continue
+            values = request.query_params.getlist(name)
+            if name in list_params:
+                values = [
+                    ','.join(sorted(set(value.replace(' ', '').split(','))))
+                    for value in values
+                ]
+            params.append((name, sorted(values)))
+        digest = hashlib.sha256(
+            f'{request.path}?{params}'.encode()
+        ).hexdigest()
+        user_id = request.user.id
+        version = self.data_version(user_id)
+
+        return f'{self.response_prefix}{user_id}:{version}:{digest}'
+
+    def get(self, key):
+        """Return cached response data and count the hit or miss."""
+        data = self.cache.get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return data
+
+    def set(self, key, data):
+        """Store response data."""
+        self.cache.set(key, data, settings.RECIPE_RESPONSE_CACHE['TTL'])
+
+    def stats(self):
+        """Return the hit and miss counters of this process."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def reset_stats(self):
+        """Reset the hit and miss counters."""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+response_cache = ResponseCache()
+
+
+class CachedListMixin:
+    """Serve the list action from the per-user response cache."""
+    cache_list_params = ()
+
+    def list(self, request, *args, **kwargs):
+        """Return the cached list response or build and cache it."""
+        if not response_cache.enabled:
+            return super().list(request, *args, **kwargs)
+
+        key = response_cache.key_for(request, self.cache_list_params)
+        data = response_cache.get(key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200 and response_cache.can_store():
+            response_cache.set(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
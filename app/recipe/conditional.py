@@ -0,0 +1,66 @@
+"""
+Conditional GET support (ETag) for recipe API's.
+"""
+import hashlib
+
+from django.utils.cache import (
+    get_conditional_response,
+    patch_vary_headers
+)
+
+from core.db.router import read_alias
+
+from recipe.cache import response_cache
+
+
+class ConditionalGetMixin:
+    """Answer list and retrieve with 304 Not Modified when the client's
+    ETag still matches, without querying or running the serializer."""
+
+    def _etag(self, request):
+        """Return a strong ETag for the request.
+
+        It is built from the user's data version, which every write to
+        their recipes, tags and ingredients bumps, deletes and renames
+        included, rather than from the rows' timestamps, which those do
+        not move. The accepted media type is part of it, as the JSON and
+        browsable representations differ.
+        """
+        version = response_cache.data_version(request.user.id)
+        source = (
+            f'{request.user.id}:{version}:{request.accepted_media_type}:'
+            f'{request.get_full_path()}'
+        )
+        return f'"{hashlib.sha256(source.encode()).hexdigest()}"'
+
+    def _conditional(self, request, handler, *args, **kwargs):
+        """Return 304 when the ETag matches, else call the handler.
+
+        The ETag carries the user's data version, so is left out when
+        no shared cache holds one, and from responses read from a
+        replica, which may not have the writes that version stands for
+        yet.
+        """
+        if not response_cache.enabled:
+            return handler(request, *args, **kwargs)
+
+        etag = self._etag(request)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200 or read_alias() is not None:
+                return response
+
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """List with conditional GET support."""
+        return self._conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve with conditional GET support."""
+        return self._conditional(
+            request, super().retrieve, *args, **kwargs
+        )
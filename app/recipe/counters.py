@@ -0,0 +1,132 @@
+"""
+Denormalized recipe counts of tags and ingredients.
+"""
+from collections import (
+    Counter,
+    defaultdict
+)
+
+from django.db.models import (
+    Count,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Value
+)
+from django.db.models.functions import (
+    Coalesce,
+    Greatest
+)
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient
+)
+
+
+COUNTED_FIELDS = {
+    'tags': Tag,
+    'ingredients': Ingredient,
+}
+COUNTED_THROUGH = {
+    getattr(Recipe, field_name).through: field_name
+    for field_name in COUNTED_FIELDS
+}
+
+
+def related_column(field_name):
+    """Return the through table column of the counted model."""
+    return f'{COUNTED_FIELDS[field_name]._meta.model_name}_id'
+
+
+def linked_ids(recipe, field_name):
+    """Return the related ids of a recipe, from its prefetch cache
+    when the related objects were prefetched."""
+    return [obj.id for obj in getattr(recipe, field_name).all()]
+
+
+def link_counts(field_name, recipe_ids):
+    """Return a Counter of related ids linked to the given recipes."""
+    through = getattr(Recipe, field_name).through
+    column = related_column(field_name)
+    rows = through.objects.filter(
+        recipe_id__in=list(recipe_ids)
+    ).values(column).annotate(
+        links=Count('id')
+    ).values_list(column, 'links')
+
+    return Counter(dict(rows))
+
+
+def lock_recipes(recipe_ids):
+    """Lock recipe rows, in id order, until the transaction ends.
+
+    Writers changing the links of a recipe take its lock first, so the
+    links the m2m and delete signals read before counting are the ones
+    actually added or removed, never counted by two requests at once.
+    """
+    return list(
+        Recipe.objects.filter(id__in=recipe_ids).order_by(
+            'id'
+        ).select_for_update().values_list('id', flat=True)
+    )
+
+
+def adjust_recipe_counts(field_name, deltas):
+    """Apply a Counter of per-row deltas with one UPDATE per distinct
+    delta, so the counters never need to be read first.
+
+    Decrements stop at zero, as writers outside the API, such as the
+    admin, change links without lock_recipes(); a count they leave off
+    is fixed by rebuild_recipe_counts rather than failing the write on
+    the column's constraint.
+    """
+    ids_by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            ids_by_delta[delta].append(pk)
+    model = COUNTED_FIELDS[field_name]
+    for delta, ids in ids_by_delta.items():
+        count = F('recipe_count') + delta
+        if delta < 0:
+            count = Greatest(count, Value(0))
+        model.objects.filter(id__in=ids).update(recipe_count=count)
+
+
+def _actual_counts(field_name):
+    """Return a subquery counting the recipes of each row."""
+    through = getattr(Recipe, field_name).through
+    column = related_column(field_name)
+    return Coalesce(
+        Subquery(
+            through.objects.filter(
+                **{column: OuterRef('pk')}
+            ).order_by().values(column).annotate(
+                links=Count('id')
+            ).values('links'),
+            output_field=IntegerField()
+        ),
+        Value(0)
+    )
+
+
+def drifted(field_name):
+    """Return the rows whose stored count differs from the links."""
+    model = COUNTED_FIELDS[field_name]
+    return model.objects.annotate(
+        actual_count=_actual_counts(field_name)
+    ).exclude(recipe_count=F('actual_count'))
+
+
+def rebuild_recipe_counts(field_name):
+    """Recount every row and return how many were fixed."""
+    model = COUNTED_FIELDS[field_name]
+    ids = list(drifted(field_name).values_list('id', flat=True))
+    if ids:
+        model.objects.filter(id__in=ids).update(
+            recipe_count=_actual_counts(field_name)
+        )
+
+    return len(ids)
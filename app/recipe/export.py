@@ -0,0 +1,88 @@
+"""
+Streaming export of recipes.
+"""
+import csv
+
+from django.db.models import (
+    Prefetch,
+    prefetch_related_objects
+)
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.models import (
+    Tag,
+    Ingredient
+)
+
+
+CSV_FIELDS = [
+    'id', 'title', 'description', 'time_minutes', 'price', 'link',
+    'image', 'tags', 'ingredients'
+]
+
+
+class Echo:
+    """File-like object which returns what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_recipe_chunks(queryset, serializer_class, context, chunk_size):
+    """Yield serialized recipes chunk by chunk.
+
+    Rows are read through a server-side cursor and the tags and
+    ingredients of each chunk are fetched with one query per relation,
+    so memory stays bounded by the chunk size.
+    """
+    chunk = []
+    for recipe in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(recipe)
+        if len(chunk) == chunk_size:
+            yield _serialize_chunk(chunk, serializer_class, context)
+            chunk = []
+    if chunk:
+        yield _serialize_chunk(chunk, serializer_class, context)
+
+
+def _serialize_chunk(chunk, serializer_class, context):
+    """Prefetch the relations of a chunk and serialize it."""
+    prefetch_related_objects(
+        chunk,
+        Prefetch(
+            'tags',
+            queryset=Tag.objects.only('id', 'name', 'recipe_count')
+        ),
+        Prefetch(
+            'ingredients',
+            queryset=Ingredient.objects.only('id', 'name', 'recipe_count')
+        ),
+    )
+    return serializer_class(chunk, many=True, context=context).data
+
+
+def stream_ndjson(chunks):
+    """Yield one JSON document per recipe."""
+    encoder = JSONEncoder(ensure_ascii=False)
+    for chunk in chunks:
+        yield ''.join(f'{encoder.encode(item)}\n' for item in chunk)
+
+
+def stream_csv(chunks):
+    """Yield a CSV header followed by one row per recipe."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_FIELDS)
+    for chunk in chunks:
+        yield ''.join(writer.writerow(_csv_row(item)) for item in chunk)
+
+
+def _csv_row(item):
+    """Flatten a serialized recipe into CSV columns."""
+    row = []
+    for field in CSV_FIELDS:
+        value = item.get(field)
+        if field in ('tags', 'ingredients'):
+            value = ';'.join(obj['name'] for obj in value)
+        row.append('' if value is None else value)
+    return row
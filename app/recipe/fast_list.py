@@ -0,0 +1,105 @@
+"""
+Read-only fast path serializing recipe lists from values() rows.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+
+from rest_framework.response import Response
+
+from core.models import Recipe
+
+from recipe.counters import (
+    COUNTED_FIELDS,
+    related_column
+)
+
+
+class RecipeRowSerializer:
+    """Build the output of a recipe serializer with many=True from
+    values() rows, without model instances or nested serializers.
+
+    The tags and ingredients of all rows are read with one query per
+    relation, ordered by id like the nested objects the list view
+    prefetches. Scalars go through the serializer's own fields, so
+    both produce the same JSON.
+    """
+
+    def __init__(self, rows, serializer_class):
+        self.rows = rows
+        self.fields = serializer_class().fields
+
+    @classmethod
+    def values(cls, queryset, serializer_class):
+        """Return the queryset as rows holding the serialized columns
+        and any annotation a cursor may be positioned on."""
+        names = [
+            name for name in serializer_class.Meta.fields
+            if name not in COUNTED_FIELDS
+        ]
+        names.extend(queryset.query.annotations)
+        return queryset.prefetch_related(None).values(*names)
+
+    def _related(self, field_name, recipe_ids):
+        """Return the nested items of a relation by recipe id."""
+        through = getattr(Recipe, field_name).through
+        column = related_column(field_name)
+        related_name = column[:-len('_id')]
+        names = list(self.fields[field_name].child.fields)
+        rows = through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by(column).values_list(
+            'recipe_id', *(f'{related_name}__{name}' for name in names)
+        )
+        items = defaultdict(list)
+        for recipe_id, *values in rows:
+            items[recipe_id].append(dict(zip(names, values)))
+
+        return items
+
+    @property
+    def data(self):
+        """Return the serialized rows."""
+        recipe_ids = [row['id'] for row in self.rows]
+        plan = []
+        for name, field in self.fields.items():
+            if name in COUNTED_FIELDS:
+                related = self._related(name, recipe_ids) if recipe_ids else {}
+                plan.append((name, None, related))
+            else:
+                plan.append((name, field.to_representation, None))
+
+        data = []
+        for row in self.rows:
+            item = {}
+            for name, to_representation, related in plan:
+                if related is not None:
+                    item[name] = related.get(row['id'], [])
+                elif row[name] is None:
+                    item[name] = None
+                else:
+                    item[name] = to_representation(row[name])
+            data.append(item)
+
+        return data
+
+
+class FastRecipeListMixin:
+    """List recipes through RecipeRowSerializer when enabled."""
+
+    def list(self, request, *args, **kwargs):
+        """List from values() rows instead of model instances."""
+        if not settings.RECIPE_FAST_LIST['ENABLED']:
+            return super().list(request, *args, **kwargs)
+
+        serializer_class = self.get_serializer_class()
+        rows = RecipeRowSerializer.values(
+            self.filter_queryset(self.get_queryset()), serializer_class
+        )
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(RecipeRowSerializer(rows, serializer_class).data)
+
+        return self.get_paginated_response(
+            RecipeRowSerializer(page, serializer_class).data
+        )
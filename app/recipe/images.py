@@ -0,0 +1,379 @@
+"""
+Asynchronous processing of uploaded recipe images.
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+import uuid
+from datetime import timedelta
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor
+)
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import (
+    connections,
+    transaction
+)
+from django.utils import timezone
+
+from PIL import (
+    Image,
+    ImageOps
+)
+
+from core.models import Recipe
+
+
+logger = logging.getLogger(__name__)
+
+ImageStatus = Recipe.ImageStatus
+
+# Extension and save options of every format images are stored in.
+FORMATS = {
+    'jpeg': ('.jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+    'png': ('.png', {'optimize': True}),
+    'webp': ('.webp', {'quality': 80}),
+    'avif': ('.avif', {'quality': 60}),
+}
+
+
+def writable_formats(formats):
+    """Return the known formats, in order, the installed Pillow can save."""
+    Image.init()
+    return [
+        fmt for fmt in formats if fmt in FORMATS and fmt.upper() in Image.SAVE
+    ]
+
+
+# Storage directory of recipe images and their resized copies.
+IMAGE_ROOT = os.path.join('uploads', 'recipe')
+
+
+def content_name(content, ext):
+    """Return the storage name addressing image bytes by their hash."""
+    digest = hashlib.sha256(content).hexdigest()
+    return os.path.join(IMAGE_ROOT, digest[:2], f'{digest}{ext}')
+
+
+def derivative_name(image_name, width, fmt):
+    """Return the storage name of a resized copy of a stored image.
+
+    Copies live next to the content addressed image they were made
+    from, so identical uploads share them as well.
+    """
+    return f'{os.path.splitext(image_name)[0]}/{width}{FORMATS[fmt][0]}'
+
+
+class ImageWorkerPool(ThreadPoolExecutor):
+    """Thread pool closing each worker's database connections after
+    every job, since nothing else would ever close them."""
+
+    def submit(self, fn, *args, **kwargs):
+        def job():
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                connections.close_all()
+
+        return super().submit(job)
+
+
+class FakeExecutor:
+    """In-process executor queueing jobs until run_pending(), so tests
+    can observe an upload before and after it is processed."""
+
+    def __init__(self):
+        self.pending = []
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self.pending.append((future, fn, args, kwargs))
+        return future
+
+    def run_pending(self):
+        """Run the queued jobs in the calling thread."""
+        while self.pending:
+            future, fn, args, kwargs = self.pending.pop(0)
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as error:
+                future.set_exception(error)
+
+
+class InvalidImage(Exception):
+    """An upload which cannot be decoded or is too large."""
+
+
+class ImagePipeline:
+    """Stage uploads quickly and process them on a worker pool.
+
+    Processing decodes and validates the upload, applies and drops its
+    EXIF orientation, bounds its size and re-encodes it without any
+    metadata before it replaces the recipe image, along with narrower
+    copies in the same and in more compact formats.
+    """
+
+    def __init__(self):
+        self._executors = {}
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return settings.RECIPE_IMAGES
+
+    @property
+    def executor(self):
+        """Return the configured executor, created on first use so each
+        forked worker process starts its own threads."""
+        name = self.config['EXECUTOR']
+        with self._lock:
+            if name not in self._executors:
+                if name == 'fake':
+                    self._executors[name] = FakeExecutor()
+                else:
+                    self._executors[name] = ImageWorkerPool(
+                        max_workers=self.config['WORKERS'],
+                        thread_name_prefix='recipe-image'
+                    )
+            return self._executors[name]
+
+    @property
+    def staging(self):
+        """Return the storage holding uploads waiting for processing."""
+        return FileSystemStorage(location=self.config['STAGING_ROOT'])
+
+    @property
+    def derivative_formats(self):
+        """Return the configured extra formats Pillow can write."""
+        return writable_formats(self.config['DERIVATIVE_FORMATS'])
+
+    def submit(self, recipe, upload):
+        """Stage an upload and queue it once the transaction commits."""
+        ext = os.path.splitext(upload.name)[1].lower()
+        # Temporary uploads are moved rather than copied.
+        staged_name = self.staging.save(f'{uuid.uuid4()}{ext}', upload)
+        self.enqueue(recipe, staged_name)
+
+        return staged_name
+
+    def enqueue(self, recipe, staged_name):
+        """Queue a file already in staging once the transaction commits."""
+        self._set_status(recipe, ImageStatus.PENDING)
+        transaction.on_commit(
+            lambda: self.executor.submit(self.process, recipe.id, staged_name)
+        )
+
+    def process(self, recipe_id, staged_name):
+        """Process a staged upload into the recipe image."""
+        try:
+            recipe = Recipe.objects.get(id=recipe_id)
+        except Recipe.DoesNotExist:
+            self.staging.delete(staged_name)
+            return
+
+        self._set_status(recipe, ImageStatus.PROCESSING)
+        try:
+            with self.staging.open(staged_name, 'rb') as upload:
+                image = self.decode(upload)
+            fmt, image = self.flatten(image)
+            self._replace_image(recipe, image, fmt)
+        except InvalidImage as error:
+            logger.warning('Rejected the image of recipe %s: %s',
+                           recipe_id, error)
+            self._set_status(recipe, ImageStatus.FAILED)
+        except Exception:
+            logger.exception('Processing the image of recipe %s failed.',
+                             recipe_id)
+            self._set_status(recipe, ImageStatus.FAILED)
+        finally:
+            self.staging.delete(staged_name)
+
+    def decode(self, upload):
+        """Return the upright, size bounded image of an upload."""
+        max_dimension = self.config['MAX_DIMENSION']
+        try:
+            image = Image.open(upload)
+            if image.width * image.height > self.config['MAX_PIXELS']:
+                raise InvalidImage(
+                    f'{image.width}x{image.height} exceeds the pixel limit.'
+                )
+            # Lets JPEG decode straight to a reduced scale.
+            image.draft('RGB', (max_dimension, max_dimension))
+            image.load()
+        except (OSError, SyntaxError, Image.DecompressionBombError) as error:
+            raise InvalidImage(str(error)) from error
+
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        return image
+
+    def flatten(self, image):
+        """Return the format to store an image in and the image converted
+        for it, with no metadata: PNG when it has transparency and JPEG
+        otherwise."""
+        has_alpha = image.mode in ('RGBA', 'LA') or (
+            image.mode == 'P' and 'transparency' in image.info
+        )
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        image.info = {}
+        return ('png' if has_alpha else 'jpeg'), image
+
+    def encode(self, image, fmt):
+        """Return the bytes of an image saved in the given format."""
+        buffer = io.BytesIO()
+        image.save(buffer, fmt.upper(), **FORMATS[fmt][1])
+        return buffer.getvalue()
+
+    def _store(self, storage, name, encode):
+        """Save the bytes returned by encode() under name unless a file
+        with that name, and so that content, is already stored.
+
+        A file reused is touched, so collect_unused() leaves it alone
+        until the recipe saved with it references it.
+        """
+        try:
+            os.utime(storage.path(name))
+            return name
+        except NotImplementedError:
+            if storage.exists(name):
+                return name
+        except FileNotFoundError:
+            pass
+        stored = storage.save(name, ContentFile(encode()))
+        if stored != name:
+            # Another worker stored the same content meanwhile.
+            storage.delete(stored)
+        return name
+
+    def _store_derivatives(self, storage, image, fmt, image_name):
+        """Store the copies narrower than the image and return their
+        names by width and format."""
+        derivatives = {}
+        formats = [fmt] + [
+            extra for extra in self.derivative_formats if extra != fmt
+        ]
+        for width in sorted(set(self.config['DERIVATIVE_WIDTHS'])):
+            if width >= image.width:
+                continue
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            derivatives[str(width)] = {
+                derived: self._store(
+                    storage,
+                    derivative_name(image_name, width, derived),
+                    lambda: self.encode(resized, derived)
+                )
+                for derived in formats
+            }
+
+        return derivatives
+
+    def _replace_image(self, recipe, image, fmt):
+        """Save the processed image and its copies under content hashes.
+
+        The files replaced may be shared with other recipes, or be found
+        and reused by another worker at any moment, so are left for
+        collect_unused() rather than deleted here.
+        """
+        storage = recipe.image.storage
+        content = self.encode(image, fmt)
+        name = self._store(
+            storage, content_name(content, FORMATS[fmt][0]), lambda: content
+        )
+        recipe.image.name = name
+        recipe.image_derivatives = self._store_derivatives(
+            storage, image, fmt, name
+        )
+        recipe.image_status = ImageStatus.READY
+        recipe.save(update_fields=[
+            'image', 'image_derivatives', 'image_status', 'updated_at'
+        ])
+
+    def collect_stale(self, now=None):
+        """Fail the images waiting for or in processing for longer than
+        the job timeout, and delete staged uploads as old, returning how
+        many of each there were.
+
+        Jobs only live in the worker pool of a process, so a reload,
+        recycle or crash of that process drops them.
+        """
+        cutoff = (now or timezone.now()) - timedelta(
+            seconds=self.config['JOB_TIMEOUT']
+        )
+        with transaction.atomic():
+            stale = list(Recipe.objects.filter(
+                image_status__in=[ImageStatus.PENDING, ImageStatus.PROCESSING],
+                updated_at__lt=cutoff
+            ).select_for_update())
+            for recipe in stale:
+                self._set_status(recipe, ImageStatus.FAILED)
+
+        removed = 0
+        if not self.staging.exists(''):
+            return len(stale), removed
+        # Chunked uploads in 'sessions' are collected with their uploads.
+        for name in self.staging.listdir('')[1]:
+            if self.staging.get_modified_time(name) < cutoff:
+                self.staging.delete(name)
+                removed += 1
+
+        return len(stale), removed
+
+    def _stored_files(self, storage, path):
+        """Yield the names of the files below a storage directory."""
+        dirs, files = storage.listdir(path)
+        for name in files:
+            yield os.path.join(path, name)
+        for name in dirs:
+            yield from self._stored_files(storage, os.path.join(path, name))
+
+    def collect_unused(self, now=None):
+        """Delete recipe images and resized copies no recipe references
+        which were not stored or reused within the job timeout, and
+        return how many there were.
+
+        A job stores or touches its files before saving the recipe, so
+        the ones unreferenced but recent may be about to be used.
+        """
+        storage = Recipe._meta.get_field('image').storage
+        if not storage.exists(IMAGE_ROOT):
+            return 0
+        cutoff = (now or timezone.now()) - timedelta(
+            seconds=self.config['JOB_TIMEOUT']
+        )
+        candidates = [
+            name for name in self._stored_files(storage, IMAGE_ROOT)
+            if storage.get_modified_time(name) < cutoff
+        ]
+        if not candidates:
+            return 0
+        used = set()
+        images = Recipe.objects.exclude(image='').exclude(image=None)
+        for image, derivatives in images.values_list(
+            'image', 'image_derivatives'
+        ).iterator():
+            used.add(image)
+            for names in derivatives.values():
+                used.update(names.values())
+
+        removed = 0
+        for name in candidates:
+            if name in used or storage.get_modified_time(name) >= cutoff:
+                continue
+            storage.delete(name)
+            removed += 1
+
+        return removed
+
+    def _set_status(self, recipe, status):
+        recipe.image_status = status
+        recipe.save(update_fields=['image_status', 'updated_at'])
+
+
+image_pipeline = ImagePipeline()
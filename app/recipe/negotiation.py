@@ -0,0 +1,15 @@
+"""
+Content negotiation for recipe API's.
+"""
+from rest_framework.negotiation import BaseContentNegotiation
+
+
+class IgnoreAcceptNegotiation(BaseContentNegotiation):
+    """Pick the first parser and renderer whatever the request asks for,
+    for views answering with their own body and only render errors."""
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
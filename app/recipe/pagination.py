@@ -0,0 +1,31 @@
+"""
+Pagination classes for recipe API's.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination for recipes with an opaque cursor on -id."""
+    ordering = '-id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        """Page search results on their rank, ties broken by -id."""
+        if 'rank' in queryset.query.annotations:
+            return ('-rank', '-id')
+        return super().get_ordering(request, queryset, view)
+
+
+class RecipeAttrCursorPagination(RecipeCursorPagination):
+    """Keyset pagination for tags and ingredients on -name, -id."""
+    ordering = ('-name', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        """Follow the requested ordering, ties broken by id in the same
+        direction so one index serves both."""
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        if ordering[-1].lstrip('-') != 'id':
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        return ordering
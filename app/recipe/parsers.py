@@ -0,0 +1,48 @@
+"""
+Parsers for recipe API's.
+"""
+import codecs
+import io
+
+from django.conf import settings
+
+from rest_framework import parsers
+
+from .renderers import (
+    FastJSONRenderer,
+    orjson
+)
+
+# Runs of digits long enough for integers orjson would turn into
+# floats, beyond 64 bits, found much faster than with a regex.
+DIGITS_AS_ZERO = bytes.maketrans(b'123456789', b'000000000')
+LONG_NUMBER = b'0' * 19
+
+
+class FastJSONParser(parsers.JSONParser):
+    """JSONParser decoding UTF-8 bodies with orjson when it is
+    installed.
+
+    Other encodings, bodies with integers beyond 64 bits, which orjson
+    reads as floats, and bodies orjson rejects go through JSONParser,
+    which accepts or reports them as before.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if LONG_NUMBER in body.translate(DIGITS_AS_ZERO):
+            return super().parse(
+                io.BytesIO(body), media_type, parser_context
+            )
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(
+                io.BytesIO(body), media_type, parser_context
+            )
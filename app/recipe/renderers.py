@@ -0,0 +1,83 @@
+"""
+Renderers for recipe API's.
+"""
+from rest_framework import renderers
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer encoding with orjson when it is installed.
+
+    Output is compact UTF-8 like JSONRenderer's defaults, with types
+    orjson does not handle the same way, such as Decimal and datetime,
+    converted by the same encoder. Indented output, other settings and
+    anything orjson cannot encode go through JSONRenderer.
+    """
+    options = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+    ) if orjson is not None else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=self.options
+            )
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+        # Escaped like JSONRenderer does, keeping the output a strict
+        # JavaScript subset.
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
+
+
+class PassthroughRenderer(renderers.BaseRenderer):
+    """Renderer used for content negotiation of views which build
+    their own (streaming) response body.
+
+    Any other data, such as the errors of a rejected request, is
+    rendered as JSON and labelled so.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or isinstance(data, (bytes, str)):
+            return data
+
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = FastJSONRenderer.media_type
+        return FastJSONRenderer().render(data)
+
+
+class NDJSONRenderer(PassthroughRenderer):
+    """Newline delimited JSON, one object per line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class CSVRenderer(PassthroughRenderer):
+    """Comma separated values with a header row."""
+    media_type = 'text/csv'
+    format = 'csv'
@@ -0,0 +1,39 @@
+"""
+Read replica routing for recipe API's.
+"""
+from rest_framework.permissions import SAFE_METHODS
+
+from core.db.router import (
+    replicas,
+    reset_read_alias,
+    set_read_alias
+)
+
+
+class ReplicaReadMixin:
+    """Serve safe requests from a read replica.
+
+    A user whose data changed, through the API or elsewhere, reads
+    from the primary for the sticky window afterwards, so sees their
+    own writes while replicas catch up. recipe.signals marks them.
+    Every other request reads from the primary as usual.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        """Choose the database once the user is authenticated."""
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            alias = replicas.choose(request.user.id)
+            if alias is not None:
+                self._read_alias_token = set_read_alias(alias)
+
+    def dispatch(self, request, *args, **kwargs):
+        """Restore the read database once the request is handled, even
+        when the view raises, so the thread's next request does not
+        inherit the replica."""
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            token = self.__dict__.pop('_read_alias_token', None)
+            if token is not None:
+                reset_read_alias(token)
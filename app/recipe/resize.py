@@ -0,0 +1,303 @@
+"""
+On the fly resizing of recipe images with a bounded disk cache.
+"""
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.utils.translation import gettext as _
+
+from PIL import (
+    Image,
+    ImageOps
+)
+
+from rest_framework.exceptions import ValidationError
+
+from .images import (
+    FORMATS,
+    InvalidImage,
+    image_pipeline,
+    writable_formats
+)
+
+
+ORIENTATION = 0x0112
+# EXIF orientations which swap the width and height of the pixels.
+TRANSPOSED = (5, 6, 7, 8)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls sharing a key into a single call whose
+    result, or exception, every caller receives."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Call fn unless a call for key is running, else wait for it."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except Exception as error:
+            future.set_exception(error)
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+        return future.result()
+
+
+class ResizeCache:
+    """Rendered images on disk, evicting the least recently used once
+    they take more than max_bytes.
+
+    A file's modification time records its last use. The total size is
+    tracked in memory, adding this process's writes, and recomputed from
+    disk every rescan_seconds, once this process has written the space
+    between the low water mark and the limit, and whenever it passes the
+    limit. Processes sharing the directory thereby each see the writes
+    of the others, and together overshoot the limit by at most that
+    space each.
+    """
+    # Evict down to this share of max_bytes, so not every write evicts.
+    low_water = 0.9
+    rescan_seconds = 60
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._size = None
+        self._written = 0
+        self._scanned_at = None
+        self._lock = threading.Lock()
+
+    def path(self, key, ext):
+        """Return the path caching the rendering with the given key."""
+        return os.path.join(self.root, key[:2], f'{key}{ext}')
+
+    def open(self, path):
+        """Return the cached file open for reading and mark it as used,
+        or None when it is not cached."""
+        try:
+            cached = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted since it was opened, which the open file outlives.
+            pass
+        return cached
+
+    def put(self, path, content):
+        """Atomically store content under path and evict if needed."""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as temp:
+            temp.write(content)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self._written += len(content)
+            now = time.monotonic()
+            if (
+                self._size is None
+                or now - self._scanned_at >= self.rescan_seconds
+                or self._written >= self.max_bytes * (1 - self.low_water)
+            ):
+                self._size = self.usage()
+                self._written = 0
+                self._scanned_at = now
+            else:
+                self._size += len(content)
+            if self._size > self.max_bytes:
+                self._size = self.evict()
+
+    def _entries(self):
+        """Yield the last use, size and path of every cached file."""
+        for directory in os.scandir(self.root):
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime_ns, stat.st_size, entry.path
+
+    def usage(self):
+        """Return the bytes taken by the cached files."""
+        return sum(size for _used, size, _path in self._entries())
+
+    def evict(self):
+        """Delete the least recently used files until the cache is
+        below its low water mark and return the bytes left."""
+        entries = sorted(self._entries())
+        total = sum(size for _used, size, _path in entries)
+        target = self.max_bytes * self.low_water
+        for _used, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        return total
+
+
+class ImageResizer:
+    """Render recipe images to fit a requested box in a requested
+    format, caching every rendering on disk.
+
+    Renderings are keyed by the content addressed image name, so a
+    replaced image never serves stale sizes, and concurrent requests
+    for the same rendering wait for a single render.
+    """
+
+    def __init__(self):
+        self._caches = {}
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return settings.RECIPE_IMAGES
+
+    @property
+    def cache(self):
+        """Return the disk cache, one per configured location."""
+        location = (
+            self.config['RESIZE_CACHE_ROOT'],
+            self.config['RESIZE_CACHE_MAX_BYTES'],
+        )
+        with self._lock:
+            if location not in self._caches:
+                self._caches[location] = ResizeCache(*location)
+            return self._caches[location]
+
+    @property
+    def formats(self):
+        """Return the formats images can be rendered in."""
+        return writable_formats(FORMATS)
+
+    def parse(self, params):
+        """Return the width, height and format asked for in the query
+        parameters, either size being None when not bounded."""
+        errors = {}
+        size = []
+        max_dimension = self.config['MAX_DIMENSION']
+        for param in ('w', 'h'):
+            value = params.get(param)
+            if value is None:
+                size.append(None)
+                continue
+            try:
+                size.append(int(value))
+            except ValueError:
+                size.append(0)
+            if not 1 <= size[-1] <= max_dimension:
+                msg = _('Expected an integer from 1 to %(max)d.')
+                errors[param] = [msg % {'max': max_dimension}]
+        fmt = params.get('fmt')
+        if fmt is not None and fmt not in self.formats:
+            msg = _('Expected one of: %(formats)s.')
+            errors['fmt'] = [msg % {'formats': ', '.join(self.formats)}]
+        if errors:
+            raise ValidationError(errors)
+
+        return size[0], size[1], fmt
+
+    def default_format(self, image_name):
+        """Return the format of a stored image, which the pipeline saves
+        as PNG when it has transparency and JPEG otherwise."""
+        return 'png' if image_name.lower().endswith('.png') else 'jpeg'
+
+    def version(self, image_name):
+        """Return the version of a stored image, which changes whenever
+        the image is replaced, for the v parameter of its URLs."""
+        return hashlib.sha256(image_name.encode()).hexdigest()[:16]
+
+    def cache_control(self, image_name, version):
+        """Return the Cache-Control of a rendering requested with the
+        given v parameter.
+
+        Only a URL naming the current version may be cached without
+        revalidation, as the URL without it serves whatever image the
+        recipe has now.
+        """
+        if version == self.version(image_name):
+            max_age = self.config['RESIZE_MAX_AGE']
+            return f'private, max-age={max_age}, immutable'
+        return 'private, no-cache'
+
+    def key(self, image_name, width, height, fmt):
+        """Return the key of a rendering, also used as its ETag."""
+        source = f'{image_name}:{width}:{height}:{fmt}'
+        return hashlib.sha256(source.encode()).hexdigest()
+
+    def fetch(self, image, width, height, fmt):
+        """Return a file holding the rendering of a stored image and
+        whether it was served from the cache."""
+        key = self.key(image.name, width, height, fmt)
+        cache = self.cache
+        path = cache.path(key, FORMATS[fmt][0])
+        cached = cache.open(path)
+        if cached is not None:
+            return cached, True
+
+        def render():
+            content = self.render(image, width, height, fmt)
+            cache.put(path, content)
+            return content
+
+        return io.BytesIO(self._flights.do(key, render)), False
+
+    def render(self, image, width, height, fmt):
+        """Return the bytes of a stored image shrunk to fit the box."""
+        try:
+            with image.storage.open(image.name, 'rb') as original:
+                rendering = Image.open(original)
+                transposed = (
+                    rendering.getexif().get(ORIENTATION) in TRANSPOSED
+                )
+                upright = (
+                    rendering.size[::-1] if transposed else rendering.size
+                )
+                box = (width or upright[0], height or upright[1])
+                # Decodes JPEG at a reduced scale with draft() and
+                # halves with reduce() before resampling the rest.
+                rendering.thumbnail(
+                    box[::-1] if transposed else box,
+                    Image.LANCZOS,
+                    reducing_gap=3.0
+                )
+                rendering = ImageOps.exif_transpose(rendering)
+        except (OSError, SyntaxError, Image.DecompressionBombError) as error:
+            raise InvalidImage(str(error)) from error
+
+        stored_fmt, rendering = image_pipeline.flatten(rendering)
+        if fmt == 'jpeg' and stored_fmt != 'jpeg':
+            rendering = rendering.convert('RGB')
+        return image_pipeline.encode(rendering, fmt)
+
+
+image_resizer = ImageResizer()
@@ -0,0 +1,150 @@
+"""
+Full-text search for recipes.
+"""
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank
+)
+from django.db import (
+    connections,
+    router,
+    transaction
+)
+from django.db.models import (
+    Case,
+    Exists,
+    F,
+    FloatField,
+    OuterRef,
+    Q,
+    Value,
+    When
+)
+from django.db.models.functions import Cast
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient
+)
+
+
+SEARCH_CONFIG = 'english'
+
+
+def _names_sql(field_name, model):
+    """Return SQL aggregating the related names of recipe r."""
+    through = getattr(Recipe, field_name).through._meta.db_table
+    table = model._meta.db_table
+    related_column = f'{model._meta.model_name}_id'
+    return (
+        f'(SELECT string_agg(o.name, \' \') FROM {table} o '
+        f'JOIN {through} l ON l.{related_column} = o.id '
+        'WHERE l.recipe_id = r.id)'
+    )
+
+
+def search_vectors_enabled():
+    """Return whether the recipe database keeps search vectors."""
+    using = router.db_for_write(Recipe)
+    return connections[using].vendor == 'postgresql'
+
+
+def update_search_vectors(recipe_ids=None):
+    """Recompute the search vector of the given recipes, or of all
+    recipes when recipe_ids is None, with one UPDATE.
+
+    Titles weigh most, then descriptions, then tag and ingredient
+    names. Only PostgreSQL keeps a search vector.
+    """
+    if not search_vectors_enabled():
+        return
+    if recipe_ids is not None:
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return
+
+    sql = (
+        f'UPDATE {Recipe._meta.db_table} r SET search_vector = '
+        "setweight(to_tsvector(%s, coalesce(r.title, '')), 'A') || "
+        "setweight(to_tsvector(%s, coalesce(r.description, '')), 'B') || "
+        f"setweight(to_tsvector(%s, coalesce({_names_sql('tags', Tag)}, "
+        "'')), 'C') || "
+        "setweight(to_tsvector(%s, coalesce("
+        f"{_names_sql('ingredients', Ingredient)}, '')), 'C')"
+    )
+    params = [SEARCH_CONFIG] * 4
+    if recipe_ids is not None:
+        sql += ' WHERE r.id = ANY(%s)'
+        params.append(recipe_ids)
+    with connections[router.db_for_write(Recipe)].cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _flush_search_vectors(using):
+    """Recompute the search vectors scheduled on a connection."""
+    recipe_ids = connections[using].__dict__.pop('_search_vector_ids', None)
+    if recipe_ids:
+        update_search_vectors(recipe_ids)
+
+
+def schedule_search_vectors(recipe_ids):
+    """Recompute the search vectors of the given recipes once the
+    current transaction commits, or now outside of one.
+
+    Recipes written in one transaction, like a recipe created with its
+    tags and ingredients, are collected and updated with a single
+    UPDATE, rather than rewriting the row once per change.
+    """
+    if not search_vectors_enabled():
+        return
+    using = router.db_for_write(Recipe)
+    connection = connections[using]
+    connection.__dict__.setdefault('_search_vector_ids', set()).update(
+        recipe_ids
+    )
+    # The first callback to run flushes every id scheduled so far. One
+    # is registered per call, as callbacks of a savepoint rolled back
+    # are dropped.
+    transaction.on_commit(lambda: _flush_search_vectors(using), using=using)
+
+
+def _related_name_matches(field_name, term):
+    """Return an EXISTS matching recipes with a related name."""
+    through = getattr(Recipe, field_name).through
+    related_model = Recipe._meta.get_field(field_name).related_model
+    lookup = f'{related_model._meta.model_name}__name__icontains'
+    return Exists(through.objects.filter(
+        recipe_id=OuterRef('pk'), **{lookup: term}
+    ))
+
+
+def search_recipes(queryset, terms):
+    """Filter recipes matching the search terms and annotate a rank.
+
+    PostgreSQL matches the GIN indexed search vector and ranks with
+    ts_rank. Other backends fall back to icontains on every field,
+    ranking title matches first.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        query = SearchQuery(
+            terms, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        # Cast the real returned by ts_rank so cursor positions
+        # round-trip exactly through Python floats.
+        return queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        )
+
+    for term in terms.split():
+        queryset = queryset.filter(
+            Q(title__icontains=term) |
+            Q(description__icontains=term) |
+            Q(_related_name_matches('tags', term)) |
+            Q(_related_name_matches('ingredients', term))
+        )
+    return queryset.annotate(rank=Case(
+        When(title__icontains=terms, then=Value(1.0)),
+        default=Value(0.5),
+        output_field=FloatField()
+    ))
@@ -1,22 +1,43 @@
 """
 Serializers for the recipe endpoints.
 """
+from collections import Counter
+
+from django.conf import settings
+from django.db import (
+    connections,
+    router,
+    transaction
+)
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 
 from core.models import (
     Recipe,
     Tag,
-    Ingredient
+    Ingredient,
+    ImageUpload
 )
 
+from recipe.counters import lock_recipes
+from recipe.resize import image_resizer
+from recipe.signals import recipes_bulk_changed
+from recipe.uploads import chunked_uploads
+
 
 class IngredientSerializer(serializers.ModelSerializer):
     """Serializer for ingredients."""
 
     class Meta:
         model = Ingredient
-        fields = ['id', 'name']
-        read_only_fields = ['id']
+        fields = ['id', 'name', 'recipe_count']
+        read_only_fields = ['id', 'recipe_count']
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -24,8 +45,8 @@ class TagSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Tag
-        fields = ['id', 'name']
-        read_only_fields = ['id']
+        fields = ['id', 'name', 'recipe_count']
+        read_only_fields = ['id', 'recipe_count']
 
 
 class RecipeSerializer(serializers.ModelSerializer):
@@ -41,35 +62,73 @@ class RecipeSerializer(serializers.ModelSerializer):
             ]
         read_only_fields = ['id']
 
+    def _objects_by_name(self, model, names):
+        """Return a dict of the auth user's objects keyed by name."""
+        auth_user = self.context['request'].user
+        queryset = model.objects.filter(
+            user=auth_user,
+            name__in=names
+        ).order_by('-id')
+        return {obj.name: obj for obj in queryset}
+
+    def _bulk_get_or_create(self, model, items):
+        """Return objects for the given items, creating the
+        missing ones with a single bulk insert."""
+        names = list(dict.fromkeys(item['name'] for item in items))
+        if not names:
+            return []
+        objects = self._objects_by_name(model, names)
+        missing = [name for name in names if name not in objects]
+        if missing:
+            auth_user = self.context['request'].user
+            model.objects.bulk_create(
+                [model(user=auth_user, name=name) for name in missing],
+                ignore_conflicts=True
+            )
+            objects.update(self._objects_by_name(model, missing))
+
+        return [objects[name] for name in names]
+
     def _get_or_create_tags(self, tags, recipe):
         """Handle getting or creating tags and
         assign them to recipe while creating them."""
-        auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag
-            )
-            recipe.tags.add(tag_obj)
+        tag_objs = self._bulk_get_or_create(Tag, tags)
+        if tag_objs:
+            recipe.tags.add(*tag_objs)
 
     def _get_or_create_ingredients(self, ingredients, recipe):
         """Handle getting or creating ingredients
         and assign them to recipe while creating them."""
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient
-            )
-            recipe.ingredients.add(ingredient_obj)
+        ingredient_objs = self._bulk_get_or_create(Ingredient, ingredients)
+        if ingredient_objs:
+            recipe.ingredients.add(*ingredient_objs)
+
+    def _update_related(self, manager, model, items):
+        """Apply only the added and removed objects to a relation."""
+        wanted = self._bulk_get_or_create(model, items)
+        wanted_ids = {obj.id for obj in wanted}
+        # Read again rather than from the prefetch cache, which may
+        # predate the recipe's lock.
+        current_ids = set(manager.values_list('id', flat=True))
+        removed = current_ids - wanted_ids
+        added = [obj for obj in wanted if obj.id not in current_ids]
+        if removed:
+            manager.remove(*removed)
+        if added:
+            manager.add(*added)
 
     def create(self, validated_data):
-        """Create and return recipes with tags."""
+        """Create and return recipes with tags.
+
+        One transaction, so the recipe and its links are written, and
+        its search vector computed, together.
+        """
         tags = validated_data.pop('tags', [])
         ingredients = validated_data.pop('ingredients', [])
-        recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(**validated_data)
+            self._get_or_create_tags(tags, recipe)
+            self._get_or_create_ingredients(ingredients, recipe)
 
         return recipe
 
@@ -77,26 +136,193 @@ class RecipeSerializer(serializers.ModelSerializer):
         """Updating tags on recipes API's."""
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
-        if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+        with transaction.atomic():
+            if tags is not None or ingredients is not None:
+                lock_recipes([instance.id])
+            if ingredients is not None:
+                self._update_related(
+                    instance.ingredients, Ingredient, ingredients
+                )
 
-        if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            if tags is not None:
+                self._update_related(instance.tags, Tag, tags)
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
 
-        instance.save()
+            instance.save()
         return instance
 
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for detail recipe."""
+    image_derivatives = serializers.SerializerMethodField()
+    image_version = serializers.SerializerMethodField()
 
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description', 'image']
+        fields = RecipeSerializer.Meta.fields + [
+            'description', 'image', 'image_status', 'image_derivatives',
+            'image_version'
+        ]
+        # Set only through upload-image and resumable uploads, which
+        # decode, validate and process it.
+        read_only_fields = RecipeSerializer.Meta.read_only_fields + [
+            'image'
+        ]
+
+    @extend_schema_field(OpenApiTypes.OBJECT)
+    def get_image_derivatives(self, recipe):
+        """Return the URLs of the resized images by width and format."""
+        request = self.context.get('request')
+        storage = recipe.image.storage
+
+        def url(name):
+            path = storage.url(name)
+            return request.build_absolute_uri(path) if request else path
+
+        return {
+            width: {fmt: url(name) for fmt, name in names.items()}
+            for width, names in recipe.image_derivatives.items()
+        }
+
+    @extend_schema_field(OpenApiTypes.STR)
+    def get_image_version(self, recipe):
+        """Return the v parameter of the image's resize URLs."""
+        if not recipe.image:
+            return None
+        return image_resizer.version(recipe.image.name)
+
+
+class RecipeBulkListSerializer(serializers.ListSerializer):
+    """Serializer writing many recipes with set-based queries."""
+    max_items = 1000
+
+    def to_internal_value(self, data):
+        """Limit the number of recipes written at once, before any
+        item is validated."""
+        if isinstance(data, list) and len(data) > self.max_items:
+            msg = _('Ensure this list has no more than %(max)d items.')
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    msg % {'max': self.max_items}
+                ]
+            })
+        return super().to_internal_value(data)
+
+    def _objects_by_name(self, model, item_lists):
+        """Get or create every named object of all items at once."""
+        items = [item for items in item_lists for item in items]
+        objects = self.child._bulk_get_or_create(model, items)
+        return {obj.name: obj for obj in objects}
+
+    def _set_related(self, field_name, model, item_lists):
+        """Replace the related objects of recipes with only the delta.
+
+        item_lists maps recipe ids to the wanted items of each recipe.
+        Returns a Counter of links added or removed per related id.
+        """
+        deltas = Counter()
+        if not item_lists:
+            return deltas
+        through = getattr(Recipe, field_name).through
+        related_field = f'{model._meta.model_name}_id'
+        objects = self._objects_by_name(model, item_lists.values())
+        wanted = {
+            (recipe_id, objects[item['name']].id)
+            for recipe_id, items in item_lists.items()
+            for item in items
+        }
+        current = {
+            (row[0], row[1]): row[2]
+            for row in through.objects.filter(
+                recipe_id__in=item_lists
+            ).values_list('recipe_id', related_field, 'id')
+        }
+        removed = [
+            (pair, pk) for pair, pk in current.items() if pair not in wanted
+        ]
+        if removed:
+            through.objects.filter(
+                id__in=[pk for pair, pk in removed]
+            ).delete()
+            deltas.subtract(obj_id for (_, obj_id), pk in removed)
+        added = [pair for pair in wanted if pair not in current]
+        if added:
+            through.objects.bulk_create([
+                through(recipe_id=recipe_id, **{related_field: obj_id})
+                for recipe_id, obj_id in added
+            ], ignore_conflicts=True)
+            deltas.update(obj_id for _, obj_id in added)
+
+        return deltas
+
+    def create(self, validated_data):
+        """Create recipes and link their tags and ingredients in bulk."""
+        user = self.context['request'].user
+        tag_lists = [item.pop('tags', []) for item in validated_data]
+        ingredient_lists = [
+            item.pop('ingredients', []) for item in validated_data
+        ]
+        recipes = [Recipe(user=user, **item) for item in validated_data]
+        db = router.db_for_write(Recipe)
+        if connections[db].features.can_return_rows_from_bulk_insert:
+            Recipe.objects.using(db).bulk_create(recipes)
+        else:
+            for recipe in recipes:
+                recipe.save(using=db)
+
+        link_deltas = {
+            'tags': self._set_related('tags', Tag, {
+                recipe.id: tags for recipe, tags in zip(recipes, tag_lists)
+            }),
+            'ingredients': self._set_related('ingredients', Ingredient, {
+                recipe.id: ingredients
+                for recipe, ingredients in zip(recipes, ingredient_lists)
+            }),
+        }
+        recipes_bulk_changed.send(
+            sender=Recipe,
+            user=user,
+            recipe_ids=[r.id for r in recipes],
+            link_deltas=link_deltas
+        )
+
+        return recipes
+
+    def update(self, instances, validated_data):
+        """Update recipes and the delta of their relations in bulk."""
+        user = self.context['request'].user
+        now = timezone.now()
+        fields = {'updated_at'}
+        tag_lists = {}
+        ingredient_lists = {}
+        for recipe, item in zip(instances, validated_data):
+            tags = item.pop('tags', None)
+            if tags is not None:
+                tag_lists[recipe.id] = tags
+            ingredients = item.pop('ingredients', None)
+            if ingredients is not None:
+                ingredient_lists[recipe.id] = ingredients
+            for attr, value in item.items():
+                setattr(recipe, attr, value)
+                fields.add(attr)
+            recipe.updated_at = now
+
+        Recipe.objects.bulk_update(instances, sorted(fields))
+        link_deltas = {
+            'tags': self._set_related('tags', Tag, tag_lists),
+            'ingredients': self._set_related(
+                'ingredients', Ingredient, ingredient_lists
+            ),
+        }
+        recipes_bulk_changed.send(
+            sender=Recipe,
+            user=user,
+            recipe_ids=[r.id for r in instances],
+            link_deltas=link_deltas
+        )
+
+        return instances
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
@@ -104,6 +330,33 @@ class RecipeImageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        fields = ['id', 'image']
-        read_only_fields = ['id']
+        fields = ['id', 'image', 'image_status']
+        read_only_fields = ['id', 'image_status']
         extra_kwargs = {'image': {'required': True}}
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    """Serializer for resumable uploads of recipe images."""
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False)
+    expires_at = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImageUpload
+        fields = ['id', 'recipe', 'size', 'offset', 'sha256', 'expires_at']
+        read_only_fields = ['id', 'recipe', 'offset']
+
+    def validate_size(self, value):
+        """Bound the size of the whole upload."""
+        max_bytes = settings.RECIPE_IMAGES['UPLOAD_MAX_BYTES']
+        if not 1 <= value <= max_bytes:
+            msg = _('Expected a size from 1 to %(max)d bytes.')
+            raise serializers.ValidationError(msg % {'max': max_bytes})
+        return value
+
+    def validate_sha256(self, value):
+        return value.lower()
+
+    @extend_schema_field(OpenApiTypes.DATETIME)
+    def get_expires_at(self, upload):
+        """Return when the upload is collected unless continued."""
+        return chunked_uploads.expires_at(upload)
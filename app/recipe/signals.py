@@ -0,0 +1,206 @@
+"""
+Signal handlers keeping cached responses, replica reads and search
+vectors in sync.
+"""
+from django.conf import settings
+from django.db.models.signals import (
+    post_save,
+    pre_delete,
+    post_delete,
+    m2m_changed
+)
+from django.dispatch import (
+    receiver,
+    Signal
+)
+
+from core.db.router import replicas
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient
+)
+
+from recipe.cache import response_cache
+from recipe.counters import (
+    COUNTED_FIELDS,
+    COUNTED_THROUGH,
+    adjust_recipe_counts,
+    linked_ids,
+    related_column
+)
+from recipe.search import (
+    schedule_search_vectors,
+    search_vectors_enabled
+)
+
+
+# Sent by bulk writes which bypass per-row model and m2m signals,
+# with the acting ``user``, the affected ``recipe_ids`` and optionally
+# ``link_deltas``, mapping 'tags' and 'ingredients' to a Counter of
+# links added (positive) or removed (negative) per related id.
+recipes_bulk_changed = Signal()
+
+
+def data_changed(user_id):
+    """Invalidate a user's cached responses and keep them reading from
+    the primary while replicas catch up."""
+    response_cache.bump_version(user_id)
+    replicas.mark_written(user_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_version_on_change(sender, instance, **kwargs):
+    """Bump the owner's data version when a row changes."""
+    data_changed(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_version_on_m2m_change(sender, instance, action, **kwargs):
+    """Bump the owner's data version when a relation changes."""
+    if action.startswith('post_'):
+        data_changed(instance.user_id)
+
+
+@receiver(recipes_bulk_changed)
+def bump_version_on_bulk_change(sender, user, **kwargs):
+    """Bump the user's data version after a bulk write."""
+    data_changed(user.id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def bump_version_on_user_created(sender, instance, created, **kwargs):
+    """Start a fresh version for a new user, since a reused id may
+    still have responses cached for a previous owner."""
+    if created:
+        response_cache.bump_version(instance.id)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def bump_version_on_user_deleted(sender, instance, **kwargs):
+    """Abandon the cached responses of a deleted user."""
+    response_cache.bump_version(instance.id)
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_vector_on_save(sender, instance, created,
+                                 update_fields=None, **kwargs):
+    """Refresh the search vector of a saved recipe, unless the save
+    left its title and description alone."""
+    if (
+        not created
+        and update_fields is not None
+        and not {'title', 'description'} & set(update_fields)
+    ):
+        return
+    schedule_search_vectors([instance.id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_search_vector_on_m2m_change(sender, instance, action, reverse,
+                                       pk_set, **kwargs):
+    """Refresh the search vectors of recipes whose names changed."""
+    if not reverse:
+        if action.startswith('post_'):
+            schedule_search_vectors([instance.id])
+    elif action == 'pre_clear' and search_vectors_enabled():
+        instance._cleared_recipe_ids = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+    elif action == 'post_clear':
+        schedule_search_vectors(getattr(instance, '_cleared_recipe_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        schedule_search_vectors(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def update_search_vector_on_rename(sender, instance, created, **kwargs):
+    """Refresh the recipes using a changed tag or ingredient."""
+    if not created:
+        schedule_search_vectors(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_recipes_before_delete(sender, instance, **kwargs):
+    """Remember the recipes of a tag or ingredient being deleted."""
+    if search_vectors_enabled():
+        instance._deleted_recipe_ids = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def update_search_vector_on_delete(sender, instance, **kwargs):
+    """Refresh the recipes which used a deleted tag or ingredient."""
+    schedule_search_vectors(getattr(instance, '_deleted_recipe_ids', []))
+
+
+@receiver(recipes_bulk_changed)
+def update_search_vector_on_bulk_change(sender, recipe_ids, **kwargs):
+    """Refresh the search vectors after a bulk write."""
+    schedule_search_vectors(recipe_ids)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_recipe_counts_on_m2m_change(sender, instance, action, reverse,
+                                       pk_set, **kwargs):
+    """Keep the recipe counts of tags and ingredients in step with
+    their links, touching only the rows that changed."""
+    field_name = COUNTED_THROUGH[sender]
+    source, target = 'recipe_id', related_column(field_name)
+    if reverse:
+        source, target = target, source
+    if action in ('pre_remove', 'pre_clear'):
+        links = sender.objects.filter(**{source: instance.id})
+        if action == 'pre_remove':
+            # remove() reports every requested id, linked or not.
+            links = links.filter(**{f'{target}__in': pk_set})
+        instance._unlinked_ids = list(links.values_list(target, flat=True))
+        return
+    if action == 'post_add':
+        ids, delta = pk_set, 1
+    elif action in ('post_remove', 'post_clear'):
+        ids, delta = getattr(instance, '_unlinked_ids', []), -1
+    else:
+        return
+    if reverse:
+        adjust_recipe_counts(field_name, {instance.id: delta * len(ids)})
+    else:
+        adjust_recipe_counts(field_name, dict.fromkeys(ids, delta))
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_links_before_delete(sender, instance, **kwargs):
+    """Remember the tags and ingredients of a recipe being deleted."""
+    instance._deleted_links = {
+        field_name: linked_ids(instance, field_name)
+        for field_name in COUNTED_FIELDS
+    }
+
+
+@receiver(post_delete, sender=Recipe)
+def update_recipe_counts_on_delete(sender, instance, **kwargs):
+    """Count down the tags and ingredients of a deleted recipe."""
+    for field_name, ids in getattr(instance, '_deleted_links', {}).items():
+        adjust_recipe_counts(field_name, dict.fromkeys(ids, -1))
+
+
+@receiver(recipes_bulk_changed)
+def update_recipe_counts_on_bulk_change(sender, link_deltas=None,
+                                        **kwargs):
+    """Apply the link deltas reported by a bulk write."""
+    for field_name, deltas in (link_deltas or {}).items():
+        adjust_recipe_counts(field_name, deltas)
@@ -0,0 +1,128 @@
+"""
+Tests for the async recipe API views.
+"""
+import asyncio
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import (
+    TransactionTestCase,
+    override_settings
+)
+from django.urls import resolve
+
+from rest_framework import status
+from rest_framework.test import (
+    APIRequestFactory,
+    force_authenticate
+)
+
+from core.models import (
+    Recipe,
+    Tag
+)
+
+from recipe import views
+from recipe.async_urls import (
+    detail_actions,
+    list_actions
+)
+from recipe.async_views import as_async_view
+
+
+def create_user(email='user@example.com', password='U123@example'):
+    """Create and return a sample user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'sample title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(RECIPE_RESPONSE_CACHE={
+    **settings.RECIPE_RESPONSE_CACHE, 'CACHE': 'default'
+})
+class AsyncRecipeApiTests(TransactionTestCase):
+    """Test the async views answer like the sync ones.
+
+    The views query from worker threads, which only see committed rows,
+    and may read from any replica configured.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = create_user()
+        self.recipe = create_recipe(self.user, title='Curry')
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Hot'))
+
+    def request(self, view, method='get', path='/', user=None, **kwargs):
+        """Call an async view with an authenticated request."""
+        data = kwargs.pop('data', None)
+        request = getattr(self.factory, method)(path, data, format='json')
+        force_authenticate(request, user=user or self.user)
+        return async_to_sync(view)(request, **kwargs)
+
+    def test_list_matches_sync_view(self):
+        """Test the async list returns the sync list and validators."""
+        sync_view = views.RecipeApiViewSet.as_view(list_actions)
+        async_view = as_async_view(views.RecipeApiViewSet, list_actions)
+
+        res = self.request(async_view)
+        request = self.factory.get('/')
+        force_authenticate(request, user=self.user)
+        expected = sync_view(request)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, expected.data)
+        self.assertEqual(res['ETag'], expected['ETag'])
+
+    def test_detail_read_and_write(self):
+        """Test the detail view reads and writes the user's recipes."""
+        view = as_async_view(views.RecipeApiViewSet, detail_actions)
+
+        res = self.request(view, pk=self.recipe.id)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Hot')
+
+        res = self.request(
+            view, 'patch', data={'title': 'Stew'}, pk=self.recipe.id
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'Stew')
+
+        res = self.request(
+            view, user=create_user('other@example.com'), pk=self.recipe.id
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tag_list(self):
+        """Test tags are listed by the async view."""
+        view = as_async_view(views.TagApiViewSet, {'get': 'list'})
+
+        res = self.request(view)
+
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']], ['Hot']
+        )
+
+    def test_urls_route_to_async_views(self):
+        """Test the async URLs resolve to coroutine views."""
+        match = resolve(f'/recipes/{self.recipe.id}/', 'recipe.async_urls')
+
+        self.assertEqual(match.kwargs, {'pk': self.recipe.id})
+        self.assertTrue(asyncio.iscoroutinefunction(match.func))
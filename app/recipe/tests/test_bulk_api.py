@@ -0,0 +1,257 @@
+"""
+Tests for the bulk recipe API.
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient
+)
+from core.tests.utils import QueryBudgetMixin
+
+from recipe.serializers import (
+    RecipeBulkListSerializer,
+    RecipeDetailSerializer
+)
+
+
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def create_user(email='user@example.com', password='U123@example'):
+    """Create and return a sample user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'sample title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def recipe_payload(index, **params):
+    """Return a sample recipe payload."""
+    payload = {
+        'title': f'Recipe {index}',
+        'time_minutes': 10,
+        'price': '2.50',
+        'tags': [{'name': 'Quick'}, {'name': f'Tag{index}'}],
+        'ingredients': [{'name': 'Salt'}],
+    }
+    payload.update(params)
+    return payload
+
+
+class BulkRecipeApiTests(QueryBudgetMixin, TestCase):
+    """Test bulk creating, updating and deleting recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_recipes(self):
+        """Test creating many recipes with nested tags and ingredients."""
+        payload = [recipe_payload(i) for i in range(3)]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [item['title'] for item in res.data],
+            ['Recipe 0', 'Recipe 1', 'Recipe 2']
+        )
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 1
+        )
+        recipe = Recipe.objects.get(id=res.data[1]['id'])
+        self.assertEqual(
+            sorted(tag.name for tag in recipe.tags.all()), ['Quick', 'Tag1']
+        )
+
+    def test_bulk_create_validates_all_items(self):
+        """Test one invalid item rejects the whole batch."""
+        payload = [recipe_payload(0), recipe_payload(1, time_minutes='x')]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('time_minutes', res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_requires_list(self):
+        """Test a non-list payload is rejected."""
+        res = self.client.post(BULK_URL, recipe_payload(0), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_limits_items(self):
+        """Test too many items in one request are rejected."""
+        limit = RecipeBulkListSerializer.max_items
+        payload = [{'title': 'x', 'time_minutes': 1, 'price': '1.00'}] * (
+            limit + 1
+        )
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update_recipes(self):
+        """Test updating fields and tags of many recipes."""
+        breakfast = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe1 = create_recipe(user=self.user)
+        recipe2 = create_recipe(user=self.user)
+        recipe1.tags.add(breakfast)
+        payload = [
+            {'id': recipe1.id, 'tags': [{'name': 'Lunch'}]},
+            {'id': recipe2.id, 'title': 'Renamed'},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(
+            [tag.name for tag in recipe1.tags.all()], ['Lunch']
+        )
+        self.assertEqual(recipe2.title, 'Renamed')
+        self.assertEqual(res.data[1]['title'], 'Renamed')
+
+    def test_bulk_update_other_user_recipe_rejected(self):
+        """Test updating another user's recipe fails for that item."""
+        recipe = create_recipe(user=self.user)
+        other = create_recipe(user=create_user(email='other@example.com'))
+        payload = [
+            {'id': recipe.id, 'title': 'Mine'},
+            {'id': other.id, 'title': 'Theirs'},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        other.refresh_from_db()
+        self.assertNotEqual(other.title, 'Theirs')
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting many recipes reports a result per id."""
+        recipe1 = create_recipe(user=self.user)
+        recipe2 = create_recipe(user=self.user)
+        other = create_recipe(user=create_user(email='other@example.com'))
+
+        res = self.client.delete(
+            BULK_URL, [recipe1.id, recipe2.id, other.id], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['status'] for item in res.data], [
+            status.HTTP_204_NO_CONTENT,
+            status.HTTP_204_NO_CONTENT,
+            status.HTTP_404_NOT_FOUND,
+        ])
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+        self.assertTrue(Recipe.objects.filter(id=other.id).exists())
+
+    def test_bulk_booleans_are_not_ids(self):
+        """Test true is rejected rather than taken for recipe 1."""
+        recipe = create_recipe(user=self.user)
+        payload = [{'id': True, 'title': 'Changed'}]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.delete(BULK_URL, [recipe.id, True], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'sample title')
+
+    def test_bulk_limit_checked_before_items(self):
+        """Test an oversized list is rejected without validating or
+        looking up any item."""
+        limit = RecipeBulkListSerializer.max_items
+        serializer = RecipeBulkListSerializer(
+            child=RecipeDetailSerializer(),
+            data=[{'title': 'x'}] * (limit + 1)
+        )
+
+        with patch.object(
+            RecipeDetailSerializer, 'run_validation'
+        ) as mock_validation:
+            self.assertFalse(serializer.is_valid())
+
+        mock_validation.assert_not_called()
+        with self.assertNumQueries(0):
+            res = self.client.delete(
+                BULK_URL, list(range(1, limit + 2)), format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update_query_count_is_constant(self):
+        """Test bulk updates cost the same queries for any batch size."""
+        recipes = []
+        payload = []
+
+        def add_items(count):
+            for _ in range(count):
+                recipe = create_recipe(user=self.user)
+                recipes.append(recipe)
+                payload.append({
+                    'id': recipe.id,
+                    'title': 'Updated',
+                    'tags': [{'name': f'Tag{recipe.id}'}],
+                })
+
+        self.assertQueryCountConstant(
+            add_items,
+            lambda: self.client.patch(BULK_URL, payload, format='json'),
+            sizes=(2, 20),
+        )
+
+    def test_bulk_delete_query_count_is_constant(self):
+        """Test bulk deletes of linked recipes cost the same queries for
+        any batch size, recipe counts included."""
+        ids = []
+        tag = Tag.objects.create(user=self.user, name='Shared')
+
+        def add_items(count):
+            for _ in range(count):
+                recipe = create_recipe(user=self.user)
+                recipe.tags.add(tag)
+                ids.append(recipe.id)
+
+        self.assertQueryCountConstant(
+            add_items,
+            lambda: self.client.delete(BULK_URL, ids, format='json'),
+            sizes=(2, 20),
+        )
+
+    def test_bulk_write_invalidates_list_cache(self):
+        """Test a bulk create shows up in the cached recipe list."""
+        self.client.get(reverse('recipe:recipe-list'))
+        self.client.post(BULK_URL, [recipe_payload(0)], format='json')
+
+        res = self.client.get(reverse('recipe:recipe-list'))
+
+        self.assertEqual(len(res.data['results']), 1)
@@ -0,0 +1,173 @@
+"""
+Tests for conditional GET on recipe API's.
+"""
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils.http import http_date
+from django.test import (
+    TestCase,
+    override_settings
+)
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag
+)
+
+
+RECIPE_LIST_URL = reverse('recipe:recipe-list')
+
+
+def recipe_detail_url(recipe_id):
+    """Create and return a detail recipe URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_user(email='user@example.com', password='U123@example'):
+    """Create and return a sample user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'sample title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(RECIPE_RESPONSE_CACHE={
+    **settings.RECIPE_RESPONSE_CACHE, 'CACHE': 'default'
+})
+class ConditionalGetTests(TestCase):
+    """Test ETag handling."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def test_list_returns_etag(self):
+        """Test the list response carries an ETag varying on Accept and
+        no Last-Modified."""
+        res = self.client.get(RECIPE_LIST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertIn('Accept', res['Vary'])
+        self.assertNotIn('Last-Modified', res)
+
+    @patch('recipe.serializers.RecipeSerializer.to_representation')
+    def test_list_not_modified_skips_serializer(self, mock_to_repr):
+        """Test a matching If-None-Match returns 304 without serializing."""
+        mock_to_repr.return_value = {}
+        etag = self.client.get(RECIPE_LIST_URL)['ETag']
+        mock_to_repr.reset_mock()
+
+        res = self.client.get(RECIPE_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['ETag'], etag)
+        mock_to_repr.assert_not_called()
+
+    def test_list_etag_changes_after_write(self):
+        """Test changing a recipe's tags changes the list ETag."""
+        etag = self.client.get(RECIPE_LIST_URL)['ETag']
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='New'))
+
+        res = self.client.get(RECIPE_LIST_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_list_etag_differs_per_page(self):
+        """Test each page of the list has its own ETag."""
+        create_recipe(user=self.user)
+        first = self.client.get(RECIPE_LIST_URL, {'page_size': 1})
+        second = self.client.get(first.data['next'])
+
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_list_modified_after_delete(self):
+        """Test deleting a recipe, which moves no timestamp, changes
+        the list ETag."""
+        etag = self.client.get(RECIPE_LIST_URL)['ETag']
+        self.recipe.delete()
+
+        res = self.client.get(
+            RECIPE_LIST_URL,
+            HTTP_IF_NONE_MATCH=etag,
+            HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [])
+
+    def test_detail_not_modified(self):
+        """Test If-None-Match returns 304 for an unchanged recipe."""
+        url = recipe_detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_modified_after_tag_rename(self):
+        """Test renaming a tag of the recipe changes its detail ETag."""
+        tag = Tag.objects.create(user=self.user, name='Old')
+        self.recipe.tags.add(tag)
+        url = recipe_detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+        tag.name = 'New'
+        tag.save()
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'New')
+
+    def test_etag_differs_per_media_type(self):
+        """Test the JSON ETag does not match the browsable API."""
+        etag = self.client.get(
+            RECIPE_LIST_URL, HTTP_ACCEPT='application/json'
+        )['ETag']
+
+        res = self.client.get(
+            RECIPE_LIST_URL, HTTP_ACCEPT='text/html', HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_detail_modified_after_update(self):
+        """Test updating a recipe invalidates its detail ETag."""
+        url = recipe_detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+        self.client.patch(url, {'title': 'Updated'})
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Updated')
+
+    def test_detail_of_other_user_not_found(self):
+        """Test validators do not leak recipes of another user."""
+        other = create_recipe(user=create_user(email='other@example.com'))
+
+        res = self.client.get(recipe_detail_url(other.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', res)
@@ -0,0 +1,139 @@
+"""
+Tests for the streaming recipe export API.
+"""
+import csv
+import io
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient
+)
+from core.tests.utils import QueryBudgetMixin
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def create_user(email='user@example.com', password='U123@example'):
+    """Create and return a sample user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'sample title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def read_content(res):
+    """Consume a streaming response and return its body."""
+    return b''.join(res.streaming_content).decode()
+
+
+class ExportApiTests(QueryBudgetMixin, TestCase):
+    """Test exporting recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+    def test_export_ndjson(self):
+        """Test exporting recipes as one JSON object per line."""
+        recipe = create_recipe(user=self.user, title='Soup')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Warm'))
+        create_recipe(user=create_user(email='other@example.com'))
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('application/x-ndjson'))
+        lines = read_content(res).splitlines()
+        self.assertEqual(len(lines), 1)
+        item = json.loads(lines[0])
+        self.assertEqual(item['title'], 'Soup')
+        self.assertEqual(item['price'], '5.25')
+        self.assertEqual(item['tags'], [{'id': item['tags'][0]['id'],
+                                         'name': 'Warm',
+                                         'recipe_count': 1}])
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV with joined names."""
+        recipe = create_recipe(user=self.user, title='Salad')
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Lettuce'),
+            Ingredient.objects.create(user=self.user, name='Oil'),
+        )
+
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        rows = list(csv.DictReader(io.StringIO(read_content(res))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Salad')
+        self.assertEqual(
+            sorted(rows[0]['ingredients'].split(';')), ['Lettuce', 'Oil']
+        )
+
+    def test_export_csv_by_accept_header(self):
+        """Test the format is negotiated from the Accept header."""
+        res = self.client.get(EXPORT_URL, HTTP_ACCEPT='text/csv')
+
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+
+    def test_export_applies_filters(self):
+        """Test the tag filter applies to the export."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+        create_recipe(user=self.user)
+
+        res = self.client.get(EXPORT_URL, {'tags': str(tag.id)})
+
+        lines = read_content(res).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines],
+                         [recipe.id])
+
+    @patch('recipe.views.RecipeApiViewSet.export_chunk_size', 2)
+    def test_export_errors_rendered_as_json(self):
+        """Test rejected requests get their errors as JSON."""
+        res = self.client.get(EXPORT_URL, {'tags': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertIn('tags', json.loads(res.content))
+
+        self.client.force_authenticate(None)
+        res = self.client.get(EXPORT_URL, HTTP_ACCEPT='text/csv')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertIn('detail', json.loads(res.content))
+
+    def test_export_queries_grow_per_chunk(self):
+        """Test relations are fetched per chunk rather than per recipe."""
+        for i in range(6):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+
+        # One query for recipes plus tags and ingredients per chunk.
+        self.assertMaxQueries(
+            1 + 2 * 3, lambda: read_content(self.client.get(EXPORT_URL))
+        )
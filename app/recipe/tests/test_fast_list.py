@@ -0,0 +1,168 @@
+"""
+Golden tests for the fast recipe list path.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient
+)
+from core.tests.utils import QueryBudgetMixin
+
+from recipe.cache import response_cache
+from recipe.fast_list import RecipeRowSerializer
+from recipe.search import search_recipes
+from recipe.serializers import RecipeSerializer
+from recipe.views import RecipeApiViewSet
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def create_user(email='user@example.com', password='U123@example'):
+    """Create and return a sample user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'sample title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeRowSerializerTests(TestCase):
+    """Test the rows serialize to the same JSON as RecipeSerializer."""
+
+    def setUp(self):
+        self.user = create_user()
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Spicy', 'Dessert')
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Salt', 'Sugar')
+        ]
+        samples = [
+            {'title': 'Curry', 'price': Decimal('5'), 'link': ''},
+            {'title': 'Crème brûlée', 'price': Decimal('0.5')},
+            {'title': 'Stew', 'price': Decimal('999.99'),
+             'link': 'https://example.com/stew'},
+            {'title': 'Toast "plain"', 'time_minutes': 0},
+        ]
+        for index, params in enumerate(samples):
+            recipe = create_recipe(self.user, **params)
+            recipe.tags.add(*tags[index:])
+            recipe.ingredients.add(*ingredients[:index])
+        Tag.objects.filter(name='Spicy').update(recipe_count=7)
+
+    def assertSameJson(self, queryset):
+        """Assert both serializers render the queryset identically."""
+        view = RecipeApiViewSet()
+        queryset = view._prefetch_nested(queryset).order_by('-id')
+        expected = RecipeSerializer(queryset, many=True).data
+        rows = RecipeRowSerializer.values(queryset, RecipeSerializer)
+        data = RecipeRowSerializer(list(rows), RecipeSerializer).data
+
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(data), renderer.render(expected))
+        self.assertEqual(len(data), queryset.count())
+
+    def test_rows_match_serializer(self):
+        """Test every field, nested item and key order matches."""
+        self.assertSameJson(Recipe.objects.filter(user=self.user))
+
+    def test_annotated_rows_match_serializer(self):
+        """Test annotations used for paging are left out of the output."""
+        self.assertSameJson(
+            search_recipes(Recipe.objects.filter(user=self.user), 'Curry')
+        )
+
+    def test_no_rows(self):
+        """Test an empty page runs no query for the relations."""
+        with self.assertNumQueries(0):
+            data = RecipeRowSerializer([], RecipeSerializer).data
+
+        self.assertEqual(data, [])
+
+
+class FastRecipeListApiTests(QueryBudgetMixin, TestCase):
+    """Test the list endpoint answers the same on both paths."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        for index in range(5):
+            recipe = create_recipe(
+                self.user,
+                title=f'Soup {index}',
+                price=Decimal(index) / 4
+            )
+            if index % 2:
+                recipe.tags.add(tag)
+                recipe.ingredients.create(user=self.user, name=f'I{index}')
+        self.tag = tag
+
+    def get_both(self, params=None, url=RECIPES_URL):
+        """Return the responses of the fast and the regular path."""
+        responses = []
+        for enabled in (True, False):
+            response_cache.bump_version(self.user.id)
+            with self.settings(RECIPE_FAST_LIST={
+                **settings.RECIPE_FAST_LIST, 'ENABLED': enabled
+            }):
+                responses.append(self.client.get(url, params))
+        return responses
+
+    def test_responses_identical(self):
+        """Test filtered, searched and paged lists are byte identical."""
+        for params in (
+            {},
+            {'tags': str(self.tag.id)},
+            {'search': 'Soup'},
+            {'page_size': 2},
+        ):
+            with self.subTest(params=params):
+                fast, regular = self.get_both(params)
+
+                self.assertEqual(fast.status_code, status.HTTP_200_OK)
+                self.assertEqual(fast.content, regular.content)
+
+    def test_next_page_identical(self):
+        """Test following the cursor of the fast path matches too."""
+        fast, regular = self.get_both({'page_size': 2})
+
+        fast, regular = self.get_both(url=fast.data['next'])
+
+        self.assertEqual(len(fast.data['results']), 2)
+        self.assertEqual(fast.content, regular.content)
+
+    def test_query_count_constant(self):
+        """Test listing more recipes runs no more queries."""
+        def make_rows(count):
+            for _ in range(count):
+                recipe = create_recipe(self.user)
+                recipe.tags.add(self.tag)
+
+        def request():
+            response_cache.bump_version(self.user.id)
+            self.client.get(RECIPES_URL)
+
+        self.assertQueryCountConstant(make_rows, request)
@@ -0,0 +1,276 @@
+"""
+Tests for the recipe image processing pipeline.
+"""
+import io
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.test import (
+    TestCase,
+    override_settings
+)
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+from recipe.images import (
+    image_pipeline,
+    writable_formats
+)
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def image_upload_url(recipe_id):
+    """Create and return an image upload URL."""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def create_user(email='user@example.com', password='U123@example'):
+    """Create and return a sample user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'sample title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def image_file(size=(40, 20), mode='RGB', fmt='JPEG', name='photo.jpg',
+               color='red', **save_params):
+    """Return an uploaded file holding a generated image."""
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, fmt, **save_params)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(RECIPE_IMAGES={
+    **settings.RECIPE_IMAGES,
+    'EXECUTOR': 'fake',
+    'MAX_DIMENSION': 32,
+    'MAX_PIXELS': 10000,
+    'DERIVATIVE_WIDTHS': [8, 16, 64],
+    'DERIVATIVE_FORMATS': ['webp', 'unknown'],
+})
+class ImagePipelineTests(TestCase):
+    """Test uploads are staged and processed in the background."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = self.settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(self.user)
+
+    def tearDown(self):
+        image_pipeline.executor.pending.clear()
+
+    def upload(self, upload, recipe=None):
+        """Upload an image and return the response."""
+        recipe = recipe or self.recipe
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                image_upload_url(recipe.id),
+                {'image': upload},
+                format='multipart'
+            )
+
+    def process(self, recipe=None):
+        """Run the queued jobs and return the refreshed recipe."""
+        recipe = recipe or self.recipe
+        image_pipeline.executor.run_pending()
+        recipe.refresh_from_db()
+        return recipe
+
+    def test_upload_is_staged_until_processed(self):
+        """Test an upload waits in staging and leaves it once done."""
+        res = self.upload(image_file())
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertIsNone(res.data['image'])
+        self.assertEqual(len(image_pipeline.staging.listdir('')[1]), 1)
+
+        recipe = self.process()
+
+        self.assertEqual(recipe.image_status, Recipe.ImageStatus.READY)
+        self.assertEqual(image_pipeline.staging.listdir('')[1], [])
+
+    def test_image_downscaled_and_metadata_stripped(self):
+        """Test the stored image is bounded, upright and has no EXIF."""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotated 90 degrees clockwise.
+        exif[0x010F] = 'Camera maker'
+        self.upload(image_file(size=(80, 40), exif=exif.tobytes()))
+
+        recipe = self.process()
+
+        with Image.open(recipe.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (16, 32))
+            self.assertNotIn('exif', image.info)
+
+    def test_transparent_image_kept_as_png(self):
+        """Test images with transparency are stored as PNG."""
+        self.upload(image_file(mode='RGBA', fmt='PNG', name='logo.png'))
+
+        recipe = self.process()
+
+        self.assertTrue(recipe.image.name.endswith('.png'))
+        with Image.open(recipe.image.path) as image:
+            self.assertEqual(image.mode, 'RGBA')
+
+    def test_too_many_pixels_fails(self):
+        """Test images above the pixel limit are rejected."""
+        self.upload(image_file(size=(200, 200)))
+
+        with self.assertLogs('recipe.images', 'WARNING'):
+            recipe = self.process()
+
+        self.assertEqual(recipe.image_status, Recipe.ImageStatus.FAILED)
+        self.assertFalse(recipe.image)
+
+    def age(self, paths, seconds):
+        """Move the modification time of files back."""
+        for path in paths:
+            stat = os.stat(path)
+            os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+    def stored_paths(self, recipe):
+        """Return the paths of a recipe's image and resized copies."""
+        return [recipe.image.path] + [
+            recipe.image.storage.path(name)
+            for names in recipe.image_derivatives.values()
+            for name in names.values()
+        ]
+
+    def test_replaced_image_collected_once_unused(self):
+        """Test a replaced image is kept for workers which may reuse it,
+        and deleted by collect_unused() once old and unused."""
+        self.upload(image_file())
+        old_paths = self.stored_paths(self.process())
+        self.upload(image_file(color='blue'))
+        recipe = self.process()
+
+        for path in old_paths:
+            self.assertTrue(os.path.exists(path))
+        self.assertEqual(image_pipeline.collect_unused(), 0)
+
+        self.age(old_paths + self.stored_paths(recipe), 2 * 60 * 60)
+        removed = image_pipeline.collect_unused()
+
+        self.assertEqual(removed, len(old_paths))
+        for path in old_paths:
+            self.assertFalse(os.path.exists(path))
+        for path in self.stored_paths(recipe):
+            self.assertTrue(os.path.exists(path))
+
+    def test_reused_image_not_collected(self):
+        """Test an old unused file a worker reuses is touched, so is
+        not collected before its recipe references it."""
+        self.upload(image_file())
+        old_paths = self.stored_paths(self.process())
+        self.upload(image_file(color='blue'))
+        self.process()
+        self.age(old_paths, 2 * 60 * 60)
+        other = create_recipe(self.user, title='other')
+
+        self.upload(image_file(), recipe=other)
+        with patch.object(Recipe, 'save'):
+            # Stores without saving, as a worker about to save would.
+            self.process(other)
+
+        self.assertEqual(image_pipeline.collect_unused(), 0)
+        for path in old_paths:
+            self.assertTrue(os.path.exists(path))
+
+    def test_image_not_writable_through_detail(self):
+        """Test an image sent to the detail URL is ignored."""
+        res = self.client.patch(
+            detail_url(self.recipe.id),
+            {'title': 'new title', 'image': image_file()},
+            format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'new title')
+        self.assertFalse(self.recipe.image)
+        self.assertEqual(self.recipe.image_status, Recipe.ImageStatus.NONE)
+
+    @skipUnless(writable_formats(['webp']), 'Pillow cannot write WebP.')
+    def test_derivatives_stored_and_exposed(self):
+        """Test narrower copies are stored and listed as URLs."""
+        self.upload(image_file(size=(80, 40)))
+
+        recipe = self.process()
+
+        self.assertEqual(sorted(recipe.image_derivatives), ['16', '8'])
+        for width, names in recipe.image_derivatives.items():
+            self.assertEqual(sorted(names), ['jpeg', 'webp'])
+            for fmt, name in names.items():
+                with recipe.image.storage.open(name) as stored:
+                    with Image.open(stored) as image:
+                        self.assertEqual(image.format, fmt.upper())
+                        self.assertEqual(image.width, int(width))
+
+        res = self.client.get(detail_url(recipe.id))
+
+        url = res.data['image_derivatives']['8']['webp']
+        self.assertTrue(url.startswith('http://testserver/'))
+        self.assertTrue(url.endswith('/8.webp'))
+
+    def test_identical_uploads_share_files(self):
+        """Test identical images are stored once and kept while used."""
+        other = create_recipe(self.user)
+        self.upload(image_file())
+        self.upload(image_file(), recipe=other)
+        recipe = self.process()
+        other.refresh_from_db()
+
+        self.assertEqual(recipe.image.name, other.image.name)
+        self.assertEqual(recipe.image_derivatives, other.image_derivatives)
+        self.assertEqual(
+            len(recipe.image.storage.listdir(
+                os.path.dirname(recipe.image.name)
+            )[1]),
+            1
+        )
+
+        self.upload(image_file(color='blue'), recipe=other)
+        self.process(other)
+
+        self.assertTrue(os.path.exists(recipe.image.path))
+
+    def test_deleted_recipe_discards_upload(self):
+        """Test a job for a recipe deleted meanwhile only cleans up."""
+        self.upload(image_file())
+        Recipe.objects.filter(id=self.recipe.id).delete()
+
+        image_pipeline.executor.run_pending()
+
+        self.assertEqual(image_pipeline.staging.listdir('')[1], [])
@@ -0,0 +1,185 @@
+"""
+Tests for the recipe import pipeline and upload API.
+"""
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag
+)
+
+from recipe.importer import (
+    RecipeImporter,
+    read_ndjson,
+    read_csv
+)
+
+
+IMPORT_URL = reverse('recipe:recipe-import-recipes')
+
+
+def create_user(email='user@example.com', password='U123@example'):
+    """Create and return a sample user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def ndjson(*rows):
+    """Return NDJSON lines for rows."""
+    return [json.dumps(row) + '\n' for row in rows]
+
+
+class RecipeImporterTests(TestCase):
+    """Test the chunked importer."""
+
+    def setUp(self):
+        self.user = create_user()
+
+    def test_import_ndjson_with_nested_names(self):
+        """Test importing recipes resolves tags and ingredients."""
+        Tag.objects.create(user=self.user, name='Existing')
+        lines = ndjson(
+            {'title': 'A', 'time_minutes': 5, 'price': '1.50',
+             'tags': ['Existing', 'New'], 'ingredients': ['Salt']},
+            {'title': 'B', 'time_minutes': 7, 'price': '2.00',
+             'tags': [{'name': 'New'}]},
+        )
+
+        result = RecipeImporter(self.user).run(read_ndjson(lines))
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual(result.failed, 0)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        recipe = Recipe.objects.get(user=self.user, title='A')
+        self.assertEqual(
+            sorted(tag.name for tag in recipe.tags.all()), ['Existing', 'New']
+        )
+        self.assertEqual(
+            [i.name for i in recipe.ingredients.all()], ['Salt']
+        )
+
+    def test_import_reports_invalid_rows(self):
+        """Test invalid rows are reported by line and skipped."""
+        lines = ndjson(
+            {'title': 'Good', 'time_minutes': 5, 'price': '1.50'},
+            {'title': '', 'time_minutes': 'x', 'price': '1000.00'},
+        ) + ['not json\n']
+
+        result = RecipeImporter(self.user).run(read_ndjson(lines))
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.failed, 2)
+        self.assertEqual(result.errors[0]['line'], 2)
+        self.assertEqual(
+            set(result.errors[0]['errors']),
+            {'title', 'time_minutes', 'price'}
+        )
+        self.assertEqual(result.errors[1]['line'], 3)
+
+    def test_import_csv(self):
+        """Test importing the CSV layout written by the export."""
+        lines = [
+            'id,title,description,time_minutes,price,link,image,tags,'
+            'ingredients\n',
+            '1,Pasta,,20,4.00,,,Dinner;Quick,Pasta;Tomato\n',
+        ]
+
+        result = RecipeImporter(self.user).run(read_csv(lines))
+
+        self.assertEqual(result.created, 1)
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.description, '')
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(recipe.ingredients.count(), 2)
+
+    def test_import_reports_progress_per_chunk(self):
+        """Test progress is reported after every chunk."""
+        lines = ndjson(*[
+            {'title': f'R{i}', 'time_minutes': 1, 'price': '1.00'}
+            for i in range(5)
+        ])
+        progress = []
+
+        RecipeImporter(
+            self.user,
+            chunk_size=2,
+            progress=lambda result: progress.append(result.processed)
+        ).run(read_ndjson(lines))
+
+        self.assertEqual(progress, [2, 4, 5])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+
+
+class ImportApiTests(TestCase):
+    """Test the import upload endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+    def test_upload_ndjson(self):
+        """Test uploading an NDJSON file imports its recipes."""
+        content = ''.join(ndjson(
+            {'title': 'A', 'time_minutes': 5, 'price': '1.50'},
+            {'title': 'B', 'time_minutes': 5, 'price': 'bad'},
+        )).encode()
+        upload = SimpleUploadedFile('recipes.ndjson', content)
+
+        res = self.client.post(IMPORT_URL, {'file': upload})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(res.data['failed'], 1)
+        self.assertEqual(res.data['errors'][0]['line'], 2)
+        self.assertTrue(
+            Recipe.objects.filter(user=self.user, title='A').exists()
+        )
+
+    def test_upload_csv(self):
+        """Test uploading a CSV file imports its recipes."""
+        content = b'title,time_minutes,price,tags\nSoup,30,3.00,Warm\n'
+        upload = SimpleUploadedFile('recipes.csv', content)
+
+        res = self.client.post(IMPORT_URL, {'file': upload})
+
+        self.assertEqual(res.data['created'], 1)
+        self.assertTrue(Tag.objects.filter(user=self.user, name='Warm'))
+
+    def test_upload_requires_file(self):
+        """Test a request without a file is rejected."""
+        res = self.client.post(IMPORT_URL, {})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_requires_authentication(self):
+        """Test anonymous uploads are rejected."""
+        self.client.force_authenticate(None)
+
+        res = self.client.post(IMPORT_URL, {})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @patch('recipe.importer.RecipeImporter._write_copy')
+    def test_postgresql_uses_copy(self, mock_write_copy):
+        """Test PostgreSQL connections take the COPY path."""
+        mock_write_copy.return_value = []
+        importer = RecipeImporter(self.user)
+        with patch.object(
+            importer, '_write_orm'
+        ) as mock_write_orm, patch(
+            'recipe.importer.connections'
+        ) as mock_connections:
+            mock_connections.__getitem__.return_value.vendor = 'postgresql'
+            importer._write([{'title': 'A'}])
+
+        mock_write_copy.assert_called_once()
+        mock_write_orm.assert_not_called()
@@ -19,6 +19,7 @@ from recipe.serializers import IngredientSerializer
 
 
 INGREDIENTS_LIST_URL = reverse('recipe:ingredient-list')
+AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
 
 
 def ingredient_detail_url(ingredient_id):
@@ -64,8 +65,8 @@ class PrivateIngredientApiTests(TestCase):
         ingredients = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
 
-        self.assertEqual(len(res.data), 2)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_retrieve_list_of_ingredients_limited_to_user(self):
         """Test for retrieving a list of
@@ -80,9 +81,9 @@ class PrivateIngredientApiTests(TestCase):
         res = self.client.get(INGREDIENTS_LIST_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
-        self.assertEqual(res.data[0]['id'], ingredient.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
+        self.assertEqual(res.data['results'][0]['id'], ingredient.id)
 
     def test_updating_ingredient_successfully(self):
         """Test for updating ingredients with response 200."""
@@ -118,13 +119,14 @@ class PrivateIngredientApiTests(TestCase):
             time_minutes=15
         )
         recipe1.ingredients.add(ingredient1)
+        ingredient1.refresh_from_db()
         ser1 = IngredientSerializer(ingredient1)
         ser2 = IngredientSerializer(ingredient2)
 
         res = self.client.get(INGREDIENTS_LIST_URL, {'assigned_only': 1})
 
-        self.assertIn(ser1.data, res.data)
-        self.assertNotIn(ser2.data, res.data)
+        self.assertIn(ser1.data, res.data['results'])
+        self.assertNotIn(ser2.data, res.data['results'])
 
     def test_filter_assigned_return_unique(self):
         """Test filtering assigned ingredients
@@ -150,4 +152,16 @@ class PrivateIngredientApiTests(TestCase):
 
         res = self.client.get(INGREDIENTS_LIST_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_autocomplete_ingredients(self):
+        """Test autocompleting ingredient names inside words."""
+        for name in ['Black pepper', 'Pepper', 'Salt']:
+            Ingredient.objects.create(user=self.user, name=name)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'pepp'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['name'] for item in res.data], ['Pepper', 'Black pepper']
+        )
@@ -0,0 +1,141 @@
+"""
+Tests for the fast JSON renderer and parser.
+"""
+import datetime
+import io
+import uuid
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import (
+    SimpleTestCase,
+    TestCase
+)
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from recipe.parsers import FastJSONParser
+from recipe.renderers import FastJSONRenderer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+SAMPLE = {
+    'title': 'Crème brûlée   "quoted"',
+    'price': Decimal('5.25'),
+    'created': datetime.datetime(
+        2021, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc
+    ),
+    'day': datetime.date(2021, 5, 1),
+    'duration': datetime.timedelta(minutes=90),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'label': gettext_lazy('Recipe'),
+    'tags': ({'id': 1, 'name': 'Vegan'},),
+    1: None,
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test the renderer encodes like JSONRenderer."""
+
+    def assertSameRender(self, data, media_type='application/json'):
+        """Assert both renderers produce the same bytes."""
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type)
+        )
+
+    def test_types_match_stdlib_renderer(self):
+        """Test Decimal, datetime, lazy strings and separators match."""
+        self.assertSameRender(SAMPLE)
+
+    def test_indent_falls_back(self):
+        """Test indented output is left to JSONRenderer."""
+        self.assertSameRender(SAMPLE, 'application/json; indent=4')
+
+    def test_stdlib_used_without_orjson(self):
+        """Test the renderer works when orjson is not installed."""
+        with patch('recipe.renderers.orjson', None):
+            self.assertSameRender(SAMPLE)
+
+    def test_unencodable_falls_back(self):
+        """Test values orjson rejects are encoded or refused as before."""
+        self.assertSameRender({'big': 2 ** 70})
+
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({'value': object()})
+
+    def test_none_renders_empty(self):
+        """Test no data renders an empty body."""
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test the parser decodes like JSONParser."""
+
+    def parse(self, parser, body, **context):
+        return parser.parse(io.BytesIO(body), 'application/json', context)
+
+    def test_parses_like_stdlib_parser(self):
+        """Test bodies beyond orjson's range parse the same."""
+        for body in (
+            '{"title": "Crème", "price": 5.25, "tags": [{"name": "a"}]}',
+            '{"big": 123456789012345678901234567890}',
+        ):
+            with self.subTest(body=body):
+                body = body.encode()
+                self.assertEqual(
+                    self.parse(FastJSONParser(), body),
+                    self.parse(JSONParser(), body)
+                )
+
+    def test_other_encoding(self):
+        """Test bodies in other encodings are decoded by JSONParser."""
+        body = '{"title": "Crème"}'.encode('latin-1')
+
+        data = self.parse(FastJSONParser(), body, encoding='latin-1')
+
+        self.assertEqual(data, {'title': 'Crème'})
+
+    def test_invalid_json_raises_parse_error(self):
+        """Test invalid and non-strict bodies are rejected."""
+        for body in (b'{"title": ', b'{"price": NaN}'):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError):
+                    self.parse(FastJSONParser(), body)
+
+
+class JsonApiTests(TestCase):
+    """Test the API renders and parses JSON through the fast classes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'U123@example'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_create_and_list_as_json(self):
+        """Test a JSON body is accepted and the list negotiated as JSON."""
+        res = self.client.post(RECIPES_URL, {
+            'title': 'Crème brûlée',
+            'time_minutes': 30,
+            'price': '4.50',
+            'tags': [{'name': 'Dessert'}],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/json')
+
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(res.json()['results'][0]['price'], '4.50')
+        self.assertIn('Crème brûlée'.encode(), res.content)
@@ -7,7 +7,14 @@ import os
 
 from PIL import Image
 
-from django.test import TestCase
+from django.conf import settings
+from django.db import connection
+from django.db.models.signals import m2m_changed
+from django.test import (
+    TestCase,
+    override_settings
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
@@ -19,7 +26,9 @@ from core.models import (
     Tag,
     Ingredient
 )
+from core.tests.utils import QueryBudgetMixin
 
+from recipe.images import image_pipeline
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer
@@ -71,7 +80,7 @@ class PublicRescipeApiTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateRecipeApiTest(TestCase):
+class PrivateRecipeApiTest(QueryBudgetMixin, TestCase):
     """Test authenticated API requests."""
 
     def setUp(self):
@@ -92,7 +101,7 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipe_list, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         """Test list of recipes is limited to authenticated user."""
@@ -108,7 +117,7 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipe_list, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_detail_recipe_url(self):
         """Test for retrieving the detail recipe url."""
@@ -398,9 +407,9 @@ class PrivateRecipeApiTest(TestCase):
         res = self.client.get(RECIPE_LIST_URL, paramas)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
 
     def test_filtering_recipes_by_their_ingredients(self):
         """Test filtering recipes by their ingredients."""
@@ -419,11 +428,247 @@ class PrivateRecipeApiTest(TestCase):
         res = self.client.get(RECIPE_LIST_URL, params)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
+
+    def test_filtering_recipes_matching_all_tags(self):
+        """Test match=all returns recipes having every given tag."""
+        t1 = Tag.objects.create(user=self.user, name='Tag1')
+        t2 = Tag.objects.create(user=self.user, name='Tag2')
+        both = create_recipe(user=self.user, title='Both')
+        both.tags.add(t1, t2)
+        only_one = create_recipe(user=self.user, title='One')
+        only_one.tags.add(t1)
+
+        params = {'tags': f'{t1.id},{t2.id},{t1.id}', 'match': 'all'}
+        res = self.client.get(RECIPE_LIST_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['results']], [both.id]
+        )
+
+    def test_filtering_recipes_matching_all_tags_and_ingredients(self):
+        """Test match=all combines tag and ingredient filters."""
+        tag = Tag.objects.create(user=self.user, name='Tag1')
+        i1 = Ingredient.objects.create(user=self.user, name='Ingredient1')
+        i2 = Ingredient.objects.create(user=self.user, name='Ingredient2')
+        r1 = create_recipe(user=self.user)
+        r1.tags.add(tag)
+        r1.ingredients.add(i1, i2)
+        r2 = create_recipe(user=self.user)
+        r2.ingredients.add(i1, i2)
+
+        params = {
+            'tags': str(tag.id),
+            'ingredients': f'{i1.id},{i2.id}',
+            'match': 'all',
+        }
+        res = self.client.get(RECIPE_LIST_URL, params)
 
+        self.assertEqual(
+            [item['id'] for item in res.data['results']], [r1.id]
+        )
+
+    def test_filtering_recipes_does_not_duplicate_or_distinct(self):
+        """Test a recipe matching several tags is listed once
+        without a DISTINCT in the query."""
+        t1 = Tag.objects.create(user=self.user, name='Tag1')
+        t2 = Tag.objects.create(user=self.user, name='Tag2')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(t1, t2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(
+                RECIPE_LIST_URL, {'tags': f'{t1.id},{t2.id}'}
+            )
+
+        self.assertEqual(len(res.data['results']), 1)
+        for query in ctx.captured_queries:
+            self.assertNotIn('DISTINCT', query['sql'].upper())
+
+    def test_filtering_recipes_with_invalid_ids(self):
+        """Test a non integer ID list is a 400 error."""
+        res = self.client.get(RECIPE_LIST_URL, {'tags': '1,abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
 
+    def test_filtering_recipes_with_invalid_match(self):
+        """Test an unknown match mode is a 400 error."""
+        res = self.client.get(RECIPE_LIST_URL, {'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('match', res.data)
+
+    def _create_recipes_with_nested(self, count):
+        """Create recipes which each have a tag and an ingredient."""
+        for _ in range(count):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag{recipe.id}')
+            )
+            recipe.ingredients.add(Ingredient.objects.create(
+                user=self.user, name=f'Ing{recipe.id}'
+            ))
+
+    def test_list_recipes_query_count_is_constant(self):
+        """Test listing recipes does not issue a query per recipe."""
+        self.assertQueryCountConstant(
+            self._create_recipes_with_nested,
+            lambda: self.client.get(RECIPE_LIST_URL),
+            sizes=(1, 10),
+        )
+
+    def test_list_recipes_with_nested_fields_query_budget(self):
+        """Test listing recipes with tags and ingredients is prefetched.
+        The budget is the ETag metadata, recipes, tags and ingredients."""
+        self._create_recipes_with_nested(5)
+
+        self.assertMaxQueries(4, lambda: self.client.get(RECIPE_LIST_URL))
+
+    def test_detail_recipe_query_count_is_constant(self):
+        """Test retrieving a recipe does not grow with its tags."""
+        recipe = create_recipe(user=self.user)
+
+        def add_tags(count):
+            for _ in range(count):
+                recipe.tags.add(Tag.objects.create(
+                    user=self.user,
+                    name=f'Tag{recipe.tags.count()}'
+                ))
+
+        self.assertQueryCountConstant(
+            add_tags,
+            lambda: self.client.get(recipe_detail_url(recipe.id)),
+            sizes=(1, 10),
+        )
+
+    def test_list_recipes_paginated_with_cursor(self):
+        """Test recipes are paged by an opaque cursor in -id order."""
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+        expected_ids = [recipe.id for recipe in reversed(recipes)]
+
+        res = self.client.get(RECIPE_LIST_URL, {'page_size': 2})
+        ids = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids.extend(item['id'] for item in res.data['results'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(ids, expected_ids)
+        self.assertNotIn('count', res.data)
+
+    def test_list_recipes_does_not_count_rows_per_page(self):
+        """Test paging through recipes does not run a COUNT per page."""
+        create_recipe(user=self.user)
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPE_LIST_URL, {'page_size': 1})
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(res.data['next'])
+
+        for query in ctx.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_create_recipe_query_count_independent_of_nested(self):
+        """Test creating a recipe costs the same number of
+        queries no matter how many tags and ingredients it has."""
+        payload = {
+            'title': 'Stew',
+            'time_minutes': 90,
+            'price': Decimal('12.00'),
+            'tags': [],
+            'ingredients': [],
+        }
+
+        def add_nested(count):
+            for _ in range(count):
+                index = len(payload['tags'])
+                payload['tags'].append({'name': f'Tag{index}'})
+                payload['ingredients'].append({'name': f'Ing{index}'})
+
+        self.assertQueryCountConstant(
+            add_nested,
+            lambda: self.client.post(RECIPE_LIST_URL, payload, format='json'),
+            sizes=(2, 30),
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 30)
+
+    def test_create_recipe_with_duplicate_tag_names(self):
+        """Test repeated tag names in a payload create a single tag."""
+        payload = {
+            'title': 'Toast',
+            'time_minutes': 5,
+            'price': Decimal('1.00'),
+            'tags': [{'name': 'Quick'}, {'name': 'Quick'}],
+        }
+        res = self.client.post(RECIPE_LIST_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 1)
+
+    def test_update_recipe_tags_applies_only_delta(self):
+        """Test updating tags only removes and adds the changed ones."""
+        recipe = create_recipe(user=self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ['A', 'B', 'C']
+        ]
+        recipe.tags.add(*tags)
+        changes = []
+
+        def record(sender, action, pk_set, **kwargs):
+            if action in ('post_add', 'post_remove', 'post_clear'):
+                changes.append((action, pk_set))
+
+        payload = {'tags': [{'name': 'A'}, {'name': 'B'}, {'name': 'D'}]}
+        m2m_changed.connect(record, sender=Recipe.tags.through)
+        try:
+            res = self.client.patch(
+                recipe_detail_url(recipe.id), payload, format='json'
+            )
+        finally:
+            m2m_changed.disconnect(record, sender=Recipe.tags.through)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        new_tag = Tag.objects.get(user=self.user, name='D')
+        self.assertEqual(changes, [
+            ('post_remove', {tags[2].id}),
+            ('post_add', {new_tag.id}),
+        ])
+        self.assertEqual(
+            sorted(tag['name'] for tag in res.data['tags']),
+            ['A', 'B', 'D']
+        )
+
+    def test_update_recipe_with_same_ingredients_writes_nothing(self):
+        """Test an unchanged ingredient list does not touch the relation."""
+        recipe = create_recipe(user=self.user)
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe.ingredients.add(ingredient)
+
+        payload = {'ingredients': [{'name': 'Salt'}]}
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(
+                recipe_detail_url(recipe.id), payload, format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        through_table = Recipe.ingredients.through._meta.db_table
+        for query in ctx.captured_queries:
+            sql = query['sql'].upper()
+            if through_table.upper() in sql:
+                self.assertFalse(sql.startswith(('INSERT', 'DELETE')))
+        self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+
+@override_settings(
+    RECIPE_IMAGES={**settings.RECIPE_IMAGES, 'EXECUTOR': 'fake'}
+)
 class ImageUploadTests(TestCase):
     """Test uploading image API's."""
 
@@ -448,11 +693,14 @@ class ImageUploadTests(TestCase):
             img.save(image_file, format='JPEG')
             image_file.seek(0)
             payload = {'image': image_file}
-            res = self.client.post(url, payload, format='multipart')
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(url, payload, format='multipart')
 
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['image_status'], 'pending')
+        image_pipeline.executor.run_pending()
         self.recipe.refresh_from_db()
-        self.assertIn('image', res.data)
+        self.assertEqual(self.recipe.image_status, 'ready')
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
     def test_upload_image_with_invalid_data(self):
@@ -0,0 +1,256 @@
+"""
+Tests for the recipe counts of tags and ingredients.
+"""
+import threading
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+from django.test import (
+    TestCase,
+    TransactionTestCase
+)
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient
+)
+
+from recipe import serializers
+from recipe.counters import (
+    COUNTED_FIELDS,
+    adjust_recipe_counts,
+    drifted,
+    lock_recipes
+)
+from recipe.importer import (
+    RecipeImporter,
+    read_ndjson
+)
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def recipe_detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_user(email='user@example.com', password='U123@example'):
+    """Create and return a sample user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'sample title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeCountTests(TestCase):
+    """Test recipe counts follow every way of changing links."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        for field_name in COUNTED_FIELDS:
+            self.assertFalse(drifted(field_name).exists())
+
+    def assertCounts(self, model, expected):
+        """Assert the stored recipe count of each named row."""
+        counts = dict(
+            model.objects.filter(user=self.user)
+            .values_list('name', 'recipe_count')
+        )
+        self.assertEqual(counts, expected)
+
+    def test_counts_follow_add_remove_and_clear(self):
+        """Test counts follow the related managers on both sides."""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        r1 = create_recipe(self.user)
+        r2 = create_recipe(self.user)
+
+        r1.tags.add(vegan, quick)
+        r2.tags.add(vegan)
+        r2.tags.add(vegan)
+        self.assertCounts(Tag, {'Vegan': 2, 'Quick': 1})
+
+        r1.tags.remove(quick)
+        r2.tags.remove(quick)
+        self.assertCounts(Tag, {'Vegan': 2, 'Quick': 0})
+
+        quick.recipe_set.add(r1, r2)
+        self.assertCounts(Tag, {'Vegan': 2, 'Quick': 2})
+        vegan.recipe_set.remove(r1)
+        self.assertCounts(Tag, {'Vegan': 1, 'Quick': 2})
+
+        r1.tags.clear()
+        self.assertCounts(Tag, {'Vegan': 1, 'Quick': 1})
+        quick.recipe_set.clear()
+        self.assertCounts(Tag, {'Vegan': 1, 'Quick': 0})
+
+    def test_concurrent_removals_stop_at_zero(self):
+        """Test a link counted down by two removals leaves the count at
+        zero rather than failing."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+
+        # The second request read the link before the first deleted it.
+        recipe.tags.remove(tag)
+        adjust_recipe_counts('tags', {tag.id: -1})
+
+        self.assertCounts(Tag, {'Vegan': 0})
+
+    def test_counts_follow_recipe_api(self):
+        """Test counts follow creating, updating and deleting recipes."""
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': '5.00',
+            'tags': [{'name': 'Vegan'}],
+            'ingredients': [{'name': 'Rice'}, {'name': 'Tofu'}],
+        }
+        res = self.client.post(
+            reverse('recipe:recipe-list'), payload, format='json'
+        )
+        recipe_id = res.data['id']
+        self.assertCounts(Ingredient, {'Rice': 1, 'Tofu': 1})
+
+        self.client.patch(
+            recipe_detail_url(recipe_id),
+            {'ingredients': [{'name': 'Rice'}]},
+            format='json'
+        )
+        self.assertCounts(Ingredient, {'Rice': 1, 'Tofu': 0})
+
+        self.client.delete(recipe_detail_url(recipe_id))
+        self.assertCounts(Tag, {'Vegan': 0})
+        self.assertCounts(Ingredient, {'Rice': 0, 'Tofu': 0})
+
+    def test_counts_follow_bulk_api(self):
+        """Test counts follow bulk creates, updates and deletes."""
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '2.50',
+                'tags': [{'name': 'Quick'}],
+                'ingredients': [{'name': 'Salt'}],
+            }
+            for i in range(3)
+        ]
+        res = self.client.post(BULK_URL, payload, format='json')
+        ids = [item['id'] for item in res.data]
+        self.assertCounts(Tag, {'Quick': 3})
+
+        self.client.patch(BULK_URL, [
+            {'id': ids[0], 'tags': [{'name': 'Slow'}]},
+        ], format='json')
+        self.assertCounts(Tag, {'Quick': 2, 'Slow': 1})
+
+        self.client.delete(BULK_URL, ids[1:], format='json')
+        self.assertCounts(Tag, {'Quick': 0, 'Slow': 1})
+        self.assertCounts(Ingredient, {'Salt': 1})
+
+    def test_counts_follow_import(self):
+        """Test counts follow imported recipes."""
+        Tag.objects.create(user=self.user, name='Quick')
+        lines = [
+            '{"title": "A", "time_minutes": 5, "price": "1.50", '
+            '"tags": ["Quick", "Cheap"]}',
+            '{"title": "B", "time_minutes": 5, "price": "1.50", '
+            '"tags": ["Quick"]}',
+        ]
+
+        RecipeImporter(self.user).run(read_ndjson(lines))
+
+        self.assertCounts(Tag, {'Quick': 2, 'Cheap': 1})
+
+    def test_list_sorted_by_recipe_count(self):
+        """Test tags can be paged by recipe count."""
+        for name, uses in (('A', 1), ('B', 3), ('C', 0), ('D', 2)):
+            tag = Tag.objects.create(user=self.user, name=name)
+            for _ in range(uses):
+                create_recipe(self.user).tags.add(tag)
+
+        res = self.client.get(
+            TAGS_URL, {'ordering': '-recipe_count', 'page_size': 3}
+        )
+        names = [item['name'] for item in res.data['results']]
+        self.assertEqual(res.data['results'][0]['recipe_count'], 3)
+        res = self.client.get(res.data['next'])
+        names.extend(item['name'] for item in res.data['results'])
+
+        self.assertEqual(names, ['B', 'D', 'A', 'C'])
+        res = self.client.get(INGREDIENTS_URL, {'ordering': 'recipe_count'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Needs row locks.')
+class ConcurrentRecipeCountTests(TransactionTestCase):
+    """Test concurrent requests changing the same links count them
+    once."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe = create_recipe(self.user)
+        self.recipe.tags.add(self.tag)
+        create_recipe(self.user, title='other').tags.add(self.tag)
+
+    def test_concurrent_removals_counted_once(self):
+        """Test two requests removing the same link count it down
+        once, both having started before either locked the recipe."""
+        barrier = threading.Barrier(2, timeout=10)
+        responses = []
+
+        def lock_together(recipe_ids):
+            barrier.wait()
+            return lock_recipes(recipe_ids)
+
+        def remove_tags():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                responses.append(client.patch(
+                    recipe_detail_url(self.recipe.id),
+                    {'tags': []},
+                    format='json'
+                ))
+            finally:
+                connection.close()
+
+        with patch.object(serializers, 'lock_recipes', lock_together):
+            threads = [threading.Thread(target=remove_tags) for _ in '12']
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(
+            [res.status_code for res in responses],
+            [status.HTTP_200_OK] * 2
+        )
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, 1)
+        self.assertFalse(drifted('tags').exists())
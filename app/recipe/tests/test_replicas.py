@@ -0,0 +1,208 @@
+"""
+Tests for reading recipe API's from read replicas.
+"""
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import (
+    connections,
+    transaction
+)
+from django.urls import reverse
+from django.test import (
+    TransactionTestCase,
+    override_settings
+)
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db.router import (
+    ReplicaRouter,
+    read_alias,
+    replicas
+)
+from core.models import Recipe
+
+from recipe.views import RecipeApiViewSet
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+REPLICA_ALIASES = settings.READ_REPLICAS['ALIASES']
+
+
+def create_user(email='user@example.com', password='U123@example'):
+    """Create and return a sample user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'sample title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(READ_REPLICAS={
+    **settings.READ_REPLICAS,
+    'ALIASES': ['replica_0'],
+    'CACHE': 'default',
+    'MAX_LAG_SECONDS': 5,
+}, RECIPE_RESPONSE_CACHE={
+    **settings.RECIPE_RESPONSE_CACHE, 'CACHE': 'default'
+})
+class ReplicaReadApiTests(TransactionTestCase):
+    """Test which database the recipe API's read from.
+
+    Requests in a TestCase transaction would read from the primary.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        replicas.reset()
+        replicas.cache.clear()
+        self.read_aliases = []
+
+        def record(router, model, **hints):
+            # Answer None, so the queries still run on the default one.
+            self.read_aliases.append(read_alias())
+
+        patcher = patch.object(
+            ReplicaRouter, 'db_for_read', autospec=True, side_effect=record
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def lag(self, seconds):
+        """Patch the measured replica lag."""
+        return patch.object(replicas, '_measure_lag', return_value=seconds)
+
+    def test_safe_requests_read_from_replica(self):
+        """Test listing recipes and tags reads from the replica."""
+        create_recipe(user=self.user)
+        replicas.cache.clear()
+
+        with self.lag(0):
+            self.client.get(RECIPES_URL)
+            self.client.get(TAGS_URL)
+
+        self.assertTrue(self.read_aliases)
+        self.assertEqual(set(self.read_aliases), {'replica_0'})
+        self.assertIsNone(read_alias())
+
+    def test_read_alias_restored_when_view_raises(self):
+        """Test an uncaught error does not leave the replica chosen for
+        the next request of the thread."""
+        with self.lag(0), patch.object(
+            RecipeApiViewSet, 'list', side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                self.client.get(RECIPES_URL)
+
+        self.assertIsNone(read_alias())
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        """Test reads go to the primary while the replica lags."""
+        with self.lag(60):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(self.read_aliases), {None})
+
+    def test_writer_reads_own_writes_from_primary(self):
+        """Test a user who wrote reads from the primary for a while,
+        unlike other users."""
+        with self.lag(0):
+            res = self.client.post(RECIPES_URL, {
+                'title': 'Curry',
+                'time_minutes': 30,
+                'price': '4.50',
+            })
+            self.read_aliases.clear()
+            self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(set(self.read_aliases), {None})
+        self.assertFalse(replicas.is_sticky(create_user('o@example.com').id))
+
+    def test_writes_outside_api_sticky(self):
+        """Test a write by a worker or command, as by any other code
+        changing the user's rows, also keeps the user on the primary."""
+        recipe = create_recipe(user=self.user)
+        replicas.cache.clear()
+
+        recipe.image_status = Recipe.ImageStatus.READY
+        recipe.save(update_fields=['image_status'])
+
+        self.assertTrue(replicas.is_sticky(self.user.id))
+
+    def test_replica_reads_not_cached(self):
+        """Test a response read from a replica is neither cached nor
+        given an ETag, as the replica may lag the user's version."""
+        with self.lag(0):
+            first = self.client.get(RECIPES_URL)
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(set(self.read_aliases), {'replica_0'})
+        self.assertNotIn('ETag', first)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'MISS')
+
+    def test_failed_write_not_sticky(self):
+        """Test a rejected write leaves the user reading from replicas."""
+        res = self.client.post(RECIPES_URL, {'title': ''})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(replicas.is_sticky(self.user.id))
+
+
+@skipUnless(REPLICA_ALIASES, 'Needs a replica alias, e.g. DB_REPLICA_HOSTS.')
+@override_settings(READ_REPLICAS={
+    **settings.READ_REPLICAS, 'CACHE': 'default'
+})
+class ReplicaDatabaseTests(TransactionTestCase):
+    """Test reading from a second database alias, which mirrors the
+    default database in tests."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user, title='Curry')
+        replicas.reset()
+        replicas.cache.clear()
+
+    def test_list_queries_run_on_replica(self):
+        """Test the list is read through the replica connection."""
+        replica = connections[REPLICA_ALIASES[0]]
+        with self.settings(READ_REPLICAS={
+            **settings.READ_REPLICAS, 'ALIASES': REPLICA_ALIASES[:1]
+        }), CaptureQueriesContext(replica) as ctx:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['title'], 'Curry')
+        self.assertTrue(any(
+            Recipe._meta.db_table in query['sql']
+            for query in ctx.captured_queries
+        ))
+
+    def test_reads_in_transaction_stay_on_primary(self):
+        """Test no replica is chosen inside a transaction."""
+        with transaction.atomic():
+            self.assertIsNone(replicas.choose(self.user.id))
+
+        self.assertIn(replicas.choose(self.user.id), REPLICA_ALIASES)
@@ -0,0 +1,255 @@
+"""
+Tests for the recipe image resize endpoint.
+"""
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from unittest import skipUnless
+
+from PIL import Image
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from django.test import (
+    SimpleTestCase,
+    TestCase
+)
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+from recipe.images import writable_formats
+from recipe.resize import (
+    ResizeCache,
+    SingleFlight
+)
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def image_url(recipe_id):
+    """Create and return a recipe image URL."""
+    return reverse('recipe:recipe-image', args=[recipe_id])
+
+
+def create_user(email='user@example.com', password='U123@example'):
+    """Create and return a sample user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'sample title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def image_bytes(size=(200, 100), **save_params):
+    """Return the bytes of a generated JPEG image."""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'JPEG', **save_params)
+    return buffer.getvalue()
+
+
+def open_image(res):
+    """Return the image served by a response."""
+    return Image.open(io.BytesIO(b''.join(res.streaming_content)))
+
+
+class ImageResizeApiTests(TestCase):
+    """Test images are resized on request and cached."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(self.user)
+        self.recipe.image.save('photo.jpg', ContentFile(image_bytes()))
+        self.addCleanup(self.recipe.image.delete, save=False)
+
+        cache_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_root)
+        override = self.settings(RECIPE_IMAGES={
+            **settings.RECIPE_IMAGES,
+            'RESIZE_CACHE_ROOT': cache_root,
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_image_resized_and_cached(self):
+        """Test a rendering fits the box and is served from the cache."""
+        res = self.client.get(image_url(self.recipe.id), {'w': 50})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(open_image(res).size, (50, 25))
+
+        res = self.client.get(image_url(self.recipe.id), {'w': 50})
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(open_image(res).size, (50, 25))
+
+    def test_only_versioned_url_cached_long(self):
+        """Test a URL naming the current image version may be kept,
+        while the URL without it, or with an old one, is revalidated."""
+        version = self.client.get(
+            detail_url(self.recipe.id)
+        ).data['image_version']
+
+        res = self.client.get(image_url(self.recipe.id), {'v': version})
+
+        self.assertIn('max-age=', res['Cache-Control'])
+        self.assertIn('immutable', res['Cache-Control'])
+
+        old_name = self.recipe.image.name
+        self.recipe.image.save('other.jpg', ContentFile(image_bytes()))
+        self.recipe.image.storage.delete(old_name)
+        for params in ({}, {'v': version}):
+            res = self.client.get(image_url(self.recipe.id), params)
+
+            self.assertEqual(res['Cache-Control'], 'private, no-cache')
+
+    @skipUnless(writable_formats(['webp']), 'Pillow cannot write WebP.')
+    def test_image_converted_and_never_enlarged(self):
+        """Test the format can be chosen and small images kept."""
+        res = self.client.get(
+            image_url(self.recipe.id), {'w': 400, 'h': 40, 'fmt': 'webp'}
+        )
+
+        self.assertEqual(res['Content-Type'], 'image/webp')
+        image = open_image(res)
+        self.assertEqual(image.format, 'WEBP')
+        self.assertEqual(image.size, (80, 40))
+
+        res = self.client.get(image_url(self.recipe.id), {'w': 400})
+
+        self.assertEqual(open_image(res).size, (200, 100))
+
+    def test_exif_orientation_applied(self):
+        """Test the box applies to the upright image."""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotated 90 degrees clockwise.
+        self.recipe.image.save('rotated.jpg', ContentFile(
+            image_bytes(size=(40, 20), exif=exif.tobytes())
+        ))
+
+        res = self.client.get(image_url(self.recipe.id), {'w': 10})
+
+        self.assertEqual(open_image(res).size, (10, 20))
+
+    def test_not_modified_when_etag_matches(self):
+        """Test a matching ETag is answered without a body."""
+        res = self.client.get(image_url(self.recipe.id), {'h': 10})
+
+        res = self.client.get(
+            image_url(self.recipe.id), {'h': 10},
+            HTTP_IF_NONE_MATCH=res['ETag']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_invalid_parameters_rejected(self):
+        """Test sizes and formats are validated, errors as JSON."""
+        res = self.client.get(
+            image_url(self.recipe.id),
+            {'w': 0, 'h': 'tall', 'fmt': 'bmp'},
+            HTTP_ACCEPT='image/webp'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(set(res.data), {'w', 'h', 'fmt'})
+
+    def test_missing_or_foreign_image_not_found(self):
+        """Test recipes without an image or of others give 404."""
+        other = create_recipe(create_user(email='other@example.com'))
+        for recipe in (create_recipe(self.user), other):
+            res = self.client.get(image_url(recipe.id))
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ResizeCacheTests(SimpleTestCase):
+    """Test the disk cache stays within its size."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_least_recently_used_evicted(self):
+        """Test the files used least recently are evicted first."""
+        cache = ResizeCache(self.root, max_bytes=30)
+        paths = [cache.path(f'{key}0', '.jpg') for key in 'abc']
+        for used, path in enumerate(paths):
+            cache.put(path, b'x' * 10)
+            os.utime(path, ns=(used, used))
+        cache.open(paths[0]).close()
+
+        cache.put(cache.path('d0', '.jpg'), b'x' * 10)
+
+        self.assertEqual(
+            [os.path.exists(path) for path in paths], [True, False, False]
+        )
+        self.assertEqual(cache.usage(), 20)
+
+    def test_processes_sharing_directory_stay_near_limit(self):
+        """Test caches in several processes see each other's writes
+        and keep the directory near the limit."""
+        caches = [ResizeCache(self.root, max_bytes=100) for _ in range(4)]
+        for index in range(40):
+            cache = caches[index % len(caches)]
+            cache.put(cache.path(f'{index:02d}', '.jpg'), b'x' * 10)
+
+            self.assertLessEqual(cache.usage(), 100 + 10 * len(caches))
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Test concurrent calls are coalesced."""
+
+    def test_concurrent_calls_share_one_call(self):
+        """Test callers arriving during a call wait for its result."""
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def render():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return b'image'
+
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(flight.do('key', render))
+            )
+            for _ in range(4)
+        ]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [b'image'] * 4)
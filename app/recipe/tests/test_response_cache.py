@@ -0,0 +1,154 @@
+"""
+Tests for the per-user versioned response cache.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import (
+    TestCase,
+    override_settings
+)
+
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag
+)
+
+from recipe.cache import response_cache
+
+
+RECIPE_LIST_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def create_user(email='user@example.com', password='U123@example'):
+    """Create and return a sample user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'sample title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(RECIPE_RESPONSE_CACHE={
+    **settings.RECIPE_RESPONSE_CACHE, 'CACHE': 'default'
+})
+class ResponseCacheTests(TestCase):
+    """Test caching list responses per user."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        response_cache.reset_stats()
+
+    def test_repeated_list_served_from_cache(self):
+        """Test the second identical request runs no queries."""
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPE_LIST_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(RECIPE_LIST_URL)
+
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.data, res.data)
+        self.assertEqual(response_cache.stats(), {'hits': 1, 'misses': 1})
+
+    def test_creating_recipe_invalidates_list(self):
+        """Test a new recipe shows up in the next list response."""
+        self.client.get(RECIPE_LIST_URL)
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPE_LIST_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_m2m_change_invalidates_list(self):
+        """Test tagging a recipe invalidates the cached list."""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(RECIPE_LIST_URL, {'tags': str(tag.id)})
+
+        recipe.tags.add(tag)
+        res = self.client.get(RECIPE_LIST_URL, {'tags': str(tag.id)})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'][0]['id'], recipe.id)
+
+    def test_other_user_writes_keep_cache(self):
+        """Test writes by another user do not invalidate the cache."""
+        other_user = create_user(email='other@example.com')
+        self.client.get(RECIPE_LIST_URL)
+
+        create_recipe(user=other_user)
+        res = self.client.get(RECIPE_LIST_URL)
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+    def test_list_params_normalized(self):
+        """Test the order of filter ids does not change the cache key."""
+        tag1 = Tag.objects.create(user=self.user, name='Tag1')
+        tag2 = Tag.objects.create(user=self.user, name='Tag2')
+        self.client.get(RECIPE_LIST_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        res = self.client.get(
+            RECIPE_LIST_URL, {'tags': f'{tag2.id},{tag1.id}'}
+        )
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+    def test_renaming_tag_invalidates_tag_list(self):
+        """Test updating a tag invalidates the cached tag list."""
+        tag = Tag.objects.create(user=self.user, name='Old')
+        self.client.get(TAGS_URL)
+
+        self.client.patch(
+            reverse('recipe:tag-detail', args=[tag.id]), {'name': 'New'}
+        )
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'][0]['name'], 'New')
+
+    def test_write_in_transaction_bumps_again_on_commit(self):
+        """Test a list cached while a write is uncommitted is not
+        served after the commit."""
+        with self.captureOnCommitCallbacks(execute=True):
+            create_recipe(user=self.user)
+            version = response_cache.data_version(self.user.id)
+
+        self.assertNotEqual(
+            response_cache.data_version(self.user.id), version
+        )
+
+
+class ResponseCacheDisabledTests(TestCase):
+    """Test lists are not cached without a shared cache alias."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_cached(self):
+        """Test every request builds the list."""
+        self.client.get(RECIPE_LIST_URL)
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPE_LIST_URL)
+
+        self.assertNotIn('X-Cache', res)
+        self.assertEqual(len(res.data['results']), 1)
@@ -0,0 +1,204 @@
+"""
+Tests for the recipe full-text search.
+"""
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+from django.test import TransactionTestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient
+)
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_user(email='user@example.com', password='U123@example'):
+    """Create and return a sample user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'sample title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeSearchApiTests(TransactionTestCase):
+    """Test searching recipes.
+
+    Search vectors are only updated once the writes commit.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+    def search(self, terms, **params):
+        """Return the recipe ids of a search request."""
+        res = self.client.get(RECIPES_URL, {'search': terms, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_search_title_and_description(self):
+        """Test searching matches titles and descriptions."""
+        r1 = create_recipe(self.user, title='Mushroom risotto')
+        r2 = create_recipe(
+            self.user, title='Pasta', description='With mushroom sauce'
+        )
+        create_recipe(self.user, title='Pancakes')
+
+        self.assertEqual(set(self.search('mushroom')), {r1.id, r2.id})
+
+    def test_search_ranks_title_matches_first(self):
+        """Test recipes matching on the title rank above the rest."""
+        r1 = create_recipe(
+            self.user, title='Pasta', description='With mushroom sauce'
+        )
+        r2 = create_recipe(self.user, title='Mushroom risotto')
+
+        self.assertEqual(self.search('mushroom'), [r2.id, r1.id])
+
+    def test_search_tag_and_ingredient_names(self):
+        """Test searching matches tag and ingredient names."""
+        r1 = create_recipe(self.user, title='Curry')
+        r1.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        r2 = create_recipe(self.user, title='Soup')
+        r2.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Vegan stock')
+        )
+        create_recipe(self.user, title='Steak')
+
+        self.assertEqual(set(self.search('vegan')), {r1.id, r2.id})
+
+    def test_search_follows_related_changes(self):
+        """Test renamed, added and removed names are searchable."""
+        recipe = create_recipe(self.user, title='Curry')
+        tag = Tag.objects.create(user=self.user, name='Spicy')
+        recipe.tags.add(tag)
+        self.assertEqual(self.search('spicy'), [recipe.id])
+
+        tag.name = 'Mild'
+        tag.save()
+        self.assertEqual(self.search('spicy'), [])
+        self.assertEqual(self.search('mild'), [recipe.id])
+
+        self.client.patch(
+            detail_url(recipe.id),
+            {'ingredients': [{'name': 'Coconut'}]},
+            format='json'
+        )
+        self.assertEqual(self.search('coconut'), [recipe.id])
+
+        tag.delete()
+        self.assertEqual(self.search('mild'), [])
+
+    def test_search_bulk_created_recipes(self):
+        """Test recipes written in bulk are searchable."""
+        payload = [{
+            'title': 'Lentil dal',
+            'time_minutes': 30,
+            'price': '3.00',
+            'tags': [{'name': 'Indian'}],
+        }]
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(self.search('indian'), [res.data[0]['id']])
+
+    def test_search_combines_with_filters(self):
+        """Test searching composes with the tag filter."""
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        r1 = create_recipe(self.user, title='Chicken curry')
+        r1.tags.add(tag)
+        create_recipe(self.user, title='Chicken salad')
+
+        ids = self.search('chicken', tags=str(tag.id))
+
+        self.assertEqual(ids, [r1.id])
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes are never returned."""
+        other = create_user(email='other@example.com')
+        create_recipe(other, title='Chicken curry')
+        recipe = create_recipe(self.user, title='Chicken soup')
+
+        self.assertEqual(self.search('chicken'), [recipe.id])
+
+    def test_search_results_paginate(self):
+        """Test following cursors returns every match once."""
+        recipes = [
+            create_recipe(self.user, title=f'Chicken {i}') for i in range(3)
+        ]
+        create_recipe(self.user, title='Salad')
+
+        ids = []
+        res = self.client.get(RECIPES_URL, {'search': 'chicken',
+                                            'page_size': 2})
+        while True:
+            ids.extend(recipe['id'] for recipe in res.data['results'])
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(sorted(ids), sorted(r.id for r in recipes))
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only.')
+    def test_search_vector_written_once_per_transaction(self):
+        """Test creating a recipe with tags and ingredients rewrites its
+        search vector once, and saving only its image status not at
+        all."""
+        updates = []
+
+        def record(execute, sql, params, many, context):
+            if 'SET search_vector' in sql:
+                updates.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            res = self.client.post(RECIPES_URL, {
+                'title': 'Curry',
+                'time_minutes': 30,
+                'price': '4.50',
+                'tags': [{'name': 'Vegan'}, {'name': 'Spicy'}],
+                'ingredients': [{'name': 'Rice'}],
+            }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.search('spicy rice'), [res.data['id']])
+
+        recipe = Recipe.objects.get(id=res.data['id'])
+        recipe.image_status = Recipe.ImageStatus.PENDING
+        with connection.execute_wrapper(record):
+            recipe.save(update_fields=['image_status', 'updated_at'])
+
+        self.assertEqual(len(updates), 1)
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only.')
+    def test_search_uses_stemming(self):
+        """Test words match across inflections on PostgreSQL."""
+        recipe = create_recipe(self.user, title='Roasted potatoes')
+
+        self.assertEqual(self.search('roast potato'), [recipe.id])
@@ -3,9 +3,15 @@ Test for the tags API's.
 """
 from decimal import Decimal
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
-from django.test import TestCase
+from django.test import (
+    TestCase,
+    override_settings
+)
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -18,6 +24,7 @@ from core.models import (
 from recipe.serializers import TagSerializer
 
 TAGS_URL = reverse('recipe:tag-list')
+AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
 
 
 def tag_detail_url(tag_id):
@@ -60,7 +67,7 @@ class PrivateTagsApiTest(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_authenticated_user(self):
         """Test for showing tags that only belong to authenticated user."""
@@ -71,9 +78,9 @@ class PrivateTagsApiTest(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], sample_tag.name)
-        self.assertEqual(res.data[0]['id'], sample_tag.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], sample_tag.name)
+        self.assertEqual(res.data['results'][0]['id'], sample_tag.id)
 
     def test_update_tag_successfully(self):
         """Test for updating tag API's."""
@@ -109,14 +116,15 @@ class PrivateTagsApiTest(TestCase):
         )
 
         recipe1.tags.add(tag1)
+        tag1.refresh_from_db()
 
         ser1 = TagSerializer(tag1)
         ser2 = TagSerializer(tag2)
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        self.assertIn(ser1.data, res.data)
-        self.assertNotIn(ser2.data, res.data)
+        self.assertIn(ser1.data, res.data['results'])
+        self.assertNotIn(ser2.data, res.data['results'])
 
     def test_filter_assigned_tags_unique(self):
         """Test filtered tags return a unique list."""
@@ -141,4 +149,122 @@ class PrivateTagsApiTest(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_tags_paginated_by_name_and_id(self):
+        """Test tags are paged by cursor in -name, -id order."""
+        for name in ['Apple', 'Banana', 'Cherry']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        names = [item['name'] for item in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names.extend(item['name'] for item in res.data['results'])
+
+        self.assertEqual(names, ['Cherry', 'Banana', 'Apple'])
+        self.assertIsNone(res.data['next'])
+
+    def test_filter_assigned_tags_without_distinct(self):
+        """Test assigned_only is a semi-join rather than join+distinct."""
+        tag = Tag.objects.create(user=self.user, name='Tag1')
+        for title in ['Recipe1', 'Recipe2']:
+            Recipe.objects.create(
+                user=self.user,
+                title=title,
+                price=Decimal('5.50'),
+                time_minutes=15
+            ).tags.add(tag)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(res.data['results']), 1)
+        for query in ctx.captured_queries:
+            self.assertNotIn('DISTINCT', query['sql'].upper())
+
+    def test_filter_assigned_only_invalid(self):
+        """Test a non integer assigned_only is a 400 error."""
+        res = self.client.get(TAGS_URL, {'assigned_only': 'yes'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(RECIPE_RESPONSE_CACHE={
+    **settings.RECIPE_RESPONSE_CACHE, 'CACHE': 'default'
+})
+class TagAutocompleteApiTests(TestCase):
+    """Test autocompleting tag names."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+    def test_autocomplete_prefix_matches_first(self):
+        """Test prefix matches come first, shortest names first."""
+        for name in ['Sweet', 'Sweet and sour', 'Bittersweet', 'Salty']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'swe'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['name'] for item in res.data],
+            ['Sweet', 'Sweet and sour', 'Bittersweet']
+        )
+        self.assertEqual(set(res.data[0]), {'id', 'name'})
+
+    def test_autocomplete_short_query_only_matches_prefix(self):
+        """Test one or two characters only match at the start."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Ovo')
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'v'})
+
+        self.assertEqual([item['name'] for item in res.data], ['Vegan'])
+
+    def test_autocomplete_limited(self):
+        """Test suggestions are bounded by limit and its maximum."""
+        Tag.objects.bulk_create(
+            Tag(user=self.user, name=f'Tag{i:02}') for i in range(60)
+        )
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'tag'})
+        self.assertEqual(len(res.data), 10)
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'tag', 'limit': 3})
+        self.assertEqual(
+            [item['name'] for item in res.data], ['Tag00', 'Tag01', 'Tag02']
+        )
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'tag', 'limit': 100})
+        self.assertEqual(len(res.data), 50)
+
+    def test_autocomplete_limited_to_user(self):
+        """Test other users' tags are never suggested."""
+        other = create_user(email='other@example.com')
+        Tag.objects.create(user=other, name='Vegan')
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'veg'})
+
+        self.assertEqual(res.data, [])
+
+    def test_autocomplete_invalid_params(self):
+        """Test a missing query or invalid limit is a 400 error."""
+        res = self.client.get(AUTOCOMPLETE_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'a', 'limit': 0})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete_cached_until_names_change(self):
+        """Test repeated queries are cached and renames invalidate."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(AUTOCOMPLETE_URL, {'q': 'veg'})
+
+        with self.assertNumQueries(0):
+            res = self.client.get(AUTOCOMPLETE_URL, {'q': 'veg'})
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+        self.client.patch(tag_detail_url(tag.id), {'name': 'Vegetarian'})
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'veg'})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual([item['name'] for item in res.data], ['Vegetarian'])
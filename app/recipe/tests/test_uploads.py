@@ -0,0 +1,288 @@
+"""
+Tests for resumable recipe image uploads.
+"""
+import hashlib
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+
+from PIL import Image
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    ImageUpload
+)
+
+from recipe.images import image_pipeline
+from recipe.uploads import (
+    OffsetConflict,
+    chunked_uploads
+)
+
+
+CHUNK_TYPE = 'application/offset+octet-stream'
+
+
+def create_upload_url(recipe_id):
+    """Create and return the URL starting an upload for a recipe."""
+    return reverse('recipe:recipe-create-upload', args=[recipe_id])
+
+
+def upload_url(upload_id):
+    """Create and return an upload detail URL."""
+    return reverse('recipe:imageupload-detail', args=[upload_id])
+
+
+def finalize_url(upload_id):
+    """Create and return an upload finalize URL."""
+    return reverse('recipe:imageupload-finalize', args=[upload_id])
+
+
+def create_user(email='user@example.com', password='U123@example'):
+    """Create and return a sample user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'sample title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def image_bytes(size=(40, 20)):
+    """Return the bytes of a generated JPEG image."""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'green').save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class ChunkedUploadApiTests(TestCase):
+    """Test images can be uploaded in resumable chunks."""
+
+    def setUp(self):
+        staging_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, staging_root)
+        override = self.settings(RECIPE_IMAGES={
+            **settings.RECIPE_IMAGES,
+            'EXECUTOR': 'fake',
+            'STAGING_ROOT': staging_root,
+            'MAX_DIMENSION': 32,
+            'UPLOAD_MAX_BYTES': 10000,
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(self.user)
+        self.content = image_bytes()
+
+    def tearDown(self):
+        image_pipeline.executor.pending.clear()
+        self.recipe.refresh_from_db()
+        if self.recipe.image:
+            self.recipe.image.delete()
+
+    def start(self, **payload):
+        """Start an upload of the content and return its id."""
+        payload.setdefault('size', len(self.content))
+        res = self.client.post(
+            create_upload_url(self.recipe.id), payload, format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(res['Location'].endswith(upload_url(res.data['id'])))
+        return res.data['id']
+
+    def put_chunk(self, upload_id, offset, end=None):
+        """Send the content from offset to end as a chunk."""
+        return self.client.put(
+            upload_url(upload_id),
+            self.content[offset:end],
+            content_type=CHUNK_TYPE,
+            HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def finalize(self, upload_id):
+        """Finalize an upload and return the response."""
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(finalize_url(upload_id))
+
+    def test_upload_in_chunks(self):
+        """Test chunks are appended and the image processed once done."""
+        upload_id = self.start(
+            sha256=hashlib.sha256(self.content).hexdigest()
+        )
+
+        res = self.put_chunk(upload_id, 0, 100)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['offset'], 100)
+        self.assertEqual(res['Upload-Offset'], '100')
+
+        res = self.client.get(upload_url(upload_id))
+
+        self.assertEqual(res.data['offset'], 100)
+
+        self.put_chunk(upload_id, 100)
+        res = self.finalize(upload_id)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['image_status'], Recipe.ImageStatus.PENDING)
+        self.assertFalse(ImageUpload.objects.exists())
+
+        image_pipeline.executor.run_pending()
+        self.recipe.refresh_from_db()
+
+        self.assertEqual(self.recipe.image_status, Recipe.ImageStatus.READY)
+        self.assertEqual(image_pipeline.staging.listdir('sessions')[1], [])
+
+    def test_hash_rebuilt_when_resumed_elsewhere(self):
+        """Test the hash holds when another process saw earlier chunks."""
+        upload_id = self.start(
+            sha256=hashlib.sha256(self.content).hexdigest()
+        )
+        self.put_chunk(upload_id, 0, 100)
+        chunked_uploads._hashers.clear()
+        self.put_chunk(upload_id, 100)
+
+        res = self.finalize(upload_id)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+
+    def test_misplaced_chunks_rejected(self):
+        """Test chunks must start at the offset and fit the size."""
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, 100)
+
+        res = self.put_chunk(upload_id, 50, 150)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+        res = self.client.put(
+            upload_url(upload_id),
+            self.content[100:] + b'extra',
+            content_type=CHUNK_TYPE,
+            HTTP_UPLOAD_OFFSET='100'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.put(
+            upload_url(upload_id), b'', content_type=CHUNK_TYPE
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            ImageUpload.objects.get(id=upload_id).offset, 100
+        )
+
+    def test_chunk_racing_another_rejected(self):
+        """Test a chunk received while another one advanced the upload
+        is rejected and leaves the staged bytes alone."""
+        upload_id = self.start()
+        upload = ImageUpload.objects.get(id=upload_id)
+
+        class Stream(io.BytesIO):
+            def read(stream, size=-1):
+                # A retry of the chunk lands while this one streams.
+                ImageUpload.objects.filter(id=upload_id).update(offset=100)
+                return super().read(size)
+
+        with self.assertRaises(OffsetConflict):
+            chunked_uploads.write(upload, 0, Stream(b'x' * 100), 100)
+
+        self.assertEqual(ImageUpload.objects.get(id=upload_id).offset, 100)
+        with image_pipeline.staging.open(
+            chunked_uploads.staged_name(upload)
+        ) as staged:
+            self.assertEqual(staged.read(), b'')
+        self.assertEqual(
+            image_pipeline.staging.listdir('sessions')[1],
+            [f'{upload_id}.part']
+        )
+
+    def test_finalize_checks_completion_and_hash(self):
+        """Test incomplete or corrupted uploads are not queued."""
+        upload_id = self.start(sha256='0' * 64)
+        self.put_chunk(upload_id, 0, 100)
+
+        res = self.finalize(upload_id)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('offset', res.data)
+
+        self.put_chunk(upload_id, 100)
+        res = self.finalize(upload_id)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('sha256', res.data)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.ImageStatus.NONE)
+
+    def test_size_limited(self):
+        """Test uploads larger than the limit cannot be started."""
+        res = self.client.post(
+            create_upload_url(self.recipe.id), {'size': 10001}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_uploads_of_other_users_not_found(self):
+        """Test uploads are private to their user."""
+        upload_id = self.start()
+        self.client.force_authenticate(create_user('other@example.com'))
+
+        res = self.put_chunk(upload_id, 0)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_delete_discards_staged_bytes(self):
+        """Test deleting an upload removes its staged file."""
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, 100)
+
+        res = self.client.delete(upload_url(upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(image_pipeline.staging.listdir('sessions')[1], [])
+
+    def test_idle_uploads_collected(self):
+        """Test idle uploads and staged files without one are deleted."""
+        idle_id = self.start()
+        active_id = self.start()
+        self.put_chunk(active_id, 0, 100)
+        ImageUpload.objects.filter(id=idle_id).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+
+        expired, removed = chunked_uploads.collect_garbage(
+            now=timezone.now() + timedelta(hours=12)
+        )
+
+        self.assertEqual(expired, 1)
+        self.assertEqual(removed, 0)
+        remaining = ImageUpload.objects.values_list('id', flat=True)
+        self.assertEqual([str(pk) for pk in remaining], [active_id])
+
+        expired, removed = chunked_uploads.collect_garbage(
+            now=timezone.now() + timedelta(days=2)
+        )
+
+        self.assertEqual((expired, removed), (1, 2))
+        self.assertEqual(image_pipeline.staging.listdir('sessions')[1], [])
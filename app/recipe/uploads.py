@@ -0,0 +1,258 @@
+"""
+Resumable, chunked uploads of recipe images.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import (
+    gettext as _,
+    gettext_lazy
+)
+
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException,
+    ValidationError
+)
+
+from core.models import ImageUpload
+
+from .images import image_pipeline
+
+
+class OffsetConflict(APIException):
+    """A chunk which does not start where the upload stands."""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = gettext_lazy('Chunk does not start at the upload offset.')
+    default_code = 'offset_conflict'
+
+
+class ChunkedUploads:
+    """Write chunks of resumable uploads into the image staging area
+    and hand finished uploads to the image pipeline.
+
+    The SHA-256 of each upload is computed as its chunks stream to
+    disk. The hash state of recent uploads is kept per process and is
+    rebuilt from the staged bytes when a chunk lands in another one.
+    """
+    block_size = 64 * 1024
+    # Uploads whose hash state is kept by this process.
+    max_hashers = 256
+
+    def __init__(self):
+        self._hashers = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return image_pipeline.config
+
+    @property
+    def staging(self):
+        return image_pipeline.staging
+
+    def staged_name(self, upload):
+        """Return the staging name the chunks of an upload go to."""
+        return os.path.join('sessions', f'{upload.id}.part')
+
+    def expires_at(self, upload):
+        """Return when an upload left idle will be collected."""
+        return upload.updated_at + timedelta(
+            seconds=self.config['UPLOAD_SESSION_TTL']
+        )
+
+    def create(self, user, recipe, size, sha256=''):
+        """Start an upload of size bytes with an empty staged file."""
+        upload = ImageUpload.objects.create(
+            user=user, recipe=recipe, size=size, sha256=sha256
+        )
+        path = self.staging.path(self.staged_name(upload))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'wb').close()
+
+        return upload
+
+    def check(self, upload, offset, length):
+        """Raise unless a chunk of length bytes may start at offset."""
+        if offset != upload.offset:
+            raise OffsetConflict(
+                _('Chunk starts at %(offset)d, the upload is at %(at)d.')
+                % {'offset': offset, 'at': upload.offset}
+            )
+        if length > upload.size - offset:
+            msg = _('Chunk ends past the upload size of %(size)d bytes.')
+            raise ValidationError(
+                {'Content-Length': [msg % {'size': upload.size}]}
+            )
+        if length > self.config['UPLOAD_CHUNK_MAX_BYTES']:
+            msg = _('Chunks may not exceed %(max)d bytes.')
+            raise ValidationError({'Content-Length': [
+                msg % {'max': self.config['UPLOAD_CHUNK_MAX_BYTES']}
+            ]})
+
+    def write(self, upload, offset, stream, length):
+        """Stream a chunk of length bytes starting at offset to disk.
+
+        The chunk is received into a file of its own outside of any
+        transaction, as slow clients may take long to send it. A short
+        transaction then advances the offset, only if no other chunk
+        did meanwhile, and copies the chunk into the staged upload. A
+        chunk cut short by a dropped connection still counts, so the
+        client resumes from the bytes which did arrive.
+        """
+        self.check(upload, offset, length)
+        hasher = self._hasher(upload)
+        fd, chunk_path = tempfile.mkstemp(
+            dir=os.path.dirname(self.staging.path(self.staged_name(upload))),
+            prefix=f'{upload.id}.',
+            suffix='.chunk'
+        )
+        try:
+            written = 0
+            with os.fdopen(fd, 'w+b') as chunk:
+                while written < length:
+                    try:
+                        block = stream.read(
+                            min(self.block_size, length - written)
+                        )
+                    except OSError:
+                        break
+                    if not block:
+                        break
+                    chunk.write(block)
+                    hasher.update(block)
+                    written += len(block)
+
+                chunk.seek(0)
+                with transaction.atomic():
+                    advanced = ImageUpload.objects.filter(
+                        id=upload.id, offset=offset
+                    ).update(
+                        offset=offset + written, updated_at=timezone.now()
+                    )
+                    if not advanced:
+                        raise OffsetConflict(_(
+                            'Another chunk was received at %(offset)d.'
+                        ) % {'offset': offset})
+                    # The row stays locked until the chunk is in place.
+                    with self.staging.open(
+                        self.staged_name(upload), 'r+b'
+                    ) as staged:
+                        staged.seek(offset)
+                        shutil.copyfileobj(chunk, staged, self.block_size)
+        finally:
+            os.remove(chunk_path)
+
+        upload.offset = offset + written
+        self._remember(upload, hasher)
+        return upload
+
+    def finalize(self, upload):
+        """Verify a complete upload and queue it for processing,
+        returning its recipe."""
+        if upload.offset != upload.size:
+            msg = _('Only %(offset)d of %(size)d bytes were received.')
+            raise ValidationError({'offset': [
+                msg % {'offset': upload.offset, 'size': upload.size}
+            ]})
+        digest = self._hasher(upload).hexdigest()
+        if upload.sha256 and digest != upload.sha256:
+            raise ValidationError({'sha256': [
+                _('Received bytes hash to %(digest)s.') % {'digest': digest}
+            ]})
+
+        recipe = upload.recipe
+        staged_name = self.staged_name(upload)
+        self._forget(upload)
+        upload.delete()
+        image_pipeline.enqueue(recipe, staged_name)
+        return recipe
+
+    def discard(self, upload):
+        """Delete an upload and its staged bytes."""
+        self._forget(upload)
+        self.staging.delete(self.staged_name(upload))
+        upload.delete()
+
+    def collect_garbage(self, now=None):
+        """Delete uploads idle for longer than the session TTL and
+        staged files left without an upload, returning how many of
+        each were deleted."""
+        cutoff = (now or timezone.now()) - timedelta(
+            seconds=self.config['UPLOAD_SESSION_TTL']
+        )
+        expired = ImageUpload.objects.filter(
+            updated_at__lt=cutoff
+        ).delete()[0]
+
+        if not self.staging.exists('sessions'):
+            return expired, 0
+        stale = {
+            name[:-len('.part')]: name
+            for name in self.staging.listdir('sessions')[1]
+            if name.endswith('.part') and self.staging.get_modified_time(
+                os.path.join('sessions', name)
+            ) < cutoff
+        }
+        live = {
+            str(pk) for pk in ImageUpload.objects.filter(
+                id__in=list(stale)
+            ).values_list('id', flat=True)
+        }
+        removed = 0
+        for upload_id, name in stale.items():
+            if upload_id not in live:
+                self.staging.delete(os.path.join('sessions', name))
+                removed += 1
+        # Chunks left behind by a process dying while receiving them.
+        for name in self.staging.listdir('sessions')[1]:
+            path = os.path.join('sessions', name)
+            if (
+                name.endswith('.chunk')
+                and self.staging.get_modified_time(path) < cutoff
+            ):
+                self.staging.delete(path)
+                removed += 1
+
+        return expired, removed
+
+    def _hasher(self, upload):
+        """Return the hash of the bytes received so far, hashing the
+        staged file when this process did not see the last chunk."""
+        with self._lock:
+            offset, hasher = self._hashers.get(upload.id, (None, None))
+        if offset == upload.offset:
+            return hasher.copy()
+
+        hasher = hashlib.sha256()
+        remaining = upload.offset
+        with self.staging.open(self.staged_name(upload), 'rb') as staged:
+            while remaining:
+                block = staged.read(min(self.block_size, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+
+        return hasher
+
+    def _remember(self, upload, hasher):
+        with self._lock:
+            self._hashers[upload.id] = (upload.offset, hasher)
+            self._hashers.move_to_end(upload.id)
+            while len(self._hashers) > self.max_hashers:
+                self._hashers.popitem(last=False)
+
+    def _forget(self, upload):
+        with self._lock:
+            self._hashers.pop(upload.id, None)
+
+
+chunked_uploads = ChunkedUploads()
@@ -15,6 +15,7 @@ router = routers.DefaultRouter()
 router.register('recipes', views.RecipeApiViewSet)
 router.register('tags', views.TagApiViewSet)
 router.register('ingredients', views.IngredientApiViewSet)
+router.register('uploads', views.ImageUploadApiViewSet)
 
 app_name = 'recipe'
 
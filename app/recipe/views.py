@@ -1,6 +1,9 @@
 """
 Views for recipe API's.
 """
+import codecs
+from collections import Counter
+
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -8,30 +11,98 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 
+from django.db import transaction
+from django.http import (
+    FileResponse,
+    StreamingHttpResponse
+)
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    IntegerField,
+    OuterRef,
+    Prefetch,
+    Value,
+    When
+)
+from django.db.models.functions import Length
+from django.utils.cache import get_conditional_response
+from django.utils.translation import gettext as _
+
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework import (
     viewsets,
     mixins,
     status
 )
-from rest_framework import (
-    authentication,
-    permissions
-)
+from rest_framework import permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import (
+    NotFound,
+    ValidationError
+)
+from rest_framework.filters import OrderingFilter
+from rest_framework.parsers import MultiPartParser
 
+from user.authentication import CachedTokenAuthentication
+
+from .cache import (
+    CachedListMixin,
+    response_cache
+)
+from .export import (
+    iter_recipe_chunks,
+    stream_ndjson,
+    stream_csv
+)
+from .conditional import ConditionalGetMixin
+from .counters import (
+    COUNTED_FIELDS,
+    link_counts,
+    lock_recipes
+)
+from .fast_list import FastRecipeListMixin
+from .images import (
+    FORMATS,
+    InvalidImage,
+    image_pipeline
+)
+from .importer import (
+    RecipeImporter,
+    read_ndjson,
+    read_csv
+)
+from .negotiation import IgnoreAcceptNegotiation
+from .pagination import (
+    RecipeCursorPagination,
+    RecipeAttrCursorPagination
+)
+from .renderers import (
+    NDJSONRenderer,
+    CSVRenderer
+)
+from .replicas import ReplicaReadMixin
+from .resize import image_resizer
+from .search import search_recipes
 from .serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
     TagSerializer,
     IngredientSerializer,
-    RecipeImageSerializer
+    RecipeImageSerializer,
+    RecipeBulkListSerializer,
+    ImageUploadSerializer
 )
+from .signals import recipes_bulk_changed
+from .uploads import chunked_uploads
 
 from core.models import (
     Recipe,
     Tag,
-    Ingredient
+    Ingredient,
+    ImageUpload
 )
 
 
@@ -47,35 +118,106 @@ from core.models import (
                 'ingredients',
                 OpenApiTypes.STR,
                 description='Comma seprated list of ingredient IDs to filter.'
-            )
+            ),
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR, enum=['any', 'all'],
+                description='Match recipes having any (default) or all '
+                            'of the given tags and ingredients.'
+            ),
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description='Full-text search over titles, descriptions, '
+                            'tag and ingredient names, best matches first.'
+            ),
         ]
     )
 )
-class RecipeApiViewSet(viewsets.ModelViewSet):
+class RecipeApiViewSet(ReplicaReadMixin,
+                       ConditionalGetMixin,
+                       CachedListMixin,
+                       FastRecipeListMixin,
+                       viewsets.ModelViewSet):
     """View for manage recipe API's."""
     serializer_class = RecipeDetailSerializer
-    queryset = Recipe.objects.all()
+    queryset = Recipe.objects.defer('search_vector')
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
+    pagination_class = RecipeCursorPagination
+    cache_list_params = ('tags', 'ingredients')
+    export_chunk_size = 500
+    import_chunk_size = 5000
 
-    def _params_to_ints(self, qs):
+    def _params_to_ints(self, qs, param):
         """Convert a list of string parameters to integers."""
-        return [int(str_id) for str_id in qs.split(',')]
+        try:
+            return [int(str_id) for str_id in qs.split(',')]
+        except ValueError:
+            msg = _('Expected a comma separated list of integer IDs.')
+            raise ValidationError({param: [msg]})
+
+    def _filter_related(self, queryset, field_name, ids, match_all):
+        """Filter recipes by related IDs with a semi-join, so no
+        DISTINCT is needed. In match all mode the recipe must be
+        linked to every ID, counted with a grouped HAVING."""
+        through = getattr(Recipe, field_name).through
+        related_model = Recipe._meta.get_field(field_name).related_model
+        related_field = f'{related_model._meta.model_name}_id'
+        links = through.objects.filter(**{f'{related_field}__in': ids})
+        if match_all:
+            matching = links.values('recipe_id').annotate(
+                matched=Count(related_field)
+            ).filter(matched=len(set(ids))).values('recipe_id')
+            return queryset.filter(id__in=matching)
+
+        return queryset.filter(Exists(links.filter(recipe_id=OuterRef('pk'))))
+
+    def _prefetch_nested(self, queryset):
+        """Prefetch tags and ingredients with only the serialized columns,
+        in id order like the fast list path."""
+        return queryset.prefetch_related(
+            Prefetch(
+                'tags',
+                queryset=Tag.objects.only(
+                    'id', 'name', 'recipe_count'
+                ).order_by('id')
+            ),
+            Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only(
+                    'id', 'name', 'recipe_count'
+                ).order_by('id')
+            ),
+        )
 
     def get_queryset(self):
         """Get recipes which only belong to authenticated user."""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
         queryset = self.queryset
+        if self.action in ('list', 'retrieve', 'update', 'partial_update'):
+            queryset = self._prefetch_nested(queryset)
+        match = self.request.query_params.get('match', 'any')
+        if match not in ('any', 'all'):
+            msg = _('Must be either "any" or "all".')
+            raise ValidationError({'match': [msg]})
         if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            tag_ids = self._params_to_ints(tags, 'tags')
+            queryset = self._filter_related(
+                queryset, 'tags', tag_ids, match == 'all'
+            )
         if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            ingredient_ids = self._params_to_ints(ingredients, 'ingredients')
+            queryset = self._filter_related(
+                queryset, 'ingredients', ingredient_ids, match == 'all'
+            )
+        queryset = queryset.filter(user=self.request.user)
+        terms = self.request.query_params.get('search', '').strip()
+        if terms and self.action == 'list':
+            return search_recipes(queryset, terms).order_by('-rank', '-id')
 
-        return queryset.filter(
-            user=self.request.user).order_by('-id').distinct()
+        return queryset.order_by('-id')
 
     def get_serializer_class(self):
         """This function defines that when the base class uses
@@ -84,25 +226,305 @@ class RecipeApiViewSet(viewsets.ModelViewSet):
             return RecipeSerializer
         elif self.action == 'upload_image':
             return RecipeImageSerializer
+        elif self.action == 'create_upload':
+            return ImageUploadSerializer
         return RecipeDetailSerializer
 
     def perform_create(self, serializer):
         """Create a new recipe."""
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        """Delete a recipe with its row locked, so its links are not
+        counted down by a concurrent update as well."""
+        with transaction.atomic():
+            lock_recipes([instance.id])
+            instance.delete()
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
-        """Defining a method called upload_image
-        for uploading images for recipe's"""
+        """Accept an image for a recipe and process it in the
+        background, answering 202 with the pending image status."""
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            image_pipeline.submit(recipe, serializer.validated_data['image'])
+            return Response(
+                self.get_serializer(recipe).data,
+                status=status.HTTP_202_ACCEPTED
+            )
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=['POST'], detail=True, url_path='uploads')
+    def create_upload(self, request, pk=None):
+        """Start a resumable upload of the recipe image, whose chunks
+        are then sent to the returned upload."""
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = chunked_uploads.create(
+            request.user, recipe, **serializer.validated_data
+        )
+        location = reverse(
+            'recipe:imageupload-detail', args=[upload.id], request=request
+        )
+
+        return Response(
+            self.get_serializer(upload).data,
+            status=status.HTTP_201_CREATED,
+            headers={'Location': location}
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'w',
+                OpenApiTypes.INT,
+                description='Largest width of the image in pixels.'
+            ),
+            OpenApiParameter(
+                'h',
+                OpenApiTypes.INT,
+                description='Largest height of the image in pixels.'
+            ),
+            OpenApiParameter(
+                'fmt',
+                OpenApiTypes.STR, enum=list(FORMATS),
+                description='Format of the image, by default the format '
+                            'it is stored in.'
+            ),
+            OpenApiParameter(
+                'v',
+                OpenApiTypes.STR,
+                description='The image_version of the recipe. Responses '
+                            'for the current version may be cached for '
+                            'long, others are revalidated every time.'
+            ),
+        ],
+        responses={(200, 'image/*'): OpenApiTypes.BINARY}
+    )
+    @action(
+        methods=['GET'],
+        detail=True,
+        url_path='image',
+        content_negotiation_class=IgnoreAcceptNegotiation
+    )
+    def image(self, request, pk=None):
+        """Serve the recipe image shrunk to fit w by h, never enlarged,
+        from a disk cache of renderings."""
+        recipe = self.get_object()
+        if not recipe.image:
+            raise NotFound(_('Recipe has no image.'))
+        width, height, fmt = image_resizer.parse(request.query_params)
+        fmt = fmt or image_resizer.default_format(recipe.image.name)
+        etag = f'"{image_resizer.key(recipe.image.name, width, height, fmt)}"'
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            try:
+                content, hit = image_resizer.fetch(
+                    recipe.image, width, height, fmt
+                )
+            except InvalidImage:
+                raise NotFound(_('Recipe image cannot be read.'))
+            response = FileResponse(content, content_type=f'image/{fmt}')
+            response['X-Cache'] = 'HIT' if hit else 'MISS'
+        response['ETag'] = etag
+        response['Cache-Control'] = image_resizer.cache_control(
+            recipe.image.name, request.query_params.get('v')
+        )
+        return response
+
+    def _get_bulk_serializer(self, *args, **kwargs):
+        """Return a list serializer writing recipes in bulk."""
+        return RecipeBulkListSerializer(
+            *args,
+            child=RecipeDetailSerializer(),
+            context=self.get_serializer_context(),
+            **kwargs
+        )
+
+    def _bulk_results(self, recipes, status_code):
+        """Serialize written recipes in input order as per-item results."""
+        queryset = self._prefetch_nested(
+            Recipe.objects.filter(id__in=[recipe.id for recipe in recipes])
+        )
+        by_id = queryset.in_bulk()
+        serializer = RecipeDetailSerializer(
+            [by_id[recipe.id] for recipe in recipes],
+            many=True,
+            context=self.get_serializer_context()
+        )
+        return Response(serializer.data, status=status_code)
+
+    def _bulk_create(self, request):
+        """Create many recipes."""
+        serializer = self._get_bulk_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.save()
+
+        return self._bulk_results(recipes, status.HTTP_201_CREATED)
+
+    @staticmethod
+    def _is_recipe_id(pk):
+        """Return whether a JSON value is an id, which true and false,
+        being ints in Python, are not."""
+        return isinstance(pk, int) and not isinstance(pk, bool)
+
+    def _bulk_update(self, request):
+        """Partially update many recipes identified by their id."""
+        ids = [item.get('id') if isinstance(item, dict) else None
+               for item in request.data]
+        valid_ids = [pk for pk in ids if self._is_recipe_id(pk)]
+        recipes = Recipe.objects.filter(
+            user=request.user, id__in=valid_ids
+        ).select_for_update().in_bulk()
+        given = Counter(valid_ids)
+        errors = [
+            {} if self._is_recipe_id(pk) and pk in recipes and given[pk] == 1
+            else {'id': [_('Recipe not found or given twice.')]}
+            for pk in ids
+        ]
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self._get_bulk_serializer(
+            [recipes[pk] for pk in ids], data=request.data, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.save()
+
+        return self._bulk_results(recipes, status.HTTP_200_OK)
+
+    def _bulk_destroy(self, request):
+        """Delete many recipes identified by their id."""
+        ids = request.data
+        if not all(self._is_recipe_id(pk) for pk in ids):
+            msg = _('Expected a list of recipe ids.')
+            return Response(
+                {'non_field_errors': [msg]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = Recipe.objects.filter(user=request.user, id__in=ids)
+        existing = set(lock_recipes(queryset.values_list('id', flat=True)))
+        # Unlink first with one DELETE per table and count down in bulk,
+        # so the per-recipe delete signals find nothing left to count.
+        link_deltas = {}
+        for field_name in COUNTED_FIELDS:
+            link_deltas[field_name] = Counter({
+                pk: -links
+                for pk, links in link_counts(field_name, existing).items()
+            })
+            getattr(Recipe, field_name).through.objects.filter(
+                recipe_id__in=existing
+            ).delete()
+        queryset.prefetch_related(*COUNTED_FIELDS).delete()
+        recipes_bulk_changed.send(
+            sender=Recipe,
+            user=request.user,
+            recipe_ids=sorted(existing),
+            link_deltas=link_deltas
+        )
+        results = [
+            {
+                'id': pk,
+                'status': status.HTTP_204_NO_CONTENT if pk in existing
+                else status.HTTP_404_NOT_FOUND
+            }
+            for pk in ids
+        ]
+
+        return Response(results, status=status.HTTP_200_OK)
+
+    @action(
+        methods=['POST', 'PATCH', 'DELETE'],
+        detail=False,
+        url_path='bulk'
+    )
+    def bulk(self, request):
+        """Create, update or delete many recipes in one transaction."""
+        if not isinstance(request.data, list):
+            msg = _('Expected a list of items.')
+            return Response(
+                {'non_field_errors': [msg]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(request.data) > RecipeBulkListSerializer.max_items:
+            msg = _('Ensure this list has no more than %(max)d items.')
+            return Response(
+                {'non_field_errors': [
+                    msg % {'max': RecipeBulkListSerializer.max_items}
+                ]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        handler = {
+            'POST': self._bulk_create,
+            'PATCH': self._bulk_update,
+            'DELETE': self._bulk_destroy,
+        }[request.method]
+        with transaction.atomic():
+            return handler(request)
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        renderer_classes=[NDJSONRenderer, CSVRenderer]
+    )
+    def export(self, request):
+        """Stream every recipe of the user as NDJSON or CSV."""
+        chunks = iter_recipe_chunks(
+            self.filter_queryset(self.get_queryset()),
+            RecipeDetailSerializer,
+            self.get_serializer_context(),
+            self.export_chunk_size
+        )
+        renderer = request.accepted_renderer
+        if renderer.format == CSVRenderer.format:
+            content = stream_csv(chunks)
+        else:
+            content = stream_ndjson(chunks)
+        response = StreamingHttpResponse(
+            content,
+            content_type=f'{renderer.media_type}; charset=utf-8'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{renderer.format}"'
+        )
+        return response
+
+    @action(
+        methods=['POST'],
+        detail=False,
+        url_path='import',
+        parser_classes=[MultiPartParser]
+    )
+    def import_recipes(self, request):
+        """Import recipes from an uploaded NDJSON or CSV file."""
+        upload = request.FILES.get('file')
+        if upload is None:
+            msg = _('No file was submitted.')
+            return Response(
+                {'file': [msg]}, status=status.HTTP_400_BAD_REQUEST
+            )
+        is_csv = (
+            upload.name.endswith('.csv') or upload.content_type == 'text/csv'
+        )
+        reader = read_csv if is_csv else read_ndjson
+        importer = RecipeImporter(
+            request.user, chunk_size=self.import_chunk_size
+        )
+        try:
+            result = importer.run(reader(codecs.iterdecode(upload, 'utf-8')))
+        except UnicodeDecodeError:
+            msg = _('File must be UTF-8 encoded.')
+            return Response(
+                {'file': [msg]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -112,37 +534,202 @@ class RecipeApiViewSet(viewsets.ModelViewSet):
                 OpenApiTypes.INT, enum=[0, 1],
                 description='Filter by items assigned to recipes.'
             ),
+            OpenApiParameter(
+                'ordering',
+                OpenApiTypes.STR,
+                enum=['name', '-name', 'recipe_count', '-recipe_count'],
+                description='Sort by name (default -name) or by how many '
+                            'recipes use each item.'
+            ),
         ]
     )
 )
-class BaseRecipeAttrApiViewSet(mixins.DestroyModelMixin,
+class BaseRecipeAttrApiViewSet(ReplicaReadMixin,
+                               CachedListMixin,
+                               mixins.DestroyModelMixin,
                                mixins.UpdateModelMixin,
                                mixins.ListModelMixin,
                                viewsets.GenericViewSet):
     """Base class for recipe attributes."""
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = RecipeAttrCursorPagination
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['name', 'recipe_count']
+    ordering = ('-name', '-id')
+    autocomplete_limit = 10
+    autocomplete_max_limit = 50
 
     def get_queryset(self):
         """Return tags that belong to authenticated user."""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
+        try:
+            assigned_only = bool(
+                int(self.request.query_params.get('assigned_only', 0))
+            )
+        except ValueError:
+            msg = _('Must be either 0 or 1.')
+            raise ValidationError({'assigned_only': [msg]})
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            # Semi-join served by the through table's index on the
+            # tag/ingredient column, so nothing needs de-duplicating.
+            through = getattr(Recipe, self.recipe_field).through
+            related_field = f'{queryset.model._meta.model_name}_id'
+            queryset = queryset.filter(Exists(
+                through.objects.filter(**{related_field: OuterRef('pk')})
+            ))
 
         return queryset.filter(
-            user=self.request.user).order_by('-name').distinct()
+            user=self.request.user).order_by(*self.ordering)
+
+    def _autocomplete_limit(self):
+        """Return the requested number of suggestions, bounded."""
+        limit = self.request.query_params.get('limit')
+        if limit is None:
+            return self.autocomplete_limit
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            msg = _('Must be a positive integer.')
+            raise ValidationError({'limit': [msg]})
+        return min(limit, self.autocomplete_max_limit)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                required=True,
+                description='Text the names start with or contain.'
+            ),
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description='Maximum number of suggestions (default 10, '
+                            'at most 50).'
+            ),
+        ]
+    )
+    @action(methods=['GET'], detail=False, url_path='autocomplete')
+    def autocomplete(self, request):
+        """Suggest names for a typed prefix, prefix matches first.
+
+        Queries of three or more characters also match inside names,
+        which the trigram index serves on PostgreSQL.
+        """
+        q = request.query_params.get('q', '').strip()
+        if not q:
+            msg = _('This query parameter is required.')
+            raise ValidationError({'q': [msg]})
+        limit = self._autocomplete_limit()
+        if response_cache.enabled:
+            key = response_cache.key_for(request)
+            data = response_cache.get(key)
+            if data is not None:
+                return Response(data, headers={'X-Cache': 'HIT'})
+
+        queryset = self.queryset.filter(user=request.user)
+        if len(q) < 3:
+            queryset = queryset.filter(name__istartswith=q)
+        else:
+            queryset = queryset.filter(name__icontains=q)
+        data = list(
+            queryset.annotate(is_prefix=Case(
+                When(name__istartswith=q, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField()
+            )).order_by(
+                'is_prefix', Length('name'), 'name'
+            ).values('id', 'name')[:limit]
+        )
+        if not response_cache.enabled:
+            return Response(data)
+
+        if response_cache.can_store():
+            response_cache.set(key, data)
+        return Response(data, headers={'X-Cache': 'MISS'})
 
 
 class TagApiViewSet(BaseRecipeAttrApiViewSet):
     """View for managing tags API's."""
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
+    recipe_field = 'tags'
 
 
 class IngredientApiViewSet(BaseRecipeAttrApiViewSet):
     """View for managing ingredients API's."""
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
+    recipe_field = 'ingredients'
+
+
+class ImageUploadApiViewSet(mixins.RetrieveModelMixin,
+                            mixins.DestroyModelMixin,
+                            viewsets.GenericViewSet):
+    """View for resumable recipe image uploads.
+
+    GET answers the offset to resume from, PUT writes the chunk found
+    at the Upload-Offset header, finalize queues the completed image
+    and DELETE abandons the upload.
+    """
+    serializer_class = ImageUploadSerializer
+    queryset = ImageUpload.objects.all()
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [CachedTokenAuthentication]
+
+    def get_queryset(self):
+        """Get uploads of the authenticated user, locked to finalize."""
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action == 'finalize':
+            queryset = queryset.select_for_update()
+        return queryset
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'Upload-Offset',
+                OpenApiTypes.INT,
+                location=OpenApiParameter.HEADER,
+                required=True,
+                description='Offset of the first byte of the chunk.'
+            ),
+        ],
+        request={'application/offset+octet-stream': OpenApiTypes.BINARY}
+    )
+    def update(self, request, pk=None):
+        """Stream the chunk in the request body into the upload."""
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            msg = _('Expected the integer offset of the chunk.')
+            raise ValidationError({'Upload-Offset': [msg]})
+
+        upload = chunked_uploads.write(
+            self.get_object(), offset, request.stream, length
+        )
+
+        return Response(
+            self.get_serializer(upload).data,
+            headers={'Upload-Offset': str(upload.offset)}
+        )
+
+    @extend_schema(request=None, responses=RecipeImageSerializer)
+    @action(methods=['POST'], detail=True)
+    def finalize(self, request, pk=None):
+        """Queue a completely received upload as the recipe image."""
+        with transaction.atomic():
+            recipe = chunked_uploads.finalize(self.get_object())
+
+        return Response(
+            RecipeImageSerializer(
+                recipe, context=self.get_serializer_context()
+            ).data,
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    def perform_destroy(self, instance):
+        chunked_uploads.discard(instance)
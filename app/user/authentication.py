@@ -0,0 +1,206 @@
+"""
+Cached token authentication for the API.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    transaction
+)
+from django.db.models import DEFERRED
+
+from rest_framework.authentication import TokenAuthentication
+
+
+class LRUTTLCache:
+    """Bounded, thread safe in-process LRU cache with a TTL per entry."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """Return the cached value or None if missing or expired."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Store a value and evict the least recently used entries."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove a value if it is cached."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove every cached value."""
+        with self._lock:
+            self._data.clear()
+
+
+class TokenCache:
+    """Two tier token cache: a local LRU in front of a shared cache.
+
+    Entries hold the token and the user fields authentication needs,
+    never the password hash. Each entry records the user's invalidation
+    stamp and is only trusted while the stamp in the shared cache still
+    matches, so invalidating a user in one process reaches every other
+    one. Without a shared cache invalidation could only reach the
+    process which ran it, so nothing is cached.
+    """
+    key_prefix = 'authtoken:'
+    user_fields = (
+        'id', 'email', 'name', 'is_active', 'is_staff', 'is_superuser'
+    )
+
+    def __init__(self):
+        config = settings.TOKEN_AUTH_CACHE
+        self.local = LRUTTLCache(config['MAX_ENTRIES'], config['TTL'])
+
+    @property
+    def shared(self):
+        """Return the shared cache backend or None when not configured."""
+        alias = settings.TOKEN_AUTH_CACHE.get('SHARED_CACHE')
+        return caches[alias] if alias else None
+
+    @property
+    def enabled(self):
+        """Return whether a shared cache alias is configured."""
+        return self.shared is not None
+
+    def _shared_key(self, key):
+        """Hash the token so raw keys never reach the shared backend."""
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return f'{self.key_prefix}{digest}'
+
+    def _stamp_key(self, user_id):
+        return f'{self.key_prefix}user:{user_id}'
+
+    def _stamp(self, user_id):
+        """Return the user's invalidation stamp, creating one if the
+        shared cache has none."""
+        key = self._stamp_key(user_id)
+        self.shared.add(key, uuid.uuid4().hex, None)
+        return self.shared.get(key)
+
+    def _is_current(self, entry):
+        """Return whether no invalidation happened since the entry was
+        cached, with a single shared cache read."""
+        stamp = self.shared.get(self._stamp_key(entry['user']['id']))
+        return stamp is not None and stamp == entry['stamp']
+
+    def get(self, key):
+        """Return the cached entry for a key from the nearest tier."""
+        if not self.enabled:
+            return None
+
+        entry = self.local.get(key)
+        if entry is None:
+            entry = self.shared.get(self._shared_key(key))
+            if entry is not None and self._is_current(entry):
+                self.local.set(key, entry)
+                return entry
+        elif self._is_current(entry):
+            return entry
+
+        self.local.delete(key)
+        return None
+
+    def set(self, key, token):
+        """Store the token and its user in every tier."""
+        if not self.enabled:
+            return
+
+        entry = {
+            'created': token.created,
+            'user': {
+                name: getattr(token.user, name) for name in self.user_fields
+            },
+            'stamp': self._stamp(token.user_id),
+        }
+        self.local.set(key, entry)
+        self.shared.set(
+            self._shared_key(key),
+            entry,
+            settings.TOKEN_AUTH_CACHE['SHARED_TTL']
+        )
+
+    def delete(self, *keys):
+        """Invalidate tokens in every tier."""
+        for key in keys:
+            self.local.delete(key)
+        if keys and self.enabled:
+            self.shared.delete_many([self._shared_key(key) for key in keys])
+
+    def invalidate_user(self, user_id):
+        """Invalidate the entries of a user in every process, now and
+        once the current transaction commits, so an entry cached from
+        rows read before the commit is not trusted either."""
+        def bump():
+            self.shared.set(self._stamp_key(user_id), uuid.uuid4().hex, None)
+
+        if self.enabled:
+            bump()
+            transaction.on_commit(bump)
+
+    def clear(self):
+        """Drop the local tier, used by tests and on settings changes."""
+        self.local = LRUTTLCache(
+            settings.TOKEN_AUTH_CACHE['MAX_ENTRIES'],
+            settings.TOKEN_AUTH_CACHE['TTL']
+        )
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication which caches the token and its user."""
+
+    def authenticate_credentials(self, key):
+        """Return the user and token, hitting the database on a miss."""
+        entry = token_cache.get(key)
+        if entry is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, token)
+            return user, token
+
+        # Fields left out of the entry, like the password, are deferred
+        # and so loaded on access and left alone by save().
+        fields = entry['user']
+        user = get_user_model().from_db(DEFAULT_DB_ALIAS, list(fields), [
+            fields.get(field.attname, DEFERRED)
+            for field in get_user_model()._meta.concrete_fields
+        ])
+        token = self.get_model().from_db(
+            DEFAULT_DB_ALIAS,
+            ['key', 'user_id', 'created'],
+            [key, user.pk, entry['created']]
+        )
+        token.user = user
+        return user, token
@@ -0,0 +1,30 @@
+"""
+Signal handlers keeping the token cache in sync with the database.
+"""
+from django.conf import settings
+from django.db.models.signals import (
+    post_save,
+    post_delete
+)
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from user.authentication import token_cache
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Drop a deleted token from the cache of every process."""
+    token_cache.delete(instance.key)
+    token_cache.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Drop the cached tokens of a changed or deactivated user."""
+    if created:
+        return
+    keys = Token.objects.filter(user=instance).values_list('key', flat=True)
+    token_cache.delete(*keys)
+    token_cache.invalidate_user(instance.pk)
@@ -0,0 +1,190 @@
+"""
+Tests for the cached token authentication.
+"""
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (
+    TestCase,
+    SimpleTestCase,
+    override_settings
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import (
+    LRUTTLCache,
+    token_cache
+)
+
+
+ME_URL = reverse('user:me')
+
+
+def create_user(**params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+class LRUTTLCacheTests(SimpleTestCase):
+    """Test the in-process LRU cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest unused entry is evicted when full."""
+        lru = LRUTTLCache(max_entries=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+        self.assertEqual(len(lru), 2)
+
+    @patch('user.authentication.time.monotonic')
+    def test_expires_entries_after_ttl(self, mock_monotonic):
+        """Test entries are dropped once their TTL has passed."""
+        mock_monotonic.return_value = 100
+        lru = LRUTTLCache(max_entries=2, ttl=10)
+        lru.set('a', 1)
+
+        mock_monotonic.return_value = 109
+        self.assertEqual(lru.get('a'), 1)
+        mock_monotonic.return_value = 110
+        self.assertIsNone(lru.get('a'))
+
+
+@override_settings(TOKEN_AUTH_CACHE={
+    'MAX_ENTRIES': 16,
+    'TTL': 30,
+    'SHARED_CACHE': 'default',
+    'SHARED_TTL': 60,
+})
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with cached tokens."""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = create_user(
+            name='Test',
+            email='test@example.com',
+            password='T123@example'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_second_request_skips_database(self):
+        """Test a cached token authenticates without any query."""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_nothing_cached_without_shared_cache(self):
+        """Test tokens are read from the database on every request when
+        invalidation could not reach the other processes."""
+        with self.settings(TOKEN_AUTH_CACHE={
+            **settings.TOKEN_AUTH_CACHE, 'SHARED_CACHE': None
+        }):
+            self.client.get(ME_URL)
+            self.assertIsNone(token_cache.get(self.token.key))
+            self.assertEqual(len(token_cache.local), 0)
+
+            self.token.delete()
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_token_rejected(self):
+        """Test an unknown token is rejected."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_invalidated(self):
+        """Test deleting a token evicts it from the cache."""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_invalidated(self):
+        """Test deactivating a user evicts their tokens."""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_changed_user_invalidated(self):
+        """Test changing a user refreshes the cached user."""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'Updated'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'Updated')
+
+    def test_shared_cache_tier(self):
+        """Test a token cached by another process is read from
+        the shared tier without touching the database."""
+        self.client.get(ME_URL)
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.token.delete()
+        token_cache.clear()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalidation_reaches_other_processes(self):
+        """Test the local tier of another process stops trusting its
+        entry once the user is deactivated."""
+        self.client.get(ME_URL)
+        other_process = token_cache.local
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.user.is_active = False
+        self.user.save()
+        token_cache.local = other_process
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_not_cached(self):
+        """Test cached entries leave out the password hash, which a
+        cached user still loads and keeps on save."""
+        self.client.get(ME_URL)
+
+        entry = token_cache.get(self.token.key)
+        self.assertNotIn('password', entry['user'])
+        self.assertNotIn(self.user.password, str(entry))
+
+        res = self.client.patch(ME_URL, {'name': 'Updated'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('T123@example'))
@@ -2,5 +2,11 @@
 
 set -e
 
-envsubst < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
+# APP_SERVER=asgi proxies HTTP to uvicorn instead of uwsgi to uWSGI.
+if [ "$APP_SERVER" = "asgi" ]; then
+    envsubst '${LISTEN_PORT} ${APP_HOST} ${APP_PORT}' \
+        < /etc/nginx/http.conf.tpl > /etc/nginx/conf.d/default.conf
+else
+    envsubst < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
+fi
 nginx -g 'daemon off;'
@@ -5,5 +5,22 @@ set -e
 python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
+# Fails image jobs lost with the previous workers, then keeps collecting
+# uploads never finalized, leftover staged and unused image files and
+# lost jobs every CLEAN_IMAGE_UPLOADS_INTERVAL seconds while serving.
+python manage.py clean_image_uploads
+(
+    while sleep "${CLEAN_IMAGE_UPLOADS_INTERVAL:-900}"; do
+        python manage.py clean_image_uploads || true
+    done
+) &
+
+# APP_SERVER=asgi serves HTTP from uvicorn with the async views, e.g.
+# to compare it with uWSGI using benchmark_api.
+if [ "$APP_SERVER" = "asgi" ]; then
+    export ASYNC_API="${ASYNC_API:-1}"
+    exec uvicorn app.asgi:application --host 0.0.0.0 --port 9000 \
+        --workers "${ASGI_WORKERS:-1}" --no-access-log
+fi
 
 uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file